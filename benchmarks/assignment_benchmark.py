@@ -0,0 +1,80 @@
+# benchmarks/assignment_benchmark.py
+"""
+Benchmark pemasangan karies -> gigi (tooth_assignment.py) pada adegan sintetis.
+
+    python benchmarks/assignment_benchmark.py
+    python benchmarks/assignment_benchmark.py --scenes 32x8 500x2000 4000x20000 --output benchmarks/results/assign.json
+
+Setiap adegan berisi gigi tersusun dua baris (rahang atas dan bawah, seperti
+rontgen panoramik atau gabungan hasil tile) dan karies acak di dalam gigi,
+ditambah 5% karies di luar gigi. Metode dense dan grid dijalankan pada adegan
+yang sama dan hasilnya dibandingkan; dense dilewati bila matriksnya terlalu
+besar (--dense-limit).
+"""
+import argparse
+
+import numpy as np
+
+from common import measure, metadata, write_report
+
+TOOTH_W, TOOTH_H = 60.0, 120.0
+
+
+def synthetic_scene(num_teeth, num_cavities, seed=0):
+    """(kotak gigi, kotak karies, indeks gigi sebenarnya per karies; -1 = di luar gigi)"""
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(num_teeth / 2))
+    idx = np.arange(num_teeth)
+    x = (idx % cols) * TOOTH_W * 1.05 + rng.uniform(-3, 3, num_teeth)
+    y = np.where(idx < cols, 0.0, TOOTH_H * 1.6) + rng.uniform(-10, 10, num_teeth)
+    teeth = np.column_stack([x, y, x + TOOTH_W, y + TOOTH_H]).astype(np.float32)
+
+    truth = rng.integers(0, num_teeth, num_cavities)
+    cx = teeth[truth, 0] + rng.uniform(12, TOOTH_W - 12, num_cavities)
+    cy = teeth[truth, 1] + rng.uniform(12, TOOTH_H - 12, num_cavities)
+    # Sebagian karies dipindah ke celah antar rahang (tidak di gigi mana pun)
+    outside = rng.random(num_cavities) < 0.05
+    cy[outside] = TOOTH_H * 1.3
+    truth[outside] = -1
+    half = rng.uniform(3, 10, num_cavities)
+    cavities = np.column_stack([cx - half, cy - half, cx + half, cy + half]).astype(np.float32)
+    return teeth, cavities, truth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pemasangan karies ke gigi")
+    parser.add_argument("--scenes", nargs="+", default=["32x8", "64x200", "500x2000", "2000x10000", "4000x20000"],
+                        help="GIGIxKARIES per adegan")
+    parser.add_argument("--dense-limit", type=int, default=20_000_000,
+                        help="lewati metode dense di atas jumlah pasangan ini")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import config
+    from tooth_assignment import assign_boxes, choose_method
+
+    results = []
+    for spec in args.scenes:
+        num_teeth, num_cavities = (int(v) for v in spec.lower().split("x"))
+        teeth, cavities, truth = synthetic_scene(num_teeth, num_cavities)
+        assigned = {}
+        for method in ("dense", "grid"):
+            if method == "dense" and num_teeth * num_cavities > args.dense_limit:
+                continue
+            assigned[method] = assign_boxes(cavities, teeth, method=method)[0]
+            results.append({"name": f"assign.{method}", "teeth": num_teeth, "cavities": num_cavities,
+                            "accuracy": round(float((assigned[method] == truth).mean()), 4),
+                            **measure(lambda: assign_boxes(cavities, teeth, method=method),
+                                      repeat=args.repeat)})
+        if len(assigned) == 2:
+            results[-1]["matches_dense"] = bool((assigned["dense"] == assigned["grid"]).all())
+        results[-1]["auto_method"] = choose_method(num_cavities, num_teeth)
+
+    write_report({"meta": metadata(dense_max_pairs=config.ASSIGN_DENSE_MAX_PAIRS,
+                                   min_overlap=config.TOOTH_MIN_OVERLAP),
+                  "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
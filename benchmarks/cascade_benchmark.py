@@ -0,0 +1,250 @@
+# benchmarks/cascade_benchmark.py
+"""
+Bandingkan kaskade gigi -> karies dengan satu pass dan mode tile di dataset/valid.
+
+    python benchmarks/cascade_benchmark.py --weights runs/train/<run>/weights/best.pt --scale 1 3
+    python benchmarks/cascade_benchmark.py --single-imgsz 640 1280 --output benchmarks/results/kaskade.json
+    python benchmarks/cascade_benchmark.py --pixels-only --scale 1 3
+
+Gambar (dan labelnya) diperbesar `--scale` kali untuk meniru rontgen
+resolusi tinggi. Kaskade dibandingkan dengan pass yang digantikannya: mode
+tile pada resolusi asli (tile = fine_imgsz, detail yang sama), serta satu
+pass biasa sebagai acuan. Untuk setiap mode dilaporkan latency per gambar,
+piksel yang diproses model (jumlah piksel input semua forward pass) serta
+recall/precision kelas cavity pada IoU 0.5 terhadap dataset/valid/labels.
+
+--pixels-only tidak butuh model: kotak gigi dari label dipakai sebagai hasil
+tahap 1. Sebagai pengganti recall dilaporkan skala efektif tiap karies di
+input model (piksel input per piksel asli; 1.0 = resolusi asli), fraksi
+karies yang terlihat pada resolusi asli, dan jumlah karies di luar semua
+potongan gigi (hanya terlihat di tahap 1).
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from common import ROOT, load_benchmark_model, metadata, write_report
+
+VALID_DIR = ROOT / "dataset" / "valid"
+
+
+def load_ground_truth(image_path, width, height):
+    """Label YOLO gambar -> array N x 5 (x1, y1, x2, y2, cls) dalam piksel"""
+    from inference import read_yolo_labels
+
+    label_path = VALID_DIR / "labels" / f"{image_path.stem}.txt"
+    if not label_path.exists():
+        return np.zeros((0, 5), np.float32)
+    labels = read_yolo_labels(label_path)
+    cls, xc, yc, w, h = labels.T
+    return np.stack([(xc - w / 2) * width, (yc - h / 2) * height,
+                     (xc + w / 2) * width, (yc + h / 2) * height, cls], axis=1)
+
+
+def match_counts(pred, truth, class_id, iou_threshold=0.5):
+    """(true positive, jumlah prediksi, jumlah label) untuk satu kelas, pencocokan greedy"""
+    from inference import box_iou
+
+    pred = pred[pred[:, 5] == class_id]
+    pred = pred[np.argsort(-pred[:, 4])]
+    truth = truth[truth[:, 4] == class_id]
+    if len(pred) == 0 or len(truth) == 0:
+        return 0, len(pred), len(truth)
+    iou = box_iou(pred, truth)
+    matched = np.zeros(len(truth), dtype=bool)
+    tp = 0
+    for row in iou:
+        row = np.where(matched, 0, row)
+        j = int(row.argmax())
+        if row[j] >= iou_threshold:
+            matched[j] = True
+            tp += 1
+    return tp, len(pred), len(truth)
+
+
+def run_mode(name, predict, images, cavity, repeat):
+    latencies, pixels = [], []
+    tp = n_pred = n_truth = 0
+    predict(images[0][1])  # warm-up
+    for path, image, truth in images:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            boxes, n_pixels = predict(image)
+            samples.append((time.perf_counter() - start) * 1000)
+        latencies.append(statistics.median(samples))
+        pixels.append(n_pixels)
+        counts = match_counts(boxes, truth, cavity)
+        tp, n_pred, n_truth = tp + counts[0], n_pred + counts[1], n_truth + counts[2]
+    return {
+        "name": name,
+        "images": len(images),
+        "median_ms": round(statistics.median(latencies), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "megapixels_per_image": round(statistics.fmean(pixels) / 1e6, 3),
+        "cavity_recall": round(tp / n_truth, 4) if n_truth else None,
+        "cavity_precision": round(tp / n_pred, 4) if n_pred else None,
+    }
+
+
+def load_images(limit, scale):
+    """(path, gambar BGR diperbesar `scale` kali, label N x 5 dalam piksel gambar itu)"""
+    import cv2
+
+    paths = sorted(p for p in (VALID_DIR / "images").iterdir()
+                   if p.suffix.lower() in (".jpg", ".jpeg", ".png"))[:limit]
+    images = []
+    for path in paths:
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if scale != 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        height, width = image.shape[:2]
+        images.append((path, image, load_ground_truth(path, width, height)))
+    return images
+
+
+def _inside(boxes, region):
+    """Mask kotak (x1, y1, x2, y2, ...) yang pusatnya di dalam region (x0, y0, x1, y1)"""
+    cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+    return (cx >= region[0]) & (cx < region[2]) & (cy >= region[1]) & (cy < region[3])
+
+
+def pixel_report(scales, single_imgsz, limit):
+    """Piksel dan skala efektif karies per mode, memakai kotak gigi dari label (tanpa model)"""
+    import config
+    from cascade_inference import build_mosaics, cascade_options, crop_regions, plan_mosaics
+    from tiled_inference import is_empty_tile, tile_grid, tile_options
+
+    options = cascade_options()
+    tiling = tile_options(tile_size=options["fine_imgsz"])
+    results = []
+    for scale in scales:
+        pixels = {"single": [], "tiled": [], "cascade": []}
+        cavity_scale = {"single": [], "tiled": [], "cascade": []}
+        crops = fallback = outside = 0
+        for path, image, truth in load_images(limit, scale):
+            height, width = image.shape[:2]
+            longest = max(height, width)
+            cavities = truth[truth[:, 4] == config.CASCADE_CAVITY_CLASS]
+            teeth = truth[truth[:, 4] == config.CASCADE_TOOTH_CLASS][:options["max_crops"]]
+            full_scale = min(1.0, single_imgsz / longest)
+
+            pixels["single"].append(single_imgsz ** 2)
+            cavity_scale["single"] += [full_scale] * len(cavities)
+
+            # Tile pada resolusi asli (+ satu pass gambar utuh seperti predict_tiled_boxes)
+            grid = tile_grid(width, height, tiling["tile_size"], tiling["overlap"])
+            kept = [r for r in grid if not (tiling["skip_empty"] and
+                                            is_empty_tile(image[r[1]:r[3], r[0]:r[2]], config.TILE_EMPTY_STD))]
+            pixels["tiled"].append(len(kept) * tiling["tile_size"] ** 2
+                                   + (single_imgsz ** 2 if tiling["include_full"] else 0))
+            seen = np.zeros(len(cavities), bool)
+            for region in kept:
+                seen |= _inside(cavities, region)
+            cavity_scale["tiled"] += np.where(seen, 1.0, full_scale).tolist()
+
+            if longest <= single_imgsz:
+                # Kaskade dilewati: satu pass biasa
+                pixels["cascade"].append(single_imgsz ** 2)
+                cavity_scale["cascade"] += [full_scale] * len(cavities)
+                fallback += 1
+                continue
+            total = options["coarse_imgsz"] ** 2
+            best = np.full(len(cavities), options["coarse_imgsz"] / longest)
+            regions = crop_regions(teeth, width, height, options["padding"]) if len(teeth) else np.zeros((0, 4))
+            if len(regions):
+                max_mosaics = max(1, config.CASCADE_MAX_FINE_PIXELS // options["fine_imgsz"] ** 2)
+                placements, used = plan_mosaics(regions[:, 2:] - regions[:, :2], options["fine_imgsz"],
+                                                max_mosaics, full_scale)
+                if any(p is None for p in placements):
+                    # Sama seperti predict_cascade_boxes: tahap 1 lalu satu pass biasa
+                    pixels["cascade"].append(total + single_imgsz ** 2)
+                    cavity_scale["cascade"] += [full_scale] * len(cavities)
+                    fallback += 1
+                    continue
+                mosaics = build_mosaics(image, regions, placements, used, options["fine_imgsz"])
+                total += sum(m.shape[0] * m.shape[1] for m in mosaics)
+                for region, place in zip(regions, placements):
+                    best = np.where(_inside(cavities, region), np.maximum(best, place[3]), best)
+                crops += len(placements)
+            # Karies di luar semua kotak gigi hanya terlihat pada resolusi tahap 1
+            outside += int((best < full_scale).sum())
+            pixels["cascade"].append(total)
+            cavity_scale["cascade"] += best.tolist()
+
+        for name in pixels:
+            scales_seen = np.array(cavity_scale[name])
+            results.append({"name": name, "scale": scale, "images": len(pixels[name]),
+                            "megapixels_per_image": round(statistics.fmean(pixels[name]) / 1e6, 3),
+                            "megapixels_max": round(max(pixels[name]) / 1e6, 3),
+                            "cavity_scale_mean": round(float(scales_seen.mean()), 3) if len(scales_seen) else None,
+                            "cavity_native": round(float((scales_seen >= 0.999).mean()), 3)
+                            if len(scales_seen) else None})
+        results[-1].update(crops=crops, single_pass_fallback=fallback, cavities_outside_crops=outside)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kaskade vs satu pass")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--single-imgsz", nargs="+", type=int, default=None,
+                        help="imgsz mode satu pass, default imgsz model")
+    parser.add_argument("--coarse-imgsz", type=int, default=None)
+    parser.add_argument("--fine-imgsz", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--pixels-only", action="store_true", help="hanya hitung piksel, tanpa model")
+    parser.add_argument("--scale", nargs="+", type=int, default=[1, 3],
+                        help="faktor perbesaran gambar (meniru rontgen resolusi tinggi)")
+    args = parser.parse_args()
+
+    if args.pixels_only:
+        import config
+        single_imgsz = (args.single_imgsz or [config.INFERENCE_IMGSZ or 640])[0]
+        write_report({"meta": metadata(single_imgsz=single_imgsz,
+                                       max_fine_pixels=config.CASCADE_MAX_FINE_PIXELS),
+                      "results": pixel_report(args.scale, single_imgsz, args.limit)}, args.output)
+        return
+
+    from cascade_inference import cascade_options, class_id, predict_cascade_boxes
+    from inference import model_imgsz
+    from tiled_inference import predict_tiled_boxes, tile_options
+    import config
+
+    model, model_name = load_benchmark_model(args.weights)
+    cavity = class_id(model, "cavity", config.CASCADE_CAVITY_CLASS)
+    options = cascade_options(coarse_imgsz=args.coarse_imgsz, fine_imgsz=args.fine_imgsz)
+    tiling = tile_options(tile_size=options["fine_imgsz"])
+
+    def cascade(image):
+        boxes, stats, _ = predict_cascade_boxes(model, image, args.conf, **options)
+        return boxes, stats["pixels"]
+
+    def tiled(image):
+        boxes, stats, _ = predict_tiled_boxes(model, image, args.conf, **tiling)
+        full = model_imgsz(model) ** 2 if tiling["include_full"] else 0
+        return boxes, (stats["tiles"] - stats["tiles_skipped"]) * tiling["tile_size"] ** 2 + full
+
+    results = []
+    for scale in args.scale:
+        images = load_images(args.limit, scale)
+        for imgsz in args.single_imgsz or [model_imgsz(model)]:
+            def single(image, imgsz=imgsz):
+                r = model.predict(image, conf=args.conf, imgsz=imgsz, verbose=False)[0]
+                return r.boxes.data.cpu().numpy(), imgsz ** 2
+            results.append({"scale": scale, "params": {"imgsz": imgsz},
+                            **run_mode("single", single, images, cavity, args.repeat)})
+        results.append({"scale": scale, "params": tiling,
+                        **run_mode("tiled", tiled, images, cavity, args.repeat)})
+        results.append({"scale": scale, "params": options,
+                        **run_mode("cascade", cascade, images, cavity, args.repeat)})
+
+    write_report({"meta": metadata(model=model_name, conf=args.conf), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/common.py
+"""Utilitas bersama untuk skrip benchmark: timer, RSS puncak, data contoh, output JSON"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def peak_rss_mb():
+    """RSS puncak proses ini dalam MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux melaporkan KB, macOS byte
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 ** 2
+
+
+def measure(fn, repeat=10, warmup=1, items=1):
+    """Jalankan fn berulang kali; kembalikan statistik waktu (ms) dan throughput"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "repeat": repeat,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "median_ms": round(median, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 3),
+        "min_ms": round(samples[0], 3),
+        "items_per_s": round(items * 1000 / median, 2) if median else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def sample_images(limit=None, folders=("dataset/valid/images", "dataset/test/images",
+                                       "dataset/train/images", "images")):
+    """Path gambar contoh dari dataset/ dan images/"""
+    paths = []
+    for folder in folders:
+        folder = ROOT / folder
+        if folder.exists():
+            paths.extend(sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES))
+    return paths[:limit] if limit else paths
+
+
+def load_benchmark_model(weights=None):
+    """
+    Model untuk benchmark: bobot yang diberikan, best.pt terbaru, atau - bila
+    tidak ada file bobot sama sekali - YOLO11n dari yaml dengan bobot acak.
+    Yang terakhir berjalan offline dengan beban komputasi yang sama.
+    """
+    import config
+    from ultralytics import YOLO
+
+    candidates = [weights, config.get_latest_trained_model_path(), config.DETECTION_MODEL]
+    for candidate in candidates:
+        if candidate and Path(candidate).exists():
+            return YOLO(Path(candidate)), str(candidate)
+    return YOLO("yolo11n.yaml", task="detect"), "yolo11n.yaml (sintetis, bobot acak)"
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def write_report(report, output=None):
+    """Cetak laporan JSON dan simpan ke file bila output diberikan"""
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text)
+        print(f"[BENCH] Laporan disimpan: {output}", file=sys.stderr)
+    print(text)
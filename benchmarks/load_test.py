@@ -0,0 +1,110 @@
+# benchmarks/load_test.py
+"""
+Uji beban lokal untuk server.py: mengukur latency p50/p95 dan request/detik.
+
+    uvicorn server:app --port 8000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --requests 200 --concurrency 8
+
+Gambar yang sama dikirim berulang kali, jadi set SERVER_USE_RESULT_CACHE = False
+di config.py agar yang terukur adalah inference, bukan cache hasil.
+"""
+import argparse
+import json
+import mimetypes
+import statistics
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def encode_multipart(files, fields):
+    """Body multipart/form-data sederhana tanpa dependensi tambahan"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for field, path in files:
+        content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{path.name}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + path.read_bytes() + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(url, images, total, concurrency, confidence, batch):
+    endpoint = f"{url.rstrip('/')}/predict/batch" if batch > 1 else f"{url.rstrip('/')}/predict"
+    field = "files" if batch > 1 else "file"
+    bodies = []
+    for i in range(len(images)):
+        chunk = [images[(i + j) % len(images)] for j in range(batch)]
+        bodies.append(encode_multipart([(field, p) for p in chunk], {"confidence": confidence}))
+
+    def one(i):
+        body, content_type = bodies[i % len(bodies)]
+        request = urllib.request.Request(endpoint, data=body, headers={"Content-Type": content_type})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                json.load(response)
+            return time.perf_counter() - start, True
+        except Exception:
+            return time.perf_counter() - start, False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies = [s * 1000 for s, ok in samples if ok]
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "images_per_request": batch,
+        "errors": sum(1 for _, ok in samples if not ok),
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(total / wall, 2),
+        "images_per_s": round(total * batch / wall, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban server inference")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--images", default=str(ROOT / "dataset" / "valid" / "images"))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=1, help="gambar per request (>1 memakai /predict/batch)")
+    parser.add_argument("--confidence", type=float, default=0.4)
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    images = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    if not images:
+        raise SystemExit(f"Tidak ada gambar di {args.images}")
+
+    if args.warmup:
+        run(args.url, images, args.warmup, 1, args.confidence, args.batch)
+    print(json.dumps(run(args.url, images, args.requests, args.concurrency,
+                         args.confidence, args.batch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
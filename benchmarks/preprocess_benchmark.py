@@ -0,0 +1,100 @@
+# benchmarks/preprocess_benchmark.py
+"""
+Bandingkan PreprocessPipeline dengan perbaikan_gambar lama (PIL <-> OpenCV).
+
+    python benchmarks/preprocess_benchmark.py
+    python benchmarks/preprocess_benchmark.py --size 640 --scale 3 --output benchmarks/results/pipeline.json
+
+Gambar contoh dari dataset diperbesar `--scale` kali (mensimulasikan rontgen
+asli yang lebih besar dari 640px), lalu diproses dalam versi warna dan
+grayscale. Dilaporkan waktu per gambar serta alokasi memori Python/NumPy
+(jumlah blok dan puncak byte dari tracemalloc) per panggilan.
+"""
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from common import measure, metadata, sample_images, write_report
+
+
+def perbaikan_gambar_lama(img, ketajaman=True, noise=True, kontras=False):
+    """Implementasi sebelum PreprocessPipeline, disalin apa adanya sebagai pembanding"""
+    img_cv = np.array(img)[:, :, ::-1].copy()  # RGB ke BGR
+
+    if noise:
+        img_cv = cv2.fastNlMeansDenoisingColored(img_cv, None, 10, 10, 7, 21)
+
+    if ketajaman:
+        kernel = np.array([[0, -1, 0],
+                           [-1, 5, -1],
+                           [0, -1, 0]])
+        img_cv = cv2.filter2D(img_cv, -1, kernel)
+
+    if kontras:
+        lab = cv2.cvtColor(img_cv, cv2.COLOR_BGR2LAB)
+        l, a, b = cv2.split(lab)
+        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        l = clahe.apply(l)
+        img_cv = cv2.merge((l, a, b))
+
+    return Image.fromarray(img_cv[:, :, ::-1])  # BGR ke RGB
+
+
+def allocations(fn):
+    """(jumlah blok, puncak byte) yang dialokasikan satu panggilan fn"""
+    fn()  # pemanasan: buffer scratch sudah ada
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(max(0, s.count_diff) for s in stats)
+    return blocks, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline preprocessing")
+    parser.add_argument("--size", type=int, default=640)
+    parser.add_argument("--scale", type=float, default=2.0, help="perbesar gambar contoh")
+    parser.add_argument("--contrast", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from preprocess_pipeline import PreprocessPipeline
+
+    base = cv2.imread(str(sample_images(limit=1)[0]), cv2.IMREAD_COLOR)
+    base = cv2.resize(base, None, fx=args.scale, fy=args.scale, interpolation=cv2.INTER_CUBIC)
+    inputs = {"warna": base, "grayscale": cv2.cvtColor(cv2.cvtColor(base, cv2.COLOR_BGR2GRAY),
+                                                       cv2.COLOR_GRAY2BGR)}
+    flags = dict(ketajaman=True, noise=True, kontras=args.contrast)
+    pipeline = PreprocessPipeline(size=args.size, sharpen=True, denoise=True, contrast=args.contrast)
+
+    results = []
+    for kind, bgr in inputs.items():
+        pil = Image.fromarray(bgr[:, :, ::-1])
+        out = np.empty((args.size, args.size, 3), np.uint8)
+
+        def lama():
+            return perbaikan_gambar_lama(pil, **flags).resize((args.size, args.size))
+
+        def baru():
+            return pipeline(bgr, out=out)
+
+        for name, fn in (("perbaikan_gambar+resize", lama), ("PreprocessPipeline", baru)):
+            blocks, peak = allocations(fn)
+            results.append({"name": name, "input": kind, "shape": list(bgr.shape),
+                            **measure(fn, repeat=args.repeat),
+                            "alloc_blocks": blocks, "alloc_peak_mb": round(peak / 1024 ** 2, 2)})
+
+    write_report({"meta": metadata(size=args.size, scale=args.scale, contrast=args.contrast),
+                  "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
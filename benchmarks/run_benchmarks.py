@@ -0,0 +1,150 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark jalur panas: inference, preprocessing, dan baca/tulis label.
+
+    python benchmarks/run_benchmarks.py --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python benchmarks/run_benchmarks.py --sections preprocessing labels --compare benchmarks/results/lama.json
+
+Berjalan offline di CPU; bila tidak ada file bobot, dipakai YOLO11n sintetis
+(lihat common.load_benchmark_model). Output berupa JSON agar bisa dibandingkan
+antar commit dengan --compare.
+"""
+import argparse
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from common import load_benchmark_model, measure, metadata, sample_images, write_report
+
+IMGSZ_OPTIONS = [320, 416, 512, 640]
+BATCH_SIZES = [1, 2, 4, 8]
+
+
+def bench_inference(images, imgsz_list, batch_sizes, repeat, weights=None):
+    from inference import predict_batch
+
+    model, model_name = load_benchmark_model(weights)
+    pil_images = [Image.open(p).convert("RGB") for p in images]
+    results = []
+
+    for imgsz in imgsz_list:
+        # Latency satu gambar, setara process_image_detection tanpa cache (termasuk plot)
+        stats = measure(lambda: predict_batch(model, pil_images[:1], 0.25, batch_size=1, imgsz=imgsz),
+                        repeat=repeat, warmup=2)
+        results.append({"name": "inference.single", "params": {"imgsz": imgsz}, **stats})
+
+        for batch_size in batch_sizes:
+            batch = (pil_images * batch_size)[:batch_size]
+            stats = measure(lambda: predict_batch(model, batch, 0.25, batch_size=batch_size,
+                                                  imgsz=imgsz, plot=False),
+                            repeat=repeat, warmup=1, items=batch_size)
+            results.append({"name": "inference.batch",
+                            "params": {"imgsz": imgsz, "batch_size": batch_size}, **stats})
+    return results, model_name
+
+
+def bench_preprocessing(images, repeat):
+    from preprocessing_engine import perbaikan_gambar
+
+    img = Image.open(images[0]).convert("RGB")
+    variants = {
+        "noise": dict(ketajaman=False, noise=True, kontras=False),
+        "ketajaman": dict(ketajaman=True, noise=False, kontras=False),
+        "kontras": dict(ketajaman=False, noise=False, kontras=True),
+        "semua": dict(ketajaman=True, noise=True, kontras=True),
+    }
+    results = []
+    for name, flags in variants.items():
+        stats = measure(lambda: perbaikan_gambar(img, **flags), repeat=repeat)
+        results.append({"name": "preprocessing.filter",
+                        "params": {"filter": name, "size": list(img.size)}, **stats})
+
+    for size in IMGSZ_OPTIONS:
+        stats = measure(lambda: img.resize((size, size)), repeat=repeat)
+        results.append({"name": "preprocessing.resize", "params": {"size": size}, **stats})
+    return results
+
+
+def bench_labels(repeat):
+    from common import ROOT
+    from detections import Detections
+    from inference import read_yolo_labels, save_yolo_labels
+
+    label_files = sorted((ROOT / "dataset").glob("*/labels/*.txt"))
+    if not label_files:
+        return []
+    items = []
+    for rows in (read_yolo_labels(p) for p in label_files):
+        # Label ternormalisasi -> xyxy pada gambar 1x1
+        xyxy = np.concatenate([rows[:, 1:3] - rows[:, 3:5] / 2, rows[:, 1:3] + rows[:, 3:5] / 2], axis=1)
+        items.append(Detections(xyxy, np.ones(len(rows)), rows[:, 0], (1, 1)))
+
+    results = [{"name": "labels.read", "params": {"files": len(label_files)},
+                **measure(lambda: [read_yolo_labels(p) for p in label_files],
+                          repeat=repeat, items=len(label_files))}]
+
+    out_dir = Path(tempfile.mkdtemp(prefix="bench_labels_"))
+    try:
+        def write_all():
+            for i, rows in enumerate(items):
+                save_yolo_labels(rows, out_dir / f"{i}.txt")
+        results.append({"name": "labels.write", "params": {"files": len(items)},
+                        **measure(write_all, repeat=repeat, items=len(items))})
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def compare(report, baseline_path):
+    """Cetak rasio median terhadap laporan dasar (>1 berarti lebih lambat)"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    base = {(r["name"], json.dumps(r.get("params"), sort_keys=True)): r for r in baseline["results"]}
+    print(f"Perbandingan dengan {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for r in report["results"]:
+        old = base.get((r["name"], json.dumps(r.get("params"), sort_keys=True)))
+        if old and old.get("median_ms") and r.get("median_ms"):
+            ratio = r["median_ms"] / old["median_ms"]
+            flag = "  <-- lebih lambat" if ratio > 1.10 else ""
+            print(f"  {r['name']:<24} {json.dumps(r['params']):<40} "
+                  f"{old['median_ms']:>9.2f} -> {r['median_ms']:>9.2f} ms  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur panas aplikasi")
+    parser.add_argument("--sections", nargs="+", default=["inference", "preprocessing", "labels"],
+                        choices=["inference", "preprocessing", "labels"])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=IMGSZ_OPTIONS)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=BATCH_SIZES)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--output", default=None, help="simpan laporan JSON ke file ini")
+    parser.add_argument("--compare", default=None, help="laporan JSON lama sebagai pembanding")
+    args = parser.parse_args()
+
+    images = sample_images(limit=8)
+    results, model_name = [], None
+
+    if "inference" in args.sections:
+        try:
+            section, model_name = bench_inference(images, args.imgsz, args.batch_sizes,
+                                                  args.repeat, args.weights)
+            results.extend(section)
+        except ImportError as e:
+            results.append({"name": "inference", "skipped": f"ultralytics tidak tersedia: {e}"})
+    if "preprocessing" in args.sections:
+        results.extend(bench_preprocessing(images, args.repeat))
+    if "labels" in args.sections:
+        results.extend(bench_labels(args.repeat))
+
+    report = {"meta": metadata(model=model_name), "results": results}
+    write_report(report, args.output)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/shard_benchmark.py
+"""
+Bandingkan waktu satu epoch baca data: file lepas vs shard mmap.
+
+    python benchmarks/shard_benchmark.py
+    python benchmarks/shard_benchmark.py --dataset datasets/karies --imgsz 640 --epochs 5
+
+Dataset dipaket ke folder sementara, lalu setiap epoch membaca semua gambar
+dalam urutan acak (seperti dataloader dengan shuffle): decode gambar + label.
+Mode "files" memakai cv2.imread + baca file .txt, mode "shard" memakai
+ShardDataset. Angka di sini cache-panas; di mesin training dengan disk
+jaringan selisih open/stat per file biasanya jauh lebih besar.
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import ROOT, metadata, peak_rss_mb, write_report
+
+
+def loose_files(dataset_dir, split):
+    images_dir = Path(dataset_dir) / split / "images"
+    from dataset_index import IMAGE_SUFFIXES
+
+    return sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def epoch_files(paths, order):
+    import cv2
+
+    boxes = 0
+    for i in order:
+        path = paths[i]
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        label = path.parent.parent / "labels" / f"{path.stem}.txt"
+        if label.exists():
+            text = label.read_text()
+            boxes += len(np.array(text.split(), dtype=np.float32).reshape(-1, 5)) if text.strip() else 0
+        assert image is not None
+    return boxes
+
+
+def epoch_shard(dataset, order):
+    boxes = 0
+    for i in order:
+        _, image, labels = dataset[i]
+        boxes += len(labels)
+        assert image is not None
+    return boxes
+
+
+def run(name, fn, epochs, items):
+    samples = []
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        fn(epoch)
+        samples.append(time.perf_counter() - start)
+    median = statistics.median(samples)
+    return {
+        "name": name,
+        "epochs": epochs,
+        "median_epoch_s": round(median, 4),
+        "min_epoch_s": round(min(samples), 4),
+        "images_per_s": round(items / median, 1) if median else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark epoch baca data: file lepas vs shard")
+    parser.add_argument("--dataset", default=str(ROOT / "dataset"))
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--imgsz", type=int, default=None, help="resize saat memaket (default: apa adanya)")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from shard_dataset import ShardDataset, pack_dataset
+
+    tmp = Path(tempfile.mkdtemp(prefix="shard_bench_"))
+    try:
+        start = time.perf_counter()
+        pack_dataset(args.dataset, tmp / "shards", splits=[args.split], imgsz=args.imgsz)
+        pack_seconds = time.perf_counter() - start
+
+        if args.imgsz:
+            # Pembanding yang adil: file lepas dengan resolusi yang sama
+            from shard_dataset import unpack_dataset
+            unpack_dataset(tmp / "shards", tmp / "files")
+            dataset_dir = tmp / "files"
+        else:
+            dataset_dir = Path(args.dataset)
+
+        paths = loose_files(dataset_dir, args.split)
+        dataset = ShardDataset(tmp / "shards", args.split)
+        rng = np.random.default_rng(0)
+        orders = [rng.permutation(len(paths)) for _ in range(args.epochs)]
+        epoch_files(paths, orders[0])  # pemanasan cache halaman untuk kedua mode
+        epoch_shard(dataset, orders[0])
+
+        results = [
+            run("files", lambda e: epoch_files(paths, orders[e]), args.epochs, len(paths)),
+            run("shard", lambda e: epoch_shard(dataset, orders[e]), args.epochs, len(paths)),
+        ]
+        files_s, shard_s = results[0]["median_epoch_s"], results[1]["median_epoch_s"]
+        dataset.close()
+        write_report({
+            "meta": metadata(dataset=args.dataset, split=args.split, images=len(paths), imgsz=args.imgsz),
+            "pack_seconds": round(pack_seconds, 3),
+            "shard_files": len(dataset.shard_files),
+            "results": results,
+            "speedup": round(files_s / shard_s, 3) if shard_s else None,
+        }, args.output)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/startup_benchmark.py
+"""
+Profil waktu impor dan benchmark waktu mulai aplikasi.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --budget-ms 1200 --output benchmarks/results/startup.json
+
+Setiap skenario dijalankan di proses Python baru (cache impor dingin):
+
+- "login": modul yang diimpor main.py sebelum halaman login tampil;
+- "eager": login + semua modul halaman, setara main.py sebelum impor halaman
+  dibuat tertunda;
+- satu skenario per halaman, yaitu biaya navigasi pertama ke halaman itu.
+
+Untuk tiap skenario dilaporkan median waktu impor (dikurangi waktu start
+interpreter kosong) serta modul dan paket termahal dari `python -X importtime`.
+Keluar dengan kode 1 bila skenario "login" melebihi STARTUP_BUDGET_MS.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from common import ROOT, metadata, write_report
+
+LOGIN_MODULES = ["config", "lazy_imports", "telemetry", "components.login", "run_catalog"]
+PAGE_MODULES = {
+    "dashboard": "components.dashboard",
+    "preprocessing": "components.preprocessing",
+    "training": "components.training",
+    "detection": "components.detection",
+}
+
+
+def scenarios():
+    result = {"login": LOGIN_MODULES,
+              "eager": LOGIN_MODULES + list(PAGE_MODULES.values())}
+    for page, module in PAGE_MODULES.items():
+        result[f"page.{page}"] = [module]
+    return result
+
+
+def _run(code, importtime=False):
+    """Jalankan kode di interpreter baru; kembalikan (detik, stderr, returncode)"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    start = time.perf_counter()
+    proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    return time.perf_counter() - start, proc.stderr, proc.returncode
+
+
+def parse_importtime(stderr):
+    """Baris `import time: self | cumulative | modul` -> list (modul, self_us, cumulative_us)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_profile(modules, top=15):
+    """Modul dan paket tingkat atas termahal untuk impor `modules`"""
+    _, stderr, code = _run("; ".join(f"import {m}" for m in modules), importtime=True)
+    if code != 0:
+        return {"error": stderr.strip().splitlines()[-1] if stderr.strip() else f"exit {code}"}
+    rows = parse_importtime(stderr)
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+    return {
+        "modules_imported": len(rows),
+        "total_ms": round(sum(row[1] for row in rows) / 1000, 1),
+        "top_modules": [{"module": name, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+                        for name, s, c in slowest],
+        "top_packages": [{"package": name, "self_ms": round(us / 1000, 1)}
+                         for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:top]],
+    }
+
+
+def time_imports(modules, repeat, baseline_s):
+    """Median waktu impor dingin (ms) di atas waktu start interpreter kosong"""
+    code = "; ".join(f"import {m}" for m in modules)
+    samples = []
+    for _ in range(repeat):
+        elapsed, stderr, returncode = _run(code)
+        if returncode != 0:
+            return {"error": stderr.strip().splitlines()[-1] if stderr.strip() else f"exit {returncode}"}
+        samples.append((elapsed - baseline_s) * 1000)
+    samples.sort()
+    return {"repeat": repeat,
+            "median_ms": round(statistics.median(samples), 1),
+            "min_ms": round(samples[0], 1),
+            "max_ms": round(samples[-1], 1)}
+
+
+def main():
+    import config
+
+    parser = argparse.ArgumentParser(description="Benchmark waktu mulai aplikasi")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="jumlah modul/paket termahal per skenario")
+    parser.add_argument("--budget-ms", type=float, default=config.STARTUP_BUDGET_MS)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    baseline_s = statistics.median(_run("pass")[0] for _ in range(args.repeat))
+    results = []
+    for name, modules in scenarios().items():
+        print(f"[BENCH] {name}: {', '.join(modules)}", file=sys.stderr)
+        results.append({"name": name, "modules": modules,
+                        **time_imports(modules, args.repeat, baseline_s),
+                        "profile": import_profile(modules, args.top)})
+
+    login = results[0]
+    over_budget = "median_ms" not in login or login["median_ms"] > args.budget_ms
+    write_report({"meta": metadata(interpreter_start_ms=round(baseline_s * 1000, 1),
+                                   budget_ms=args.budget_ms),
+                  "over_budget": over_budget,
+                  "results": results}, args.output)
+    if over_budget:
+        print(f"[BENCH] Jalur login melebihi budget {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# cascade_inference.py
+"""
+Inference kaskade dua tahap: gigi dulu (murah), lalu karies di potongan gigi.
+
+Tahap 1 menjalankan model pada resolusi rendah (CASCADE_COARSE_IMGSZ) untuk
+menemukan kotak kelas tooth. Tahap 2 memotong setiap gigi (view NumPy dengan
+sedikit padding) pada resolusi aslinya dan menyusunnya ke mosaik berukuran
+fine_imgsz x fine_imgsz (shelf packing), lalu semua mosaik dijalankan sebagai
+satu batch dengan filter kelas cavity. Dibanding me-letterbox setiap potongan
+ke persegi fine_imgsz, piksel tahap 2 kira-kira sebanding dengan luas gigi,
+dan totalnya dibatasi CASCADE_MAX_FINE_PIXELS: bila tidak muat, semua
+potongan diperkecil bersama, tetapi tidak sampai di bawah skala satu pass
+biasa (gambar utuh di-letterbox ke imgsz model). Bila tetap tidak muat,
+kaskade tidak memberi detail lebih dari satu pass, jadi dijalankan satu pass. Kotak karies dipetakan kembali ke
+koordinat gambar asli dan digabung dengan NMS per kelas, sehingga hasil
+akhirnya sama dengan struktur yang dipakai display_detection_results.
+
+Gambar yang tidak lebih besar dari imgsz model tidak mendapat detail
+tambahan dari potongan, sehingga cukup dijalankan satu pass biasa.
+
+    python benchmarks/cascade_benchmark.py --pixels-only --scale 1 3   # piksel tanpa model
+"""
+import math
+import time
+
+import numpy as np
+
+import config
+from inference import model_imgsz, predict_custom, run_on_preprocessed, to_bgr
+from lazy_imports import lazy_import
+from tiled_inference import nms
+
+cv2 = lazy_import("cv2")
+
+MOSAIC_GAP = 8          # jarak antar potongan di mosaik (piksel)
+MOSAIC_FILL = 114       # warna latar, sama seperti letterbox Ultralytics
+
+
+def class_id(model, name, default):
+    """ID kelas berdasarkan nama di model.names, atau default dari config"""
+    names = getattr(model, "names", None) or {}
+    for idx, label in names.items():
+        if label == name:
+            return int(idx)
+    return default
+
+
+def cascade_options(coarse_imgsz=None, fine_imgsz=None, tooth_conf=None,
+                    padding=None, max_crops=None):
+    """Opsi kaskade lengkap; nilai None diisi dari config"""
+    return {
+        "coarse_imgsz": int(coarse_imgsz or config.CASCADE_COARSE_IMGSZ),
+        "fine_imgsz": int(fine_imgsz or config.CASCADE_FINE_IMGSZ),
+        "tooth_conf": float(tooth_conf or config.CASCADE_TOOTH_CONF),
+        "padding": float(config.CASCADE_CROP_PADDING if padding is None else padding),
+        "max_crops": int(max_crops or config.CASCADE_MAX_CROPS),
+    }
+
+
+def crop_regions(tooth_boxes, width, height, padding):
+    """Kotak gigi diperbesar `padding` (fraksi sisi) dan dijepit ke batas gambar, int N x 4"""
+    xyxy = tooth_boxes[:, :4]
+    pad = np.stack([xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]], axis=1) * padding
+    regions = np.concatenate([xyxy[:, :2] - pad, xyxy[:, 2:] + pad], axis=1)
+    regions = np.clip(regions, 0, [width, height, width, height])
+    return regions.round().astype(np.int32)
+
+
+def pack_crops(sizes, canvas, max_mosaics, scale=1.0, gap=MOSAIC_GAP):
+    """
+    Shelf packing potongan (lebar, tinggi) ke mosaik canvas x canvas, sesuai urutan input.
+
+    Potongan diperkecil `scale` kali, dan lebih kecil lagi bila masih lebih
+    besar dari canvas. Mengembalikan
+    (mosaik, x, y, skala) per potongan (None bila tidak muat dalam max_mosaics
+    mosaik) dan tinggi terpakai setiap mosaik.
+    """
+    mosaics = []            # per mosaik: [shelf [y, tinggi, x berikutnya], ...], y shelf berikutnya
+    placements = []
+    for width, height in sizes:
+        crop_scale = min(scale, canvas / max(width, height))
+        w, h = max(1, math.floor(width * crop_scale)), max(1, math.floor(height * crop_scale))
+        place = None
+        for m, (shelves, next_y) in enumerate(mosaics):
+            for shelf in shelves:
+                if h <= shelf[1] and shelf[2] + w <= canvas:
+                    place = (m, shelf[2], shelf[0])
+                    shelf[2] += w + gap
+                    break
+            if place is None and next_y + h <= canvas:
+                shelves.append([next_y, h, w + gap])
+                mosaics[m][1] = next_y + h + gap
+                place = (m, 0, next_y)
+            if place is not None:
+                break
+        if place is None and len(mosaics) < max_mosaics:
+            mosaics.append([[[0, h, w + gap]], h + gap])
+            place = (len(mosaics) - 1, 0, 0)
+        placements.append(place + (crop_scale,) if place is not None else None)
+    used = [min(canvas, next_y - gap) for _, next_y in mosaics]
+    return placements, used
+
+
+def plan_mosaics(sizes, canvas, max_mosaics, min_scale, step=0.85):
+    """
+    pack_crops dengan skala terbesar (<= 1) yang memuat semua potongan dalam
+    max_mosaics mosaik. Potongan tidak diperkecil di bawah `min_scale`;
+    bila tetap tidak muat, potongan terakhir bernilai None.
+    """
+    scale = 1.0
+    while True:
+        placements, used = pack_crops(sizes, canvas, max_mosaics, scale)
+        # Potongan yang lebih besar dari canvas bisa diperkecil di bawah min_scale
+        placements = [place if place is not None and place[3] >= min_scale else None
+                      for place in placements]
+        if all(place is not None for place in placements) or scale * step < min_scale:
+            return placements, used
+        scale *= step
+
+
+def build_mosaics(array, regions, placements, used, canvas):
+    """Tempel potongan ke mosaik; mosaik tunggal dipangkas ke tinggi terpakai (kelipatan 32)"""
+    height = canvas
+    if len(used) == 1:
+        height = min(canvas, max(32, -(-used[0] // 32) * 32))
+    channels = array.shape[2:] if array.ndim == 3 else ()
+    mosaics = [np.full((height, canvas) + channels, MOSAIC_FILL, dtype=np.uint8) for _ in used]
+    for (x0, y0, x1, y1), place in zip(regions, placements):
+        if place is None:
+            continue
+        m, px, py, scale = place
+        crop = array[y0:y1, x0:x1]
+        if scale < 1.0:
+            size = (max(1, math.floor((x1 - x0) * scale)), max(1, math.floor((y1 - y0) * scale)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        mosaics[m][py:py + crop.shape[0], px:px + crop.shape[1]] = crop
+    return mosaics
+
+
+def unpack_boxes(boxes, regions, placements, mosaic_index):
+    """Kotak di satu mosaik -> koordinat gambar asli, per potongan yang memuat pusat kotak"""
+    parts = []
+    center_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    center_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    for (x0, y0, x1, y1), place in zip(regions, placements):
+        if place is None or place[0] != mosaic_index:
+            continue
+        _, px, py, scale = place
+        w, h = math.floor((x1 - x0) * scale), math.floor((y1 - y0) * scale)
+        inside = (center_x >= px) & (center_x < px + w) & (center_y >= py) & (center_y < py + h)
+        if not inside.any():
+            continue
+        part = boxes[inside].copy()
+        part[:, [0, 2]] = np.clip(part[:, [0, 2]], px, px + w)
+        part[:, [1, 3]] = np.clip(part[:, [1, 3]], py, py + h)
+        part[:, [0, 2]] = (part[:, [0, 2]] - px) / scale + x0
+        part[:, [1, 3]] = (part[:, [1, 3]] - py) / scale + y0
+        parts.append(part)
+    return parts
+
+
+def predict_cascade_boxes(model, image, confidence, coarse_imgsz, fine_imgsz,
+                          tooth_conf, padding, max_crops):
+    """Kotak N x 6 (koordinat asli), statistik piksel/potongan dan waktu per tahap (ms)"""
+    tooth = class_id(model, "tooth", config.CASCADE_TOOTH_CLASS)
+    cavity = class_id(model, "cavity", config.CASCADE_CAVITY_CLASS)
+    timings = {}
+
+    array = to_bgr(image)
+    height, width = array.shape[:2]
+    single_imgsz = config.INFERENCE_IMGSZ or model_imgsz(model)
+
+    def single_pass(stats):
+        # Potongan tidak menambah detail: satu pass biasa
+        start = time.perf_counter()
+        boxes = model.predict(array, conf=confidence, imgsz=single_imgsz,
+                              verbose=False)[0].boxes.data.cpu().numpy()
+        timings["single"] = (time.perf_counter() - start) * 1000
+        timings["total"] = sum(timings.values())
+        stats.update(mosaics=0, skipped=True)
+        stats["pixels"] = stats.get("pixels", 0) + single_imgsz ** 2
+        return boxes, stats, timings
+
+    if max(height, width) <= single_imgsz:
+        return single_pass({"crops": 0})
+
+    start = time.perf_counter()
+    coarse = model.predict(array, conf=min(confidence, tooth_conf), imgsz=coarse_imgsz,
+                           verbose=False)[0].boxes.data.cpu().numpy()
+    timings["coarse"] = (time.perf_counter() - start) * 1000
+
+    teeth = coarse[(coarse[:, 5] == tooth) & (coarse[:, 4] >= tooth_conf)]
+    teeth = teeth[np.argsort(-teeth[:, 4])][:max_crops]
+    parts = [coarse[coarse[:, 4] >= confidence]]
+    stats = {"crops": 0, "crops_dropped": 0, "mosaics": 0, "pixels": coarse_imgsz ** 2, "skipped": False}
+
+    start = time.perf_counter()
+    regions = crop_regions(teeth, width, height, padding) if len(teeth) else np.zeros((0, 4), np.int32)
+    # Potongan berukuran nol dibuang; tanpa potongan valid hasilnya cukup kotak tahap 1
+    regions = regions[(regions[:, 2] > regions[:, 0]) & (regions[:, 3] > regions[:, 1])]
+    if len(regions):
+        max_mosaics = max(1, config.CASCADE_MAX_FINE_PIXELS // (fine_imgsz * fine_imgsz))
+        placements, used = plan_mosaics(regions[:, 2:] - regions[:, :2], fine_imgsz, max_mosaics,
+                                        single_imgsz / max(height, width))
+        if any(place is None for place in placements):
+            # Gigi terlalu besar untuk batas piksel tanpa turun di bawah detail satu pass
+            timings["fine"] = (time.perf_counter() - start) * 1000
+            return single_pass({"crops": 0, "crops_dropped": len(placements), "pixels": stats["pixels"]})
+        mosaics = build_mosaics(array, regions, placements, used, fine_imgsz)
+        results = model.predict(mosaics, conf=confidence, imgsz=fine_imgsz, classes=[cavity],
+                                batch=len(mosaics), verbose=False)
+        for m, r in enumerate(results):
+            parts += unpack_boxes(r.boxes.data.cpu().numpy(), regions, placements, m)
+        stats["crops"] = sum(place is not None for place in placements)
+        stats["crops_dropped"] = len(placements) - stats["crops"]
+        stats["mosaics"] = len(mosaics)
+        stats["pixels"] += sum(mosaic.shape[0] * mosaic.shape[1] for mosaic in mosaics)
+    timings["fine"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    boxes = nms(np.concatenate(parts).astype(np.float32), config.TILE_MERGE_IOU)
+    timings["merge"] = (time.perf_counter() - start) * 1000
+    timings["total"] = sum(timings.values())
+    return boxes, stats, timings
+
+
+def predict_cascade(model, image, confidence, name=None, plot=True, cache=None, pipeline=None, **options):
+    """
+    Deteksi kaskade satu gambar dengan struktur hasil yang sama seperti
+    inference.predict_batch (dipakai display_detection_results).
+
+    `pipeline` (PreprocessPipeline saat training) diterapkan ke gambar utuh
+    sebelum gigi dicari dan dipotong; kotak dikembalikan ke koordinat asli.
+    """
+    options = cascade_options(**options)
+    variant = "cascade:" + ":".join(str(options[k]) for k in sorted(options))
+    if pipeline is not None and pipeline.active:
+        variant += f":{pipeline.key}"
+
+    def compute(array, conf):
+        return predict_cascade_boxes(model, array, conf, **options)
+
+    return predict_custom(model, image, confidence, run_on_preprocessed(compute, image, pipeline), variant,
+                          name, plot, cache, imgsz=options["fine_imgsz"], stage_prefix="cascade_")
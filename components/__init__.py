@@ -1,3 +1,14 @@
-from .detection import show_detection_page
-from .training import show_training_page
-from .dashboard import show_about_page
+# Halaman diimpor saat pertama kali diminta (lihat main.PAGES), bukan saat
+# paket components diimpor, agar halaman login tidak menarik library berat
+_PAGES = {
+    "show_detection_page": ".detection",
+    "show_training_page": ".training",
+    "show_about_page": ".dashboard",
+}
+
+
+def __getattr__(name):
+    if name in _PAGES:
+        import importlib
+        return getattr(importlib.import_module(_PAGES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
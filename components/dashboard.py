@@ -1,6 +1,9 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from lazy_imports import lazy_import
+
+# plotly.express dan pandas baru dimuat saat grafik pertama digambar
+pd = lazy_import("pandas")
+px = lazy_import("plotly.express")
 from datetime import datetime, timedelta
 import random
 
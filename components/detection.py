@@ -2,15 +2,50 @@ import streamlit as st
 from PIL import Image
 import config
 import os
+import pandas as pd
+from inference import predict_batch
+from preprocess_pipeline import pipeline_for_model
+from result_cache import get_result_cache
+from image_loader import ImageTooLarge, load_image, make_preview
+from inference_executor import CANCELLED, RUNNING, ExecutorBusy, get_executor
+from overlay import render_overlay
 from utils import (
-    load_model, display_detection_results, process_image_detection
+    load_model, display_detection_results, submit_image_detection,
+    display_model_cache_stats, detection_decode_size
 )
 
 def render_page_config():
     st.subheader("Konfigurasi Model")
     model_type = "Detection"
     confidence_value = float(st.slider("Tingkat Kepercayaan", 25, 100, 40)) / 100
-    source_radio = config.SOURCES_LIST[0]
+    source_radio = st.radio(
+        "Mode Unggah", config.SOURCES_LIST, horizontal=True,
+        format_func=lambda x: "Satu Gambar" if x == "Image" else "Banyak Gambar (Batch)"
+    )
+    inference_mode = st.radio(
+        "Mode Inferensi", ["Standar", "Tile", "Kaskade"], horizontal=True,
+        help="Tile: potong rontgen panoramik agar lesi kecil tetap terdeteksi. "
+             "Kaskade: cari gigi di resolusi rendah, lalu karies di potongan gigi."
+    )
+    tiling = cascade = None
+    if inference_mode == "Tile":
+        col1, col2, col3 = st.columns(3)
+        tiling = {
+            "tile_size": col1.selectbox("Ukuran Tile", [320, 416, 512, 640, 800],
+                                        index=[320, 416, 512, 640, 800].index(config.TILE_SIZE)),
+            "overlap": col2.slider("Tumpang Tindih", 0.0, 0.5, config.TILE_OVERLAP, 0.05),
+            "merge": col3.selectbox("Penggabungan", ["nms", "wbf"],
+                                    index=["nms", "wbf"].index(config.TILE_MERGE)),
+            "skip_empty": st.checkbox("Lewati tile kosong", config.TILE_SKIP_EMPTY),
+        }
+    elif inference_mode == "Kaskade":
+        col1, col2 = st.columns(2)
+        cascade = {
+            "coarse_imgsz": col1.selectbox("Resolusi Tahap Gigi", [256, 320, 416],
+                                           index=[256, 320, 416].index(config.CASCADE_COARSE_IMGSZ)),
+            "fine_imgsz": col2.selectbox("Ukuran Mosaik Potongan", [320, 416, 512, 640],
+                                         index=[320, 416, 512, 640].index(config.CASCADE_FINE_IMGSZ)),
+        }
     # Tampilkan warning jika file default model tidak ada
     default_model_path = getattr(config, "DEFAULT_MODEL_PATH", "weights/yolo11n.pt")
     if not os.path.exists(default_model_path):
@@ -18,7 +53,9 @@ def render_page_config():
     return {
         "model_type": model_type,
         "confidence": confidence_value,
-        "source_type": source_radio
+        "source_type": source_radio,
+        "tiling": tiling,
+        "cascade": cascade
     }
 
 def show_detection_page():
@@ -31,11 +68,36 @@ def show_detection_page():
     if model is None:
         return
 
+    display_model_cache_stats()
+
     # Jalankan deteksi gambar
     if config_data["source_type"] == "Image":
-        show_image_detection(model, config_data["confidence"])
+        show_image_detection(model, config_data["confidence"], config_data["tiling"], config_data["cascade"])
+    elif config_data["source_type"] == "Batch":
+        show_batch_detection(model, config_data["confidence"])
+
+@st.fragment(run_every=config.INFERENCE_POLL_INTERVAL)
+def show_detection_progress(task):
+    """Status tugas inference; seluruh halaman dirender ulang begitu tugas selesai"""
+    if task.done():
+        st.rerun()
+    if task.status == RUNNING:
+        st.info(f"Memproses deteksi... ({task.run_ms / 1000:.1f} detik)")
+    else:
+        position = get_executor().position(task)
+        st.info(f"Menunggu antrean inference: {position} tugas di depan "
+                f"({task.wait_ms / 1000:.1f} detik)")
+
+def load_upload(uploaded_file, decode_size):
+    """LoadedImage unggahan; disimpan di session_state agar rerun tidak mendecode ulang"""
+    key = (uploaded_file.name, uploaded_file.size, decode_size)
+    cached = st.session_state.get("unggahan_terdecode")
+    if cached is None or cached[0] != key:
+        cached = (key, load_image(uploaded_file, target_size=decode_size))
+        st.session_state.unggahan_terdecode = cached
+    return cached[1]
 
-def show_image_detection(model, confidence):
+def show_image_detection(model, confidence, tiling=None, cascade=None):
     st.subheader("Unggah Gambar Rongtgen")
     
     # Validasi model terlebih dahulu
@@ -51,29 +113,75 @@ def show_image_detection(model, confidence):
 
     col1, col2 = st.columns(2)
     detection_results_data = None
+    overlay_mode = config.DETECTION_RENDER == "overlay"
+    upload_id = f"{source_image.name}:{source_image.size}" if source_image else None
 
     with col1:
         try:
-            default_img = Image.open(config.DEFAULT_IMAGE) if isinstance(config.DEFAULT_IMAGE, str) else config.DEFAULT_IMAGE
             if source_image is None:
+                default_img = Image.open(config.DEFAULT_IMAGE) if isinstance(config.DEFAULT_IMAGE, str) else config.DEFAULT_IMAGE
                 st.image(default_img, caption="Gambar Default", use_column_width=True)
             else:
-                uploaded_img = Image.open(source_image)
-                st.image(uploaded_img, caption="Gambar Diunggah", use_column_width=True)
+                # Decode sekecil yang dibutuhkan model; browser hanya menerima pratinjau JPEG
+                uploaded_img = load_upload(source_image, detection_decode_size(model, tiling, cascade))
+                st.image(render_overlay(uploaded_img.preview(), image_key=upload_id),
+                         caption="Gambar Diunggah", use_column_width=True)
+        except ImageTooLarge as e:
+            st.error(str(e))
+            st.stop()
         except Exception as e:
             st.error(f"Error memuat gambar: {str(e)}")
             st.stop()
 
     with col2:
         if source_image:
+            # Setelah tombol ditekan, rerun berikutnya (mis. geser slider) memakai
+            # cache hasil sehingga hanya memfilter ulang kotak yang sudah ada
             if st.button("🔍 Deteksi Karies Gigi", type="primary"):
-                with st.spinner("Memproses deteksi..."):
+                st.session_state.deteksi_aktif = upload_id
+            if st.session_state.get("deteksi_aktif") == upload_id:
+                # Mode overlay: inference sekali dengan threshold mentah, lalu slider
+                # dan pilihan kelas hanya memfilter kotak dan menggambar ulang overlay
+                request_conf = config.RESULT_CACHE_MIN_CONF if overlay_mode else confidence
+                try:
+                    task = submit_image_detection(model, uploaded_img.array, request_conf,
+                                                  tiling=tiling, cascade=cascade, plot=not overlay_mode)
+                except ExecutorBusy as e:
+                    st.warning(str(e))
+                    task = None
+                if task is not None and not task.done():
+                    show_detection_progress(task)
+                elif task is not None and task.status == CANCELLED:
+                    st.info("Deteksi dibatalkan karena digantikan permintaan yang lebih baru.")
+                elif task is not None:
                     try:
-                        result = process_image_detection(model, uploaded_img, confidence)
+                        result = task.result()
                         if result["success"]:
-                            st.image(result["plotted_image"], caption="Hasil Deteksi", use_column_width=True)
-                            detection_results_data = result["detection_data"]
-                            st.success("Deteksi berhasil!")
+                            detections = result["detections"]
+                            if overlay_mode:
+                                shown = st.multiselect("Kelas Ditampilkan", config.CLASSIFICATION,
+                                                       default=config.CLASSIFICATION, key="kelas_tampil")
+                                detections = detections.filter(
+                                    confidence, [config.CLASSIFICATION.index(label) for label in shown])
+                                st.image(render_overlay(uploaded_img.preview(), detections,
+                                                        config.CLASSIFICATION, image_key=upload_id),
+                                         caption="Hasil Deteksi", use_column_width=True)
+                            else:
+                                st.image(make_preview(result["plotted_image"]), caption="Hasil Deteksi",
+                                         use_column_width=True)
+                            if (tiling or cascade) and not result.get("cached"):
+                                stages = ", ".join(f"{k} {v:.0f} ms" for k, v in result["speed"].items())
+                                if tiling:
+                                    info = f"{result['tiles'] - result['tiles_skipped']}/{result['tiles']} tile diproses"
+                                elif result.get("skipped"):
+                                    info = "Gambar tidak lebih besar dari imgsz model, kaskade dilewati (satu pass)"
+                                else:
+                                    info = (f"{result['crops']} potongan gigi dalam {result['mosaics']} mosaik, "
+                                            f"{result['pixels'] / 1e6:.2f} MP diproses")
+                                st.caption(f"{info} | {stages}")
+                            # Tabel memakai koordinat gambar asli, bukan resolusi decode
+                            detection_results_data = uploaded_img.to_original(detections)
+                            st.success(f"Deteksi berhasil! (antre {task.wait_ms:.0f} ms, proses {task.run_ms:.0f} ms)")
                         else:
                             st.error(f"Deteksi gagal: {result.get('error', 'Unknown error')}")
                     except Exception as e:
@@ -84,6 +192,77 @@ def show_image_detection(model, confidence):
             st.image(default_detect, caption="Deteksi Default", use_column_width=True)
 
 
-    if detection_results_data:
+    if detection_results_data is not None:
         st.markdown("---")
         display_detection_results(detection_results_data, config.CLASSIFICATION)
+
+def show_batch_detection(model, confidence):
+    st.subheader("Unggah Serial Gambar Rontgen")
+
+    source_images = st.file_uploader(
+        "Unggah beberapa file (jpg/png/jpeg/bmp/webp)",
+        type=("jpg", "png", "jpeg", "bmp", "webp"),
+        accept_multiple_files=True
+    )
+    batch_size = st.number_input("Jumlah Gambar per Batch", 1, 64, config.INFERENCE_BATCH_SIZE)
+
+    if source_images and st.button("🔍 Deteksi Semua Gambar", type="primary"):
+        with st.spinner(f"Memproses {len(source_images)} gambar..."):
+            try:
+                decode_size = detection_decode_size(model)
+                loaded = [load_image(f, target_size=decode_size) for f in source_images]
+                # Mode overlay: tidak ada result.plot() per gambar; hanya gambar
+                # yang dipilih yang digambar, di atas pratinjau kecil
+                results = predict_batch(
+                    model, [img.array for img in loaded], confidence, batch_size=batch_size,
+                    names=[f.name for f in source_images], cache=get_result_cache(),
+                    plot=config.DETECTION_RENDER != "overlay", pipeline=pipeline_for_model(model)
+                )
+                # Tabel memakai koordinat gambar asli, bukan resolusi decode
+                for img, result in zip(loaded, results):
+                    if result["success"]:
+                        result["detections_original"] = img.to_original(result["detections"])
+                st.session_state.batch_results = results
+            except Exception as e:
+                st.error(f"Terjadi kesalahan saat proses deteksi: {str(e)}")
+                st.stop()
+
+    results = st.session_state.get("batch_results")
+    if not results:
+        return
+
+    # Ringkasan per gambar
+    summary = []
+    for result in results:
+        if result["success"]:
+            counts = result["detections"].class_counts(len(config.CLASSIFICATION))
+            summary.append({
+                "File": result["name"],
+                "Status": "✅ Berhasil",
+                config.CLASSIFICATION[0].capitalize(): counts[0],
+                config.CLASSIFICATION[1].capitalize(): counts[1],
+            })
+        else:
+            summary.append({"File": result["name"], "Status": f"❌ {result['error']}"})
+    st.dataframe(pd.DataFrame(summary), use_container_width=True)
+
+    succeeded = [r for r in results if r["success"]]
+    if not succeeded:
+        return
+
+    selected = st.selectbox("Lihat detail gambar", [r["name"] for r in succeeded])
+    result = next(r for r in succeeded if r["name"] == selected)
+    if result["plotted_image"] is not None:
+        st.image(make_preview(result["plotted_image"]), caption=f"Hasil Deteksi: {selected}",
+                 use_column_width=True)
+    else:
+        source = next((f for f in source_images or [] if f.name == selected), None)
+        if source is None:
+            st.info("Unggah ulang gambar untuk melihat pratinjau hasil deteksi.")
+        else:
+            preview = load_upload(source, detection_decode_size(model)).preview()
+            st.image(render_overlay(preview, result["detections"], config.CLASSIFICATION,
+                                    image_key=f"{source.name}:{source.size}"),
+                     caption=f"Hasil Deteksi: {selected}", use_column_width=True)
+    st.markdown("---")
+    display_detection_results(result["detections_original"], config.CLASSIFICATION)
@@ -1,9 +1,10 @@
 # components/labeling.py
 import streamlit as st
-from PIL import Image
 import os
 import config
-from utils import load_model, process_image_detection, save_yolo_labels
+from utils import load_model
+from labeling_pipeline import LabelingPipeline
+from folder_watcher import get_watcher, stop_watcher
 import pandas as pd
 
 def show_labeling_page():
@@ -26,75 +27,44 @@ def show_labeling_page():
             output_folder = st.text_input("Folder Output Label", "data/labels", key="auto_output")
         
         confidence = st.slider("Confidence Threshold", 0.1, 0.9, 0.4, 0.05)
-        batch_size = st.number_input("Jumlah Gambar per Batch", 1, 100, 10)
+        batch_size = st.number_input("Jumlah Gambar per Batch", 1, 100, config.INFERENCE_BATCH_SIZE)
         
+        resume = st.checkbox("Lewati gambar yang labelnya lebih baru dari model", True)
+        
+        pipeline = st.session_state.get("labeling_pipeline")
         if st.button("🚀 Jalankan Labeling Otomatis", type="primary"):
             if not os.path.exists(input_folder):
                 st.error(f"Folder tidak ditemukan: {input_folder}")
                 return
-                
-            images = [f for f in os.listdir(input_folder) 
-                     if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-            
-            if not images:
-                st.warning("Tidak ada gambar ditemukan di folder tersebut")
-                return
-                
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            results = []
-            
-            for i, img_file in enumerate(images[:batch_size]):
-                try:
-                    # Update progress
-                    progress = (i + 1) / min(batch_size, len(images))
-                    progress_bar.progress(progress)
-                    status_text.text(f"Memproses {i+1}/{min(batch_size, len(images))}: {img_file}")
-                    
-                    # Process image
-                    img_path = os.path.join(input_folder, img_file)
-                    image = Image.open(img_path)
-                    result = process_image_detection(model, image, confidence)
-                    
-                    if result["success"]:
-                        label_path = os.path.join(output_folder, 
-                                               os.path.splitext(img_file)[0] + ".txt")
-                        save_yolo_labels(result["detection_data"], label_path)
-                        results.append({
-                            "File": img_file,
-                            "Status": "✅ Berhasil",
-                            "Objek Terdeteksi": len(result["detection_data"])
-                        })
-                    else:
-                        results.append({
-                            "File": img_file, 
-                            "Status": "❌ Gagal",
-                            "Objek Terdeteksi": 0
-                        })
-                except Exception as e:
-                    results.append({
-                        "File": img_file,
-                        "Status": f"❌ Error: {str(e)}",
-                        "Objek Terdeteksi": 0
-                    })
-            
-            # Show results
-            progress_bar.empty()
-            status_text.empty()
-            st.success(f"Labeling selesai! {len([r for r in results if '✅' in r['Status']])}/{len(results)} berhasil")
-            
-            # Results table
-            df_results = pd.DataFrame(results)
-            st.dataframe(df_results, use_container_width=True)
-            
-            # Sample preview
-            st.subheader("Pratinjau Hasil")
-            cols = st.columns(3)
-            for idx, img_file in enumerate(images[:3]):
-                if idx < len(cols):
-                    with cols[idx]:
-                        st.image(Image.open(os.path.join(input_folder, img_file)), 
-                                caption=img_file, width=200)
+            if pipeline is not None and pipeline.running:
+                st.warning("Labeling sebelumnya masih berjalan. Hentikan dulu atau tunggu selesai.")
+            else:
+                # Semua tahap berjalan di thread latar belakang; halaman hanya memantau
+                st.session_state.labeling_pipeline = LabelingPipeline(
+                    model, input_folder, output_folder, confidence,
+                    batch_size=batch_size, resume=resume
+                ).start()
+        
+        if st.session_state.get("labeling_pipeline") is not None:
+            show_labeling_monitor()
+        
+        st.markdown("---")
+        st.write("#### Pantau Folder")
+        st.caption("Gambar baru di folder gambar otomatis dilabeli tanpa perlu menekan tombol lagi.")
+        watcher = get_watcher(input_folder, output_folder, confidence, start=False)
+        if watcher is None:
+            relabel = st.checkbox("Labeli ulang di latar belakang saat model berganti", False)
+            if st.button("👁️ Mulai Pantau Folder"):
+                if not os.path.exists(input_folder):
+                    st.error(f"Folder tidak ditemukan: {input_folder}")
+                else:
+                    get_watcher(input_folder, output_folder, confidence, relabel=relabel)
+                    st.rerun()
+        else:
+            show_watcher_status(watcher)
+            if st.button("⏹️ Berhenti Memantau"):
+                stop_watcher(input_folder, output_folder)
+                st.rerun()
     
     with tab2:
         st.subheader("Labeling Manual/Review")
@@ -156,4 +126,62 @@ def show_labeling_page():
                     os.makedirs(manual_label, exist_ok=True)
                     with open(label_path, "w") as f:
                         f.write(new_labels)
-                    st.success("Label berhasil disimpan!")
\ No newline at end of file
+                    st.success("Label berhasil disimpan!")
+
+
+@st.fragment(run_every=2)
+def show_labeling_monitor():
+    """Progres dan throughput per tahap pipeline labeling otomatis"""
+    pipeline = st.session_state.labeling_pipeline
+    status = pipeline.status()
+    
+    processed = status["written"] + status["skipped"] + status["failed"]
+    total = max(status["found"], 1)
+    text = f"{processed}/{status['found']}{'' if status['scan_done'] else '+'} gambar"
+    st.progress(min(processed / total, 1.0), text=text)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Label Ditulis", status["written"])
+    col2.metric("Dilewati", status["skipped"])
+    col3.metric("Gagal", status["failed"])
+    col4.metric("Gambar/detik", f"{status['images_per_s'] or 0:.1f}")
+    
+    st.dataframe(pd.DataFrame([
+        {"Tahap": stage, "Item": stats["items"], "Waktu Sibuk (s)": stats["busy_s"],
+         "Item/detik": stats["items_per_s"], "Antrean Masuk": queue}
+        for (stage, stats), queue in zip(
+            status["stages"].items(),
+            [None, status["queues"]["paths"], status["queues"]["decoded"], status["queues"]["labels"]]
+        )
+    ]), hide_index=True, use_container_width=True)
+    
+    if status["errors"]:
+        with st.expander(f"Error ({status['failed']})"):
+            st.dataframe(pd.DataFrame(status["errors"]), use_container_width=True)
+    
+    if status["running"]:
+        if st.button("⏹️ Hentikan Labeling"):
+            pipeline.cancel()
+    elif status["cancelled"]:
+        st.warning(f"Labeling dihentikan setelah {status['written']} label ditulis.")
+    else:
+        st.success(f"Labeling selesai! {status['written']} label ditulis, "
+                   f"{status['skipped']} dilewati, {status['failed']} gagal "
+                   f"dalam {status['elapsed_s']:.1f} detik")
+
+
+@st.fragment(run_every=2)
+def show_watcher_status(watcher):
+    """Status pemantau folder yang berjalan di latar belakang"""
+    status = watcher.status()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Label Baru", status["labeled"])
+    col2.metric("Dilabeli Ulang", status["relabeled"])
+    col3.metric("Menunggu", status["pending"])
+    col4.metric("Mode", status["mode"])
+    if status.get("indexed"):
+        st.caption(f"{status['current_model']}/{status['indexed']} gambar dilabeli dengan model aktif "
+                   f"({status['model']})" + (f", {status['failed']} gagal" if status.get("failed") else ""))
+    if status["errors"]:
+        with st.expander(f"Error ({len(status['errors'])})"):
+            st.dataframe(pd.DataFrame(status["errors"]), use_container_width=True)
@@ -1,10 +1,7 @@
 import os
-import shutil
-import cv2
-import numpy as np
-from PIL import Image
 import streamlit as st
 from pathlib import Path
+from preprocessing_engine import IMAGE_PATTERN, run_preprocessing
 
 def show_preprocessing_page():
     
@@ -22,41 +19,23 @@ def show_preprocessing_page():
         penghilangan_noise = st.checkbox("Penghilangan Noise", True)
         peningkatan_kontras = st.checkbox("Peningkatan Kontras", False)
         
+        st.subheader("Format Output")
+        buat_shard = st.checkbox("Paket juga sebagai shard", False,
+                                 help="Gabungkan hasil ke beberapa file besar yang cepat disalin ke mesin training")
+        folder_shard = st.text_input("Folder Shard", "runs/shards/karies") if buat_shard else None
+        
         if st.button("🚀 Mulai Preprocessing", type="primary"):
             proses_dataset(folder_input, folder_output, ukuran_gambar, kolom_visual,
-                         perbaikan_ketajaman, penghilangan_noise, peningkatan_kontras)
+                         perbaikan_ketajaman, penghilangan_noise, peningkatan_kontras,
+                         folder_shard)
     
     with kolom_visual:
         st.subheader("Visualisasi Proses")
         if not st.session_state.get('sedang_proses'):
             st.info("Atur konfigurasi dan jalankan preprocessing untuk melihat visualisasi")
 
-def perbaikan_gambar(img, ketajaman=True, noise=True, kontras=False):
-    """Menerapkan teknik peningkatan kualitas gambar"""
-    # Konversi dari PIL Image ke format OpenCV (BGR)
-    img_cv = np.array(img)[:, :, ::-1].copy()  # RGB ke BGR
-    
-    if noise:
-        img_cv = cv2.fastNlMeansDenoisingColored(img_cv, None, 10, 10, 7, 21)
-    
-    if ketajaman:
-        kernel = np.array([[0, -1, 0],
-                         [-1, 5, -1],
-                         [0, -1, 0]])
-        img_cv = cv2.filter2D(img_cv, -1, kernel)
-    
-    if kontras:
-        lab = cv2.cvtColor(img_cv, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-        l = clahe.apply(l)
-        img_cv = cv2.merge((l,a,b))
-    
-    # Konversi kembali ke PIL Image
-    return Image.fromarray(img_cv[:, :, ::-1])  # BGR ke RGB
-
 def proses_dataset(folder_input, folder_output, ukuran_gambar, kolom_visual,
-                  ketajaman, noise, kontras):
+                  ketajaman, noise, kontras, folder_shard=None):
     path_input = Path(folder_input)
     path_output = Path(folder_output)
     
@@ -70,70 +49,47 @@ def proses_dataset(folder_input, folder_output, ukuran_gambar, kolom_visual,
         tempat_gambar = kolom_visual.empty()
         tempat_metrics = kolom_visual.empty()
         
-        total_file = 0
-        file_terproses = 0
+        def update_progress(file_terproses, total_file, nama_file):
+            # Dipanggil engine dengan laju terbatas, bukan per file
+            progress_bar.progress(file_terproses / total_file if total_file else 1.0)
+            if nama_file:
+                status_text.text(f"🔧 Memproses: {nama_file}")
+            tempat_metrics.markdown(f"""
+            **Status Proses**
+            - File diproses: `{file_terproses}/{total_file}`
+            - Worker: `{os.cpu_count()}` proses
+            - Ukuran Gambar: `{ukuran_gambar}x{ukuran_gambar}`
+            """)
+        
+        ringkasan = run_preprocessing(path_input, path_output, ukuran_gambar,
+                                      ketajaman, noise, kontras,
+                                      progress=update_progress, shard_dir=folder_shard)
         
-        # Hitung total file dulu
-        for bagian in ['train', 'valid']:
-            dir_gambar = path_input / bagian / 'images'
-            total_file += len(list(dir_gambar.glob("*.[jJpP]*[gG]")))
+        # Tampilkan sebelum/sesudah untuk satu contoh saja
+        contoh = next((path_input / 'train' / 'images').glob(IMAGE_PATTERN), None)
+        if contoh is not None and (path_output / 'train' / 'images' / contoh.name).exists():
+            kolom = tempat_gambar.columns(2)
+            kolom[0].image(str(contoh), caption="Asli", use_column_width=True)
+            kolom[1].image(str(path_output / 'train' / 'images' / contoh.name),
+                           caption=f"Hasil Perbaikan {ukuran_gambar}px",
+                           use_column_width=True)
         
-        # Proses file
-        for bagian in ['train', 'valid']:
-            dir_gambar = path_input / bagian / 'images'
-            dir_label = path_input / bagian / 'labels'
-            
-            # Buat folder output
-            (path_output / bagian / 'images').mkdir(parents=True, exist_ok=True)
-            (path_output / bagian / 'labels').mkdir(parents=True, exist_ok=True)
-            
-            for file_gambar in dir_gambar.glob("*.[jJpP]*[gG]"):
-                try:
-                    file_terproses += 1
-                    progress = file_terproses / total_file
-                    
-                    # Update UI
-                    progress_bar.progress(progress)
-                    status_text.text(f"🔧 Memproses {bagian}: {file_gambar.name}")
-                    
-                    # Proses dan tampilkan gambar
-                    with Image.open(file_gambar) as img:
-                        # Tampilkan sebelum/sesudah
-                        kolom = tempat_gambar.columns(2)
-                        kolom[0].image(img, caption="Asli", use_column_width=True)
-                        
-                        # Lakukan perbaikan gambar
-                        img_diperbaiki = perbaikan_gambar(img, ketajaman, noise, kontras)
-                        img_resize = img_diperbaiki.resize((ukuran_gambar, ukuran_gambar))
-                        
-                        kolom[1].image(img_resize, 
-                                     caption=f"Hasil Perbaikan {ukuran_gambar}px", 
-                                     use_column_width=True)
-                        
-                        # Simpan gambar yang sudah diproses
-                        img_resize.save(path_output / bagian / 'images' / file_gambar.name)
-                    
-                    # Salin label yang sesuai
-                    file_label = dir_label / f"{file_gambar.stem}.txt"
-                    if file_label.exists():
-                        shutil.copy(file_label, path_output / bagian / 'labels' / file_label.name)
-                    
-                    # Update metrics
-                    tempat_metrics.markdown(f"""
-                    **Status Proses**
-                    - File diproses: `{file_terproses}/{total_file}`
-                    - Bagian: `{bagian}`
-                    - Ukuran Gambar: `{ukuran_gambar}x{ukuran_gambar}`
-                    """)
-                    
-                except Exception as e:
-                    kolom_visual.error(f"⚠️ Gagal memproses {file_gambar.name}: {str(e)}")
+        for nama_file, error in ringkasan["gagal"]:
+            kolom_visual.error(f"⚠️ Gagal memproses {nama_file}: {error}")
+        for nama_file, error in ringkasan["gagal_shard"]:
+            kolom_visual.warning(f"⚠️ Gagal dipaket ke shard {nama_file}: {error}")
         
-        kolom_visual.success("✔️ Preprocessing selesai dengan sukses!")
+        kolom_visual.success(
+            f"✔️ Preprocessing selesai dalam {ringkasan['durasi']:.1f} detik: "
+            f"{ringkasan['diproses']} diproses, {ringkasan['dilewati']} dilewati (sudah up to date)"
+        )
+        if ringkasan["shards"]:
+            kolom_visual.info(f"📦 Shard ditulis ke `{folder_shard}`: " +
+                              ", ".join(f"{split} {jumlah} gambar" for split, jumlah in ringkasan["shards"].items()))
         
     except Exception as e:
         kolom_visual.error(f"❌ Error fatal: {str(e)}")
     finally:
         st.session_state.sedang_proses = False
         progress_bar.empty()
-        status_text.empty()
\ No newline at end of file
+        status_text.empty()
@@ -1,4 +1,9 @@
-from ultralytics import YOLO
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from job_queue import get_job_queue
 
 # Path ke file konfigurasi dataset
 DATASET_CONFIG = 'config/karies.yaml'  # pastikan file ini sudah ada dan benar
@@ -6,14 +11,28 @@ DATASET_CONFIG = 'config/karies.yaml'  # pastikan file ini sudah ada dan benar
 # Pilih model YOLO11 yang akan dilatih (bisa yolo11n.pt, yolo11s.pt, dst)
 MODEL = 'yolo11n.pt'
 
-# Mulai training
+
+def print_event(event):
+    if event["event"] == "epoch":
+        print(f"Epoch {event['epoch']}/{event['epochs']}  box_loss={event['box_loss']:.4f}  "
+              f"mAP50={event['map50']:.3f}  mAP50-95={event['map50_95']:.3f}  {event['epoch_time']:.1f}s")
+    elif event["event"] == "end":
+        print(f"Training selesai, model terbaik: {event.get('best')}")
+    elif event["event"] == "error":
+        print(f"Training gagal: {event['error']}")
+
+
+# Mulai training lewat antrian job yang sama dengan halaman web
 if __name__ == "__main__":
-    model = YOLO(MODEL)
-    model.train(
-        data=DATASET_CONFIG,
+    queue = get_job_queue()
+    job = queue.submit(
+        DATASET_CONFIG,
+        MODEL,
         epochs=100,           # jumlah epoch, bisa disesuaikan
-        imgsz=640,            # ukuran gambar
         batch=16,             # batch size, sesuaikan dengan GPU
-        project='runs/train',
-        name='karies_yolo11'
+        imgsz=640,            # ukuran gambar
+        source='cli',
     )
+    print(f"Job #{job['id']} ({job['run_name']}) status: {job['status']}")
+    job = queue.wait(job['id'], on_event=print_event)
+    print(f"Job #{job['id']} berakhir dengan status: {job['status']}")
@@ -1,6 +1,10 @@
 import os
+import pandas as pd
 import streamlit as st
 from utils import start_training
+from job_queue import ACTIVE_STATUSES, get_job_queue, start_scheduler
+from training_worker import read_events
+from dataset_index import build_index
 from components.preprocessing import show_preprocessing_page
 
 def show_training_page():
@@ -18,15 +22,25 @@ def show_training_page():
         </div>
         """, unsafe_allow_html=True)
         
+        dataset_config = st.text_input(
+            "Path config.yaml",
+            st.session_state.get("dataset_config", "config/karies.yaml"),
+            help="File konfigurasi dataset YOLOv11"
+        )
+        # Ringkasan dataset tampil begitu path diisi; training baru bisa dimulai setelah dataset terbaca
+        index = None
+        if not os.path.exists(dataset_config):
+            st.error("File config.yaml tidak ditemukan")
+        elif not dataset_config.endswith(".yaml"):
+            st.error("File konfigurasi harus berformat .yaml")
+        else:
+            st.session_state.dataset_config = dataset_config
+            index = show_dataset_summary(dataset_config)
+
         with st.form("training_form"):
             col1, col2 = st.columns(2)
             
             with col1:
-                dataset_config = st.text_input(
-                    "Path config.yaml",
-                    "config/karies.yaml",
-                    help="File konfigurasi dataset YOLOv11"
-                )
                 model_arch = st.selectbox(
                     "Arsitektur Model",
                     ["yolo11n.pt", "yolo11s.pt", "yolo11m.pt", "yolo11l.pt"],
@@ -45,58 +59,171 @@ def show_training_page():
                     [320, 416, 512, 640],
                     index=3
                 )
-            
-            # Initialize progress bar and metrics display
-            progress_bar = st.empty()
-            loss_metric = st.empty()
-            acc_metric = st.empty()
-            
-            if st.form_submit_button("🚀 Mulai Training", type="primary"):
-                config_path = dataset_config
 
-                if not os.path.exists(config_path):
-                    st.error("File config.yaml tidak ditemukan")
-                elif not config_path.endswith(".yaml"):
-                    st.error("File konfigurasi harus berformat .yaml")
+            confirmed = True
+            if index is not None and index.issues():
+                confirmed = st.checkbox("Saya sudah memeriksa masalah dataset di atas dan tetap ingin melanjutkan")
+            
+            if st.form_submit_button("🚀 Mulai Training", type="primary", disabled=index is None):
+                if not confirmed:
+                    st.error("Konfirmasi masalah dataset terlebih dahulu")
                 else:
-                    try:
-                        # Create a simple progress updater
-                        def update_progress(epoch, total_epochs):
-                            progress = (epoch + 1) / total_epochs
-                            progress_bar.progress(progress)
-                            return {
-                                'loss': 0.5 * (1 - progress),  # Simulated loss
-                                'accuracy': progress * 100  # Simulated accuracy
-                            }
-                        
-                        # Display initial state
-                        progress_bar.progress(0)
-                        loss_metric.metric("Loss", "0.0000")
-                        acc_metric.metric("Accuracy", "0.00%")
-                        
-                        with st.spinner("Training sedang berjalan..."):
-                            # Start training without callback
-                            success = start_training(
-                                config_path,
-                                model_arch,
-                                epochs,
-                                batch_size,
-                                img_size
-                            )
-                            
-                            # Simulate progress updates
-                            for epoch in range(epochs):
-                                metrics = update_progress(epoch, epochs)
-                                loss_metric.metric("Loss", f"{metrics['loss']:.4f}")
-                                acc_metric.metric("Accuracy", f"{metrics['accuracy']:.2f}%")
-                                
-                            if success:
-                                st.success("🎉 Training selesai!")
-                            else:
-                                st.error("Training gagal, silakan cek log untuk detail")
-                                
-                    except Exception as e:
-                        st.error(f"Gagal training: {str(e)}")
-                        progress_bar.empty()
-                        loss_metric.empty()
-                        acc_metric.empty()
+                    job = start_training(
+                        dataset_config,
+                        model_arch,
+                        epochs,
+                        batch_size,
+                        img_size
+                    )
+                    if job:
+                        st.session_state.training_job = {"id": job["id"], "offset": 0, "events": []}
+
+        show_dataset_query(st.session_state.get("dataset_config", "config/karies.yaml"))
+        if st.session_state.get("training_job"):
+            show_training_monitor()
+        show_job_queue()
+
+def get_dataset_index(dataset_config, refresh=False):
+    """
+    Indeks dataset per path YAML, disimpan di session_state agar rerun (mis.
+    menggeser slider) tidak memindai folder dataset lagi. Disegarkan bila
+    YAML berubah atau `refresh`.
+    """
+    key = (os.path.abspath(dataset_config), os.stat(dataset_config).st_mtime_ns)
+    indexes = st.session_state.setdefault("dataset_indexes", {})
+    if refresh or key not in indexes:
+        indexes.clear()
+        indexes[key] = build_index(dataset_config)
+    return indexes[key]
+
+
+def show_dataset_summary(dataset_config):
+    """Ringkasan statistik dan integritas dataset sebelum training dimulai"""
+    refresh = st.button("🔄 Pindai Ulang Dataset", help="Baca ulang label yang berubah sejak pemindaian terakhir")
+    try:
+        index = get_dataset_index(dataset_config, refresh)
+    except Exception as e:
+        st.warning(f"Statistik dataset tidak bisa dihitung: {e}")
+        return None
+
+    st.subheader("📊 Ringkasan Dataset")
+    rows = []
+    for split, stats in index.summary().items():
+        row = {
+            "Split": split,
+            "Gambar": stats["images"],
+            "Berlabel": stats["labeled"],
+            "Tanpa Label": stats["without_label"],
+            "Label Kosong": stats["empty_labels"],
+            "Label Tanpa Gambar": stats["label_only"],
+            "Baris Rusak": stats["malformed"],
+            "Kotak/Gambar": round(stats["boxes_per_image_mean"], 2),
+        }
+        for name, cls in stats["classes"].items():
+            row[f"{name} (kotak)"] = cls["boxes"]
+            row[f"{name} (luas median)"] = round(cls["area_p50"], 4) if cls["area_p50"] is not None else None
+        rows.append(row)
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption(f"{len(index)} gambar, {len(index.box_cls)} kotak; "
+               f"{index.stats['parsed']} dari {index.stats['label_files']} file label dibaca ulang "
+               f"({index.stats['seconds']:.2f} detik)")
+
+    issues = index.issues()
+    if issues:
+        st.warning(f"Ditemukan {len(issues)} masalah integritas dataset")
+        with st.expander("Detail masalah dataset"):
+            st.dataframe(pd.DataFrame(issues), hide_index=True, use_container_width=True)
+    return index
+
+
+def show_dataset_query(dataset_config):
+    """Cari gambar di dataset berdasarkan jumlah kotak per kelas"""
+    with st.expander("🔎 Cari Gambar di Dataset"):
+        try:
+            index = get_dataset_index(dataset_config)
+        except Exception as e:
+            st.warning(f"Dataset tidak bisa diindeks: {e}")
+            return
+        col1, col2, col3 = st.columns(3)
+        cls = col1.selectbox("Kelas", index.names) if index.names else None
+        min_count = col2.number_input("Minimal jumlah kotak", 1, 100, 4)
+        split = col3.selectbox("Split", ["semua"] + index.splits)
+        names = index.images_with(cls, min_count=min_count, split=None if split == "semua" else split)
+        st.write(f"{len(names)} gambar")
+        if names:
+            st.dataframe(pd.DataFrame({"Gambar": names}), hide_index=True, use_container_width=True)
+
+
+@st.fragment(run_every=2)
+def show_training_monitor():
+    """Panel metrik training yang membaca file metrik worker secara bertahap"""
+    queue = get_job_queue()
+    monitor = st.session_state.training_job
+    job = queue.status(monitor["id"])
+    if job is None:
+        return
+    events, monitor["offset"] = read_events(job["metrics_file"], monitor["offset"])
+    monitor["events"].extend(events)
+
+    epochs = [e for e in monitor["events"] if e["event"] == "epoch"]
+    end = next((e for e in monitor["events"] if e["event"] == "end"), None)
+    error = next((e for e in monitor["events"] if e["event"] == "error"), None)
+
+    st.markdown("---")
+    st.subheader(f"Progres Training #{job['id']} ({job['run_name']})")
+    if job["status"] == "queued":
+        st.info("Menunggu giliran di antrian" + (" (akan dilanjutkan dari last.pt)" if job["resume"] else "") + "...")
+    done = epochs[-1]["epoch"] if epochs else 0
+    st.progress(done / job["epochs"], text=f"Epoch {done}/{job['epochs']}")
+
+    if epochs:
+        last = epochs[-1]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Box Loss", f"{last['box_loss']:.4f}")
+        col2.metric("mAP50", f"{last['map50']:.3f}")
+        col3.metric("mAP50-95", f"{last['map50_95']:.3f}")
+        col4.metric("Waktu/Epoch", f"{last['epoch_time']:.1f} s")
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Gambar/detik", f"{last['images_per_s'] or 0:.1f}")
+        col2.metric("CPU", f"{last.get('cpu_percent', 0):.0f}%")
+        if "gpu_percent" in last or "gpu_mem_mb" in last:
+            col3.metric("GPU", f"{last.get('gpu_percent', '-')}% / {last.get('gpu_mem_mb', 0):.0f} MB")
+
+        df = pd.DataFrame(epochs).set_index("epoch")
+        chart1, chart2 = st.columns(2)
+        chart1.line_chart(df[["box_loss", "cls_loss", "dfl_loss"]])
+        chart2.line_chart(df[["map50", "map50_95"]])
+
+    if job["status"] == "cancelled":
+        st.warning("Training dibatalkan.")
+    elif error or job["status"] == "failed":
+        st.error(f"Training gagal: {error['error'] if error else job['error']}")
+    elif end:
+        if end.get("best"):
+            st.success(f"🎉 Training selesai! Model terbaik disimpan di: `{end['best']}`")
+            st.info("Model deteksi akan otomatis diperbarui untuk sesi berikutnya.")
+        else:
+            st.warning(f"Training selesai! Namun model terbaik tidak ditemukan. Cek folder `{end['save_dir']}`.")
+    elif job["status"] in ACTIVE_STATUSES:
+        if st.button("⏹️ Hentikan Training"):
+            queue.cancel(job["id"])
+
+
+def show_job_queue():
+    """Tabel job training terbaru dari antrian"""
+    # Memastikan scheduler berjalan agar job yang terputus dilanjutkan
+    jobs = start_scheduler().list_jobs(limit=10)
+    if not jobs:
+        return
+    with st.expander("📋 Antrian Training"):
+        st.dataframe(pd.DataFrame([{
+            "ID": job["id"],
+            "Run": job["run_name"],
+            "Status": job["status"],
+            "Model": job["params"]["model"],
+            "Epochs": job["epochs"],
+            "Thread": job["threads"],
+            "Percobaan": job["attempts"],
+            "Sumber": job["source"],
+        } for job in jobs]), hide_index=True, use_container_width=True)
@@ -1,6 +1,5 @@
 # config.py
 from pathlib import Path
-import re
 
 # Setup paths
 FILE = Path(__file__).resolve()
@@ -18,45 +17,128 @@ DEFAULT_DETECT_IMAGE = IMAGES_DIR / 'detectedimage1.jpg'
 
 # Base path for trained models
 TRAIN_RUNS_DIR = ROOT / 'runs' / 'train'
+TRAIN_LOGS_DIR = ROOT / 'runs' / 'logs'   # metrik per epoch dari training_worker.py
+RUN_CATALOG_DB = ROOT / 'runs' / 'catalog.sqlite'
+MODEL_SELECTION = 'best'      # 'best' (mAP50-95 tertinggi), 'latest' atau 'pinned'
 
-# --- Fungsi untuk mendapatkan path model terbaik terbaru secara dinamis ---
-def get_latest_trained_model_path(base_name='karies_yolo11_web3'):
+# --- Model deteksi terpilih dari katalog run (lihat run_catalog.py) ---
+def get_latest_trained_model_path(selection=None):
     """
-    Mencari folder training terbaru (berdasarkan nama dan angka tertinggi)
-    dan mengembalikan path ke best.pt di dalamnya.
+    Path best.pt dari katalog run sesuai MODEL_SELECTION ('best', 'latest'
+    atau 'pinned'), atau None bila belum ada run dengan best.pt.
     """
-    latest_run_path = None
-    latest_run_number = -1 # Untuk mencari angka tertinggi
-
-    if not TRAIN_RUNS_DIR.exists():
-        return None # Folder runs/train belum ada
-
-    # Pola regex untuk mencari folder 'karies_yolo11_web' diikuti dengan angka opsional
-    # Misalnya: karies_yolo11_web, karies_yolo11_web1, karies_yolo11_web2
-    pattern = re.compile(rf"^{re.escape(base_name)}(\d*)$")
-
-    for folder in TRAIN_RUNS_DIR.iterdir():
-        if folder.is_dir():
-            match = pattern.match(folder.name)
-            if match:
-                # Ambil nomor di akhir nama folder, atau 0 jika tidak ada nomor (e.g., 'karies_yolo11_web')
-                current_run_number = int(match.group(1)) if match.group(1) else 0
-                
-                if current_run_number > latest_run_number:
-                    latest_run_number = current_run_number
-                    latest_run_path = folder / 'weights' / 'best.pt'
-                    
-                    # Cek apakah best.pt benar-benar ada di folder ini
-                    if not latest_run_path.exists():
-                        latest_run_path = None # Reset jika best.pt tidak ada
-    
-    return latest_run_path
+    from run_catalog import select_model
+    return select_model(selection)
 
 # Model paths
-DETECTION_MODEL = str(get_latest_trained_model_path() or (MODEL_DIR / 'yolo11n.pt')) 
+DETECTION_MODEL = str(MODEL_DIR / 'yolo11n.pt')  # cadangan bila katalog belum punya best.pt
 SEGMENTATION_MODEL = str(MODEL_DIR / 'yolo11n-seg.pt')
 POSE_ESTIMATION_MODEL = str(MODEL_DIR / 'yolo11n-pose.pt')
 
 # Constants
 CLASSIFICATION = ["karies", "gigi"]
-SOURCES_LIST = ['Image', ]
+SOURCES_LIST = ['Image', 'Batch']
+
+# Cache model (lihat model_registry.py)
+MODEL_CACHE_SIZE = 3          # jumlah model maksimum yang tinggal di memori
+MODEL_WARMUP_IMGSZ = 640      # ukuran gambar dummy untuk warm-up, 0 = tanpa warm-up
+MODEL_RESCAN_INTERVAL = 10    # detik antar pembacaan ulang katalog run untuk best.pt baru
+
+# Inference batch (lihat inference.py)
+INFERENCE_BATCH_SIZE = 8      # jumlah gambar per forward pass
+INFERENCE_IMGSZ = None        # ukuran letterbox bersama, None = ikut imgsz saat training
+
+# Executor inference halaman deteksi (lihat inference_executor.py)
+INFERENCE_WORKERS = 1               # thread inference; predictor Ultralytics tidak aman dipakai paralel
+INFERENCE_MAX_PENDING = 32          # tugas antre maksimum di seluruh proses
+INFERENCE_MAX_PENDING_PER_USER = 4  # tugas antre maksimum per user
+INFERENCE_POLL_INTERVAL = 1.0       # detik antar pengecekan status tugas di UI
+
+# Metrik latensi dan log (lihat telemetry.py)
+METRICS_ENABLED = True              # False = stage_timer/observe tidak mengukur apa pun
+METRICS_HOST = '127.0.0.1'          # endpoint /metrics proses Streamlit hanya untuk lokal
+METRICS_PORT = 9108                 # None = tanpa endpoint di proses Streamlit (server.py tetap punya /metrics)
+METRICS_TRACE_FILE = None           # mis. ROOT / 'runs' / 'trace.jsonl' untuk log per pengukuran
+LOG_LEVEL = 'INFO'                  # 'DEBUG' menampilkan log diagnostik (mis. path validasi dataset)
+
+# Pemasangan karies ke gigi (lihat tooth_assignment.py)
+TOOTH_MIN_OVERLAP = 0.3             # bagian luas kotak karies minimum yang harus berada di kotak gigi
+ASSIGN_DENSE_MAX_PAIRS = 100_000    # di atas jumlah pasangan karies x gigi ini dipakai indeks grid
+
+# Cache hasil inference (lihat result_cache.py)
+RESULT_CACHE_MIN_CONF = 0.1                         # threshold mentah yang disimpan di cache
+RESULT_CACHE_MAX_BYTES = 64 * 1024 ** 2             # batas memori tingkat RAM
+RESULT_CACHE_DB = ROOT / 'runs' / 'cache' / 'results.sqlite'  # None = tanpa cache disk
+RESULT_CACHE_DB_MAX_ROWS = 50_000                   # baris maksimum cache disk (tertua dibuang)
+
+# Server inference HTTP (lihat server.py)
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 8000
+SERVER_CONFIDENCE = 0.4       # confidence default bila klien tidak mengirim
+SERVER_MAX_BATCH = 8          # ukuran micro-batch maksimum
+SERVER_BATCH_WINDOW_MS = 10   # lama menunggu permintaan lain sebelum batch dijalankan
+SERVER_USE_RESULT_CACHE = True  # matikan saat uji beban agar tiap request benar-benar di-inference
+SERVER_DECODE_WORKERS = 4     # thread decode gambar, terpisah dari thread inference
+
+# Backend runtime inference (lihat export_model.py)
+INFERENCE_BACKEND = 'auto'    # 'auto', 'pytorch', 'onnx', 'onnx-int8' atau 'openvino'
+BACKEND_MAX_MAP_DELTA = 0.01  # penurunan mAP50 maksimum agar backend dianggap setara
+BACKEND_MIN_BOX_IOU = 0.9     # rata-rata IoU kotak minimum terhadap model .pt
+
+# Antrian job training (lihat job_queue.py)
+TRAIN_QUEUE_DB = ROOT / 'runs' / 'jobs.sqlite'
+TRAIN_MAX_CONCURRENT_JOBS = 1     # jumlah training yang boleh berjalan bersamaan
+TRAIN_THREADS_PER_JOB = None      # batas thread CPU per job, None = cpu_count / job bersamaan
+TRAIN_RUN_PREFIX = 'karies_yolo11_job'  # nama run: karies_yolo11_job0001, ...
+TRAIN_MAX_ATTEMPTS = 3            # berapa kali job yang terputus dilanjutkan dari last.pt
+
+# Inference bertile untuk rontgen panoramik (lihat tiled_inference.py)
+TILE_SIZE = 640               # sisi tile dalam piksel gambar asli (juga imgsz tiap tile)
+TILE_OVERLAP = 0.2            # fraksi tumpang tindih antar tile
+TILE_SKIP_EMPTY = True        # lewati tile yang hampir seragam (latar di tepi rontgen)
+TILE_EMPTY_STD = 4.0          # simpangan baku piksel di bawah ini dianggap tile kosong
+TILE_MERGE = 'nms'            # 'nms' atau 'wbf' untuk menggabungkan kotak di sambungan tile
+TILE_MERGE_IOU = 0.5
+TILE_INCLUDE_FULL = True      # tambahkan satu pass gambar utuh untuk objek besar (tooth)
+
+# Inference kaskade gigi -> karies (lihat cascade_inference.py)
+CASCADE_COARSE_IMGSZ = 320    # resolusi tahap 1 untuk mencari gigi
+CASCADE_FINE_IMGSZ = 640      # sisi mosaik potongan gigi di tahap 2
+CASCADE_TOOTH_CONF = 0.25     # confidence minimum kotak gigi yang dipotong
+CASCADE_CROP_PADDING = 0.15   # perbesar potongan gigi (fraksi sisi) agar karies di tepi ikut
+CASCADE_MAX_CROPS = 48        # batas potongan per gambar
+CASCADE_MAX_FINE_PIXELS = 819_200   # 2 mosaik 640 x 640; batas total piksel mosaik potongan di tahap 2
+CASCADE_TOOTH_CLASS = 1       # dipakai bila model.names tidak memuat 'tooth'
+CASCADE_CAVITY_CLASS = 0      # dipakai bila model.names tidak memuat 'cavity'
+
+# Pipeline labeling otomatis (lihat labeling_pipeline.py)
+LABELING_DECODE_WORKERS = 4   # thread decoder gambar
+LABELING_WRITE_WORKERS = 2    # thread penulis file label
+LABELING_QUEUE_SIZE = 64      # panjang maksimum setiap antrean antar tahap
+LABELING_MAX_ERRORS = 200     # error terakhir yang disimpan di memori pipeline
+
+# Pemantau folder labeling otomatis (lihat folder_watcher.py)
+WATCHER_DEBOUNCE = 2.0        # detik ukuran/mtime file harus stabil sebelum diproses
+WATCHER_POLL_INTERVAL = 5.0   # detik antar pemindaian bila watchdog tidak tersedia
+WATCHER_MAX_ERRORS = 200      # error terakhir yang disimpan di memori watcher
+
+# Indeks statistik dataset (lihat dataset_index.py)
+DATASET_INDEX_DIR = ROOT / 'runs' / 'cache' / 'datasets'  # cache hasil parse label per dataset
+
+# Deteksi duplikat dan kebocoran antar split (lihat near_duplicates.py)
+DEDUP_RADIUS = 6              # jarak Hamming pHash 64 bit maksimum yang dianggap duplikat
+
+# Format dataset terpaket (lihat shard_dataset.py)
+SHARD_SIZE_MB = 256           # ukuran maksimum satu file shard
+
+# Pemuat gambar (lihat image_loader.py)
+MAX_IMAGE_PIXELS = 100_000_000  # tolak gambar di atas 100 MP sebelum didecode
+PREVIEW_MAX_SIDE = 1024         # sisi terpanjang gambar yang dikirim ke browser
+
+# Render hasil deteksi (lihat overlay.py)
+DETECTION_RENDER = 'overlay'    # 'overlay' = kotak di atas pratinjau kecil, 'plot' = result.plot() resolusi penuh
+PREVIEW_JPEG_QUALITY = 85       # kualitas JPEG pratinjau dan overlay yang dikirim ke browser
+OVERLAY_CACHE_MAX_BYTES = 32 * 1024 ** 2  # batas memori cache JPEG overlay
+
+# Waktu mulai aplikasi (lihat benchmarks/startup_benchmark.py)
+STARTUP_BUDGET_MS = 1500        # batas impor jalur login (proses dingin) sebelum benchmark gagal
@@ -0,0 +1,439 @@
+# dataset_index.py
+"""
+Indeks statistik dan integritas dataset YOLO.
+
+Semua file label di <split>/labels diparse sekaligus menjadi satu tabel
+NumPy (satu baris per kotak: gambar, kelas, xc, yc, w, h), lalu dihitung
+statistik per split: keseimbangan kelas, distribusi ukuran kotak, gambar
+tanpa label, label tanpa gambar, label kosong dan baris rusak.
+
+Indeks disimpan di DATASET_INDEX_DIR dengan kunci ukuran + mtime setiap file
+label, sehingga pemindaian ulang dataset besar hanya membaca file yang
+berubah. Indeks bisa di-query, misalnya gambar dengan lebih dari 3 karies:
+
+    index = build_index("config/karies.yaml")
+    index.images_with("cavity", min_count=4)
+
+    python dataset_index.py config/karies.yaml --query cavity 4
+    python dataset_index.py config/karies.yaml --parquet runs/dataset.parquet
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+import config
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+INDEX_VERSION = 1
+SPLIT_KEYS = (("train", "train"), ("valid", "val"), ("test", "test"))
+
+
+def resolve_splits(dataset_config):
+    """Baca YAML dataset -> (nama kelas, {split: folder gambar}) dengan aturan path seperti YOLO"""
+    with open(dataset_config, "r") as f:
+        data_yaml = yaml.safe_load(f) or {}
+
+    config_dir = os.path.dirname(os.path.abspath(dataset_config))
+    base_path = data_yaml.get("path", "")
+    if not base_path:
+        base_path = config_dir
+    elif not os.path.isabs(base_path):
+        base_path = os.path.abspath(os.path.join(config_dir, base_path))
+
+    splits = {}
+    for split, key in SPLIT_KEYS:
+        rel = data_yaml.get(key)
+        if rel:
+            splits[split] = Path(os.path.normpath(os.path.join(base_path, rel)))
+
+    names = data_yaml.get("names", [])
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+    return list(names), splits
+
+
+def labels_dir_for(images_dir):
+    """Konvensi YOLO: .../images -> .../labels"""
+    images_dir = Path(images_dir)
+    if images_dir.name == "images":
+        return images_dir.parent / "labels"
+    return images_dir
+
+
+def _scan(folder, suffixes):
+    """{stem: (nama, ukuran, mtime_ns)} file dengan akhiran tertentu"""
+    files = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(suffixes):
+                    stat = entry.stat()
+                    files[os.path.splitext(entry.name)[0]] = (entry.name, stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return files
+
+
+def parse_label_texts(texts, num_classes):
+    """
+    Parse banyak isi file label sekaligus.
+
+    Mengembalikan (rows float32 N x 5, row_file int32 N, bad) dengan bad berupa
+    list (indeks file, nomor baris, alasan). Konversi angka dan pengecekan
+    rentang dilakukan dalam satu operasi vektor untuk semua file.
+    """
+    fields, owners, bad = [], [], []
+    for file_idx, text in enumerate(texts):
+        for line_no, line in enumerate(text.splitlines(), 1):
+            parts = line.split()
+            if not parts:
+                continue
+            if len(parts) != 5:
+                bad.append((file_idx, line_no, f"{len(parts)} kolom (harus 5)"))
+                continue
+            fields.extend(parts)
+            owners.append((file_idx, line_no))
+
+    if not owners:
+        return np.zeros((0, 5), np.float32), np.zeros(0, np.int32), bad
+
+    owners = np.array(owners, dtype=np.int32)
+    try:
+        rows = np.array(fields, dtype=np.float64).reshape(-1, 5)
+        numeric = np.ones(len(rows), dtype=bool)
+    except ValueError:
+        # Jarang: ada token bukan angka, ulangi per baris hanya untuk menandai yang rusak
+        rows = np.zeros((len(owners), 5))
+        numeric = np.zeros(len(owners), dtype=bool)
+        for i in range(len(owners)):
+            try:
+                rows[i] = np.array(fields[i * 5:i * 5 + 5], dtype=np.float64)
+                numeric[i] = True
+            except ValueError:
+                pass
+
+    cls, xywh = rows[:, 0], rows[:, 1:]
+    checks = [
+        (~numeric, "bukan angka"),
+        (numeric & ((cls != np.round(cls)) | (cls < 0) | (cls >= max(num_classes, 1))),
+         "kelas di luar rentang"),
+        (numeric & ((xywh < 0) | (xywh > 1)).any(axis=1), "koordinat di luar 0-1"),
+        (numeric & ((xywh[:, 2] <= 0) | (xywh[:, 3] <= 0)), "lebar/tinggi nol"),
+    ]
+    valid = np.ones(len(rows), dtype=bool)
+    for mask, reason in checks:
+        mask &= valid
+        for file_idx, line_no in owners[mask]:
+            bad.append((int(file_idx), int(line_no), reason))
+        valid &= ~mask
+    return rows[valid].astype(np.float32), owners[valid, 0], bad
+
+
+class DatasetIndex:
+    """Tabel label seluruh dataset plus daftar gambar per split"""
+
+    def __init__(self, names, splits):
+        self.names = list(names)
+        self.splits = list(splits)
+        # Tabel gambar (satu baris per gambar)
+        self.image_split = np.zeros(0, np.int8)
+        self.image_name = np.zeros(0, dtype=str)
+        self.image_has_label = np.zeros(0, bool)
+        # Tabel kotak (satu baris per baris label valid)
+        self.box_image = np.zeros(0, np.int32)
+        self.box_cls = np.zeros(0, np.int16)
+        self.box_xywh = np.zeros((0, 4), np.float32)
+        # Masalah integritas
+        self.label_only = []        # (split, nama file label) tanpa gambar
+        self.empty_labels = []      # (split, nama gambar) dengan file label kosong
+        self.malformed = []         # (split, nama file label, baris, alasan)
+        self.stats = {"label_files": 0, "parsed": 0, "seconds": 0.0}
+
+    def __len__(self):
+        return len(self.image_name)
+
+    @property
+    def num_classes(self):
+        return len(self.names)
+
+    def class_id(self, cls):
+        if isinstance(cls, str):
+            return self.names.index(cls)
+        return int(cls)
+
+    # ---------- Query ----------
+
+    def counts_per_image(self, cls=None):
+        """Jumlah kotak per gambar (opsional hanya satu kelas), panjang = jumlah gambar"""
+        owners = self.box_image
+        if cls is not None:
+            owners = owners[self.box_cls == self.class_id(cls)]
+        return np.bincount(owners, minlength=len(self))
+
+    def images_with(self, cls=None, min_count=1, max_count=None, split=None):
+        """Nama gambar (split/nama) yang jumlah kotaknya di antara min_count dan max_count"""
+        counts = self.counts_per_image(cls)
+        mask = counts >= min_count
+        if max_count is not None:
+            mask &= counts <= max_count
+        if split is not None:
+            mask &= self.image_split == self.splits.index(split)
+        return [f"{self.splits[s]}/{n}" for s, n in zip(self.image_split[mask], self.image_name[mask])]
+
+    def boxes(self, split=None, cls=None):
+        """Mask baris tabel kotak untuk split dan/atau kelas tertentu"""
+        mask = np.ones(len(self.box_cls), dtype=bool)
+        if split is not None:
+            mask &= self.image_split[self.box_image] == self.splits.index(split)
+        if cls is not None:
+            mask &= self.box_cls == self.class_id(cls)
+        return mask
+
+    # ---------- Statistik ----------
+
+    def split_stats(self, split):
+        s = self.splits.index(split)
+        in_split = self.image_split == s
+        boxes = self.boxes(split)
+        cls = self.box_cls[boxes]
+        per_image = np.bincount(self.box_image[boxes], minlength=len(self))[in_split]
+        wh = self.box_xywh[boxes, 2:]
+        classes = {}
+        for c, name in enumerate(self.names):
+            sel = cls == c
+            area = wh[sel, 0] * wh[sel, 1]
+            images = np.unique(self.box_image[boxes][sel])
+            classes[name] = {
+                "boxes": int(sel.sum()),
+                "images": int(len(images)),
+                "area_p50": float(np.median(area)) if len(area) else None,
+                "area_p05": float(np.percentile(area, 5)) if len(area) else None,
+                "area_p95": float(np.percentile(area, 95)) if len(area) else None,
+            }
+        return {
+            "images": int(in_split.sum()),
+            "labeled": int((in_split & self.image_has_label).sum()),
+            "without_label": int((in_split & ~self.image_has_label).sum()),
+            "empty_labels": sum(1 for sp, _ in self.empty_labels if sp == split),
+            "label_only": sum(1 for sp, _ in self.label_only if sp == split),
+            "malformed": sum(1 for sp, *_ in self.malformed if sp == split),
+            "boxes": int(boxes.sum()),
+            "boxes_per_image_mean": float(per_image.mean()) if len(per_image) else 0.0,
+            "boxes_per_image_max": int(per_image.max()) if len(per_image) else 0,
+            "classes": classes,
+        }
+
+    def summary(self):
+        return {split: self.split_stats(split) for split in self.splits}
+
+    def size_histogram(self, cls=None, bins=20):
+        """Histogram luas kotak (fraksi luas gambar, skala log) -> (counts, edges)"""
+        mask = self.boxes(cls=cls)
+        area = self.box_xywh[mask, 2] * self.box_xywh[mask, 3]
+        edges = np.logspace(-5, 0, bins + 1)
+        return np.histogram(area, bins=edges)
+
+    def issues(self):
+        """Semua masalah integritas sebagai list dict (untuk tabel)"""
+        missing = ~self.image_has_label
+        rows = [{"split": self.splits[s], "file": str(name), "masalah": "gambar tanpa label"}
+                for s, name in zip(self.image_split[missing], self.image_name[missing])]
+        rows += [{"split": sp, "file": name, "masalah": "label tanpa gambar"} for sp, name in self.label_only]
+        rows += [{"split": sp, "file": name, "masalah": "label kosong"} for sp, name in self.empty_labels]
+        rows += [{"split": sp, "file": f"{name}:{line}", "masalah": reason}
+                 for sp, name, line, reason in self.malformed]
+        return rows
+
+    # ---------- Export ----------
+
+    def to_dataframe(self):
+        """DataFrame satu baris per kotak (butuh pandas)"""
+        import pandas as pd
+
+        split = np.array(self.splits + [""], dtype=object)[self.image_split[self.box_image]]
+        names = np.array(self.names + ["unknown"], dtype=object)
+        return pd.DataFrame({
+            "split": split,
+            "image": self.image_name[self.box_image],
+            "class_id": self.box_cls,
+            "class": names[np.minimum(self.box_cls, len(self.names))],
+            "x_center": self.box_xywh[:, 0], "y_center": self.box_xywh[:, 1],
+            "width": self.box_xywh[:, 2], "height": self.box_xywh[:, 3],
+        })
+
+    def to_parquet(self, path):
+        self.to_dataframe().to_parquet(path, index=False)
+
+
+class _LabelCache:
+    """Hasil parse per file label dari pemindaian sebelumnya, dikunci ukuran + mtime"""
+
+    def __init__(self, path, load=True):
+        self.path = Path(path)
+        self.files = {}     # key -> (ukuran, mtime_ns, indeks file lama)
+        self.rows = np.zeros((0, 5), np.float32)
+        self.row_file = np.zeros(0, np.int32)
+        self.bad = []
+        if not load:
+            return
+        try:
+            with np.load(self.path) as data:
+                if int(data["version"]) != INDEX_VERSION:
+                    return
+                for i, (key, size, mtime) in enumerate(zip(data["keys"], data["sizes"], data["mtimes"])):
+                    self.files[str(key)] = (int(size), int(mtime), i)
+                self.rows, self.row_file = data["rows"], data["row_file"]
+                self.bad = json.loads(str(data["bad"]))
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # Cache rusak/terpotong dianggap kosong; penyimpanan berikutnya menimpanya
+            self.files = {}
+            self.rows = np.zeros((0, 5), np.float32)
+            self.row_file = np.zeros(0, np.int32)
+            self.bad = []
+
+    def lookup(self, key, size, mtime_ns):
+        entry = self.files.get(key)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    @staticmethod
+    def save(path, keys, sizes, mtimes, rows, row_file, bad):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, version=INDEX_VERSION, keys=np.array(keys, dtype=str),
+                 sizes=np.array(sizes, np.int64), mtimes=np.array(mtimes, np.int64),
+                 rows=rows, row_file=row_file, bad=json.dumps(bad))
+        os.replace(tmp, path)
+
+
+def cache_path_for(splits):
+    key = "|".join(f"{s}={p.resolve()}" for s, p in sorted(splits.items()))
+    return Path(config.DATASET_INDEX_DIR) / f"{hashlib.sha1(key.encode()).hexdigest()[:16]}.npz"
+
+
+def build_index(dataset_config, use_cache=True):
+    """Bangun (atau perbarui dari cache) indeks dataset untuk file YAML YOLO"""
+    start = time.perf_counter()
+    names, splits = resolve_splits(dataset_config)
+    index = DatasetIndex(names, splits)
+    cache_path = cache_path_for(splits)
+    cache = _LabelCache(cache_path, load=use_cache)
+
+    image_split, image_name, image_has_label = [], [], []
+    keys, sizes, mtimes, file_image, file_split = [], [], [], [], []
+    for s, (split, images_dir) in enumerate(splits.items()):
+        images = _scan(images_dir, IMAGE_SUFFIXES)
+        labels = _scan(labels_dir_for(images_dir), (".txt",))
+        first = len(image_name)
+        stems = sorted(images)
+        image_id = {stem: first + i for i, stem in enumerate(stems)}
+        for stem in stems:
+            image_split.append(s)
+            image_name.append(images[stem][0])
+            image_has_label.append(stem in labels)
+        for stem in sorted(labels):
+            name, size, mtime = labels[stem]
+            if stem not in image_id:
+                index.label_only.append((split, name))
+            keys.append(f"{split}/{name}")
+            sizes.append(size)
+            mtimes.append(mtime)
+            file_image.append(image_id.get(stem, -1))
+            file_split.append(split)
+
+    # File label yang tidak berubah memakai baris dari cache, sisanya diparse sekaligus
+    old_of_new = np.array([cache.lookup(k, sz, mt) if use_cache else None
+                           for k, sz, mt in zip(keys, sizes, mtimes)], dtype=object)
+    reused = np.array([o is not None for o in old_of_new], dtype=bool)
+    changed = np.flatnonzero(~reused)
+
+    texts = []
+    for i in changed:
+        split, name = keys[i].split("/", 1)
+        path = labels_dir_for(splits[split]) / name
+        try:
+            texts.append(path.read_text(errors="replace"))
+        except OSError as e:
+            texts.append("")
+            index.malformed.append((split, name, 0, f"gagal dibaca: {e}"))
+    new_rows, new_owner, new_bad = parse_label_texts(texts, len(names))
+    new_owner = changed[new_owner].astype(np.int32) if len(changed) else new_owner
+
+    parts_rows, parts_file = [new_rows], [new_owner]
+    bad = [(int(changed[f]), line, reason) for f, line, reason in new_bad]
+    if reused.any():
+        old_ids = np.array([o for o in old_of_new[reused]], dtype=np.int64)
+        mapping = np.full(len(cache.files), -1, np.int64)
+        mapping[old_ids] = np.flatnonzero(reused)
+        keep = mapping[cache.row_file] >= 0 if len(cache.row_file) else np.zeros(0, bool)
+        parts_rows.append(cache.rows[keep])
+        parts_file.append(mapping[cache.row_file[keep]].astype(np.int32))
+        bad += [(int(mapping[f]), line, reason) for f, line, reason in cache.bad if mapping[f] >= 0]
+
+    rows = np.concatenate(parts_rows).astype(np.float32)
+    row_file = np.concatenate(parts_file).astype(np.int32)
+    order = np.argsort(row_file, kind="stable")
+    rows, row_file = rows[order], row_file[order]
+    # Tulis ulang cache hanya bila ada label yang diparse ulang atau file yang hilang
+    if use_cache and (len(changed) or len(keys) != len(cache.files)):
+        _LabelCache.save(cache_path, keys, sizes, mtimes, rows, row_file, bad)
+
+    file_image = np.array(file_image, dtype=np.int32)
+    file_split = np.array(file_split, dtype=object)
+    boxes_per_file = np.bincount(row_file, minlength=len(keys))
+    bad_files = {f for f, _, _ in bad}
+    for f in np.flatnonzero((boxes_per_file == 0) & (file_image >= 0)):
+        if f not in bad_files:
+            index.empty_labels.append((file_split[f], image_name[file_image[f]]))
+    index.malformed += [(file_split[f], keys[f].split("/", 1)[1], line, reason) for f, line, reason in bad]
+
+    linked = file_image[row_file] >= 0
+    index.image_split = np.array(image_split, dtype=np.int8)
+    index.image_name = np.array(image_name, dtype=str)
+    index.image_has_label = np.array(image_has_label, dtype=bool)
+    index.box_image = file_image[row_file][linked]
+    index.box_cls = rows[linked, 0].astype(np.int16)
+    index.box_xywh = np.ascontiguousarray(rows[linked, 1:])
+    index.stats = {"label_files": len(keys), "parsed": int(len(changed)),
+                   "seconds": round(time.perf_counter() - start, 3)}
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistik dan integritas dataset YOLO")
+    parser.add_argument("dataset_config", help="file YAML dataset, mis. config/karies.yaml")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--query", nargs=2, metavar=("KELAS", "MIN"),
+                        help="tampilkan gambar dengan minimal MIN kotak KELAS")
+    parser.add_argument("--issues", action="store_true", help="tampilkan semua masalah integritas")
+    parser.add_argument("--parquet", default=None, help="simpan tabel kotak ke file Parquet")
+    args = parser.parse_args()
+
+    index = build_index(args.dataset_config, use_cache=not args.no_cache)
+    print(f"[DATASET] {len(index)} gambar, {len(index.box_cls)} kotak, "
+          f"{index.stats['parsed']}/{index.stats['label_files']} label diparse "
+          f"dalam {index.stats['seconds']} detik")
+    print(json.dumps(index.summary(), indent=2))
+    if args.issues:
+        for row in index.issues():
+            print(f"[DATASET] {row['split']}/{row['file']}: {row['masalah']}")
+    if args.query:
+        cls = args.query[0] if not args.query[0].isdigit() else int(args.query[0])
+        for name in index.images_with(cls, min_count=int(args.query[1])):
+            print(name)
+    if args.parquet:
+        index.to_parquet(args.parquet)
+        print(f"[DATASET] Tabel kotak disimpan ke {args.parquet}")
+
+
+if __name__ == "__main__":
+    main()
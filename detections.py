@@ -0,0 +1,155 @@
+# detections.py
+"""
+Tipe hasil deteksi kolumnar yang dipakai seluruh aplikasi.
+
+Satu objek Detections menyimpan semua kotak satu gambar dalam array NumPy
+kontigu (xyxy, conf, cls) plus ukuran gambar, fingerprint model dan waktu
+per tahap. Halaman deteksi, labeling otomatis, cache hasil, server dan export
+memakai representasi yang sama, sehingga tidak ada objek Python per kotak.
+"""
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+
+from telemetry import stage_timer
+
+
+class Detections:
+    """Kotak deteksi satu gambar dalam array kontigu"""
+
+    __slots__ = ("xyxy", "conf", "cls", "image_size", "model", "timings")
+
+    def __init__(self, xyxy, conf, cls, image_size, model=None, timings=None):
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.ascontiguousarray(cls, dtype=np.int32).reshape(-1)
+        self.image_size = (int(image_size[0]), int(image_size[1]))  # (lebar, tinggi)
+        self.model = model
+        self.timings = dict(timings or {})
+
+    @classmethod
+    def from_array(cls, boxes, image_size, model=None, timings=None):
+        """Dari array N x 6 (x1, y1, x2, y2, conf, cls) seperti Boxes.data Ultralytics"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 6)
+        return cls(boxes[:, :4], boxes[:, 4], boxes[:, 5], image_size, model, timings)
+
+    @classmethod
+    def from_ultralytics(cls, result, model=None):
+        height, width = result.orig_shape
+        return cls.from_array(result.boxes.data.cpu().numpy(), (width, height),
+                              model, dict(result.speed))
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __repr__(self):
+        return f"Detections(n={len(self)}, image_size={self.image_size}, model={self.model})"
+
+    @property
+    def nbytes(self):
+        return self.xyxy.nbytes + self.conf.nbytes + self.cls.nbytes + 64
+
+    @property
+    def xywhn(self):
+        """Pusat dan ukuran kotak ternormalisasi 0-1 (format label YOLO), N x 4"""
+        width, height = self.image_size
+        scale = np.array([width, height], dtype=np.float32)
+        center = (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2 / scale
+        size = (self.xyxy[:, 2:] - self.xyxy[:, :2]) / scale
+        return np.concatenate([center, size], axis=1)
+
+    def to_array(self):
+        """Array N x 6 (x1, y1, x2, y2, conf, cls) float32"""
+        return np.column_stack([self.xyxy, self.conf, self.cls.astype(np.float32)]).reshape(-1, 6)
+
+    def _select(self, mask):
+        return Detections(self.xyxy[mask], self.conf[mask], self.cls[mask],
+                          self.image_size, self.model, self.timings)
+
+    def rescale(self, image_size):
+        """Kotak yang sama di gambar berukuran lain (lebar, tinggi), mis. resolusi asli"""
+        sx = image_size[0] / self.image_size[0]
+        sy = image_size[1] / self.image_size[1]
+        xyxy = self.xyxy * np.array([sx, sy, sx, sy], dtype=np.float32)
+        return Detections(xyxy, self.conf, self.cls, image_size, self.model, self.timings)
+
+    def filter(self, min_conf=None, classes=None):
+        """Subset dengan confidence >= min_conf dan/atau kelas tertentu"""
+        mask = np.ones(len(self), dtype=bool)
+        if min_conf is not None:
+            mask &= self.conf >= min_conf
+        if classes is not None:
+            mask &= np.isin(self.cls, list(classes))
+        return self._select(mask)
+
+    def class_counts(self, num_classes):
+        """Jumlah kotak per kelas (kelas di luar rentang diabaikan)"""
+        valid = self.cls[(self.cls >= 0) & (self.cls < num_classes)]
+        return np.bincount(valid, minlength=num_classes)
+
+    def to_dataframe(self, labels=None):
+        """DataFrame satu baris per kotak: kelas, confidence, xyxy piksel dan xywhn"""
+        import pandas as pd
+
+        xywhn = self.xywhn
+        df = pd.DataFrame({
+            "class_id": self.cls,
+            "confidence": self.conf,
+            "x1": self.xyxy[:, 0], "y1": self.xyxy[:, 1],
+            "x2": self.xyxy[:, 2], "y2": self.xyxy[:, 3],
+            "x_center": xywhn[:, 0], "y_center": xywhn[:, 1],
+            "width": xywhn[:, 2], "height": xywhn[:, 3],
+        })
+        if labels is not None:
+            names = np.array(list(labels) + ["unknown"], dtype=object)
+            df.insert(1, "class", names[np.where((self.cls >= 0) & (self.cls < len(labels)),
+                                                 self.cls, len(labels))])
+        return df
+
+    def to_table(self, labels):
+        """Tabel "Detail Hasil Deteksi" (kolom berbahasa Indonesia) untuk halaman dan server"""
+        import pandas as pd
+
+        df = self.to_dataframe(labels)
+        unknown = (self.cls < 0) | (self.cls >= len(labels))
+        kelas = df["class"].where(~unknown, "unknown (id:" + df["class_id"].astype(str) + ")")
+        conf = df["confidence"].astype(float)
+        xyxy = df[["x1", "y1", "x2", "y2"]].astype(float).round().astype(int).astype(str)
+        return pd.DataFrame({
+            "Deteksi": "#" + pd.Series(np.arange(1, len(self) + 1)).astype(str),
+            "Kelas": kelas,
+            "Keyakinan": conf.map("{:.2f}".format) + " (" + (conf * 100).round().astype(int).astype(str) + "%)",
+            "Posisi (x1, y1, x2, y2)": "(" + xyxy["x1"] + ", " + xyxy["y1"] + ", "
+                                       + xyxy["x2"] + ", " + xyxy["y2"] + ")",
+        })
+
+    def to_json(self, labels=None):
+        """Dict kolumnar yang bisa di-json.dumps"""
+        data = {
+            "image_size": list(self.image_size),
+            "model": self.model,
+            "timings": self.timings,
+            "xyxy": self.xyxy.astype(np.float64).round(2).tolist(),
+            "conf": self.conf.astype(np.float64).round(4).tolist(),
+            "cls": self.cls.tolist(),
+        }
+        if labels is not None:
+            data["counts"] = dict(zip(labels, self.class_counts(len(labels)).tolist()))
+        return data
+
+    def to_yolo_txt(self):
+        """Isi file label YOLO: 'cls x_center y_center width height' per baris"""
+        buffer = io.StringIO()
+        rows = np.column_stack([self.cls.astype(np.float64), self.xywhn.astype(np.float64)])
+        np.savetxt(buffer, rows, fmt=["%d", "%.6f", "%.6f", "%.6f", "%.6f"])
+        return buffer.getvalue()
+
+    def save_yolo(self, path):
+        """Tulis label YOLO secara atomik (file sementara lalu os.replace)"""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with stage_timer("label_write", self.model):
+            tmp.write_text(self.to_yolo_txt())
+            os.replace(tmp, path)
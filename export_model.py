@@ -0,0 +1,174 @@
+# export_model.py
+"""
+Export best.pt terbaru ke runtime CPU yang lebih cepat dan uji kesetaraannya.
+
+    python export_model.py                               # ONNX saja
+    python export_model.py --formats onnx onnx-int8 openvino
+
+File hasil export diletakkan di samping bobot (best.onnx, best_int8.onnx,
+best_openvino_model/). Setelah export, setiap backend dibandingkan dengan
+model .pt pada dataset/valid: rata-rata IoU kotak, selisih mAP50/mAP50-95 dan
+latency per gambar. Hasilnya ditulis ke backend_report.json, yang dibaca
+model_registry.resolve_backend_path saat INFERENCE_BACKEND = 'auto'.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+import config
+from inference import box_iou
+from model_registry import (BACKEND_REPORT_NAME, BACKEND_RUNTIMES, backend_available,
+                            backend_path, weights_fingerprint)
+
+DATASET_CONFIG = config.ROOT / 'config' / 'karies.yaml'
+VALID_IMAGES = config.ROOT / 'dataset' / 'valid' / 'images'
+
+
+def export_backends(weights, formats=("onnx",), imgsz=640):
+    """Export model .pt ke format yang diminta, kembalikan {backend: path}"""
+    from ultralytics import YOLO
+
+    weights = Path(weights)
+    exported = {}
+    if "onnx" in formats or "onnx-int8" in formats:
+        onnx_path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        exported["onnx"] = Path(onnx_path)
+
+    if "onnx-int8" in formats:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = backend_path(weights, "onnx-int8")
+        quantize_dynamic(str(exported["onnx"]), str(int8_path), weight_type=QuantType.QUInt8)
+        exported["onnx-int8"] = int8_path
+
+    if "openvino" in formats:
+        ov_path = YOLO(weights).export(format="openvino", imgsz=imgsz, dynamic=True)
+        exported["openvino"] = Path(ov_path)
+
+    return {name: path for name, path in exported.items() if name in formats}
+
+
+def _predict_boxes(model, images, imgsz, conf):
+    """Kotak per gambar (array N x 6) dan latency rata-rata per gambar (ms)"""
+    # Satu gambar pertama sebagai warm-up, tidak dihitung
+    model.predict(str(images[0]), imgsz=imgsz, conf=conf, verbose=False)
+    boxes, start = [], time.perf_counter()
+    for image in images:
+        result = model.predict(str(image), imgsz=imgsz, conf=conf, verbose=False)[0]
+        boxes.append(result.boxes.data.cpu().numpy())
+    return boxes, (time.perf_counter() - start) * 1000 / len(images)
+
+
+def mean_matched_iou(reference, candidate):
+    """Rata-rata IoU terbaik (kelas sama) setiap kotak referensi; kotak hilang dihitung 0"""
+    scores = []
+    for ref, cand in zip(reference, candidate):
+        if len(ref) == 0:
+            continue
+        if len(cand) == 0:
+            scores.extend([0.0] * len(ref))
+            continue
+        iou = box_iou(ref, cand)
+        iou[ref[:, 5][:, None] != cand[:, 5][None, :]] = 0
+        scores.extend(iou.max(axis=1).tolist())
+    return float(np.mean(scores)) if scores else 1.0
+
+
+def _validate(model, imgsz):
+    metrics = model.val(data=str(DATASET_CONFIG), imgsz=imgsz, batch=1, plots=False, verbose=False)
+    return float(metrics.box.map50), float(metrics.box.map)
+
+
+def parity_report(weights, backends, imgsz=640, conf=0.25, max_images=None, run_val=True):
+    """Bandingkan setiap backend dengan model .pt: IoU kotak, selisih mAP, latency"""
+    from ultralytics import YOLO
+
+    images = sorted(p for p in VALID_IMAGES.iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    images = images[:max_images] if max_images else images
+
+    reference_model = YOLO(weights)
+    reference_boxes, reference_latency = _predict_boxes(reference_model, images, imgsz, conf)
+    reference_map = _validate(reference_model, imgsz) if run_val else (None, None)
+
+    report = {
+        "weights": str(weights),
+        # Identitas best.pt sumber export; export diabaikan bila best.pt berubah
+        "source": weights_fingerprint(weights),
+        "imgsz": imgsz,
+        "images": len(images),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "backends": {
+            "pytorch": {
+                "path": str(weights),
+                "latency_ms": round(reference_latency, 2),
+                "map50": reference_map[0],
+                "map50_95": reference_map[1],
+                "passed": True,
+            }
+        },
+    }
+
+    for name in backends:
+        if not backend_available(weights, name):
+            report["backends"][name] = {"passed": False,
+                                        "error": f"runtime {BACKEND_RUNTIMES.get(name)} atau file export tidak ada"}
+            continue
+        model = YOLO(str(backend_path(weights, name)), task="detect")
+        boxes, latency = _predict_boxes(model, images, imgsz, conf)
+        entry = {
+            "path": str(backend_path(weights, name)),
+            "latency_ms": round(latency, 2),
+            "speedup": round(reference_latency / latency, 2) if latency else None,
+            "mean_box_iou": round(mean_matched_iou(reference_boxes, boxes), 4),
+        }
+        passed = entry["mean_box_iou"] >= config.BACKEND_MIN_BOX_IOU
+        if run_val:
+            map50, map50_95 = _validate(model, imgsz)
+            entry.update(map50=map50, map50_95=map50_95,
+                         map50_delta=round(reference_map[0] - map50, 4))
+            passed = passed and entry["map50_delta"] <= config.BACKEND_MAX_MAP_DELTA
+        entry["passed"] = passed
+        report["backends"][name] = entry
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model ke ONNX/OpenVINO dan uji paritas")
+    parser.add_argument("--weights", default=None, help="default: best.pt training terbaru")
+    parser.add_argument("--formats", nargs="+", default=["onnx"],
+                        choices=["onnx", "onnx-int8", "openvino"])
+    parser.add_argument("--imgsz", type=int, default=None, help="default: imgsz saat training")
+    parser.add_argument("--max-images", type=int, default=None, help="batasi gambar untuk IoU/latency")
+    parser.add_argument("--skip-val", action="store_true", help="tanpa perbandingan mAP")
+    args = parser.parse_args()
+
+    weights = Path(args.weights or config.get_latest_trained_model_path() or config.DETECTION_MODEL)
+    if not weights.exists():
+        raise SystemExit(f"File bobot tidak ditemukan: {weights}")
+
+    imgsz = args.imgsz
+    if imgsz is None:
+        from ultralytics import YOLO
+        imgsz = YOLO(weights).overrides.get("imgsz") or 640
+
+    print(f"[EXPORT] {weights} -> {', '.join(args.formats)} (imgsz={imgsz})")
+    for name, path in export_backends(weights, args.formats, imgsz).items():
+        print(f"[EXPORT] {name}: {path}")
+
+    report = parity_report(weights, args.formats, imgsz=imgsz,
+                           max_images=args.max_images, run_val=not args.skip_val)
+    report_path = weights.with_name(BACKEND_REPORT_NAME)
+    report_path.write_text(json.dumps(report, indent=2))
+
+    print(f"[EXPORT] Laporan: {report_path}")
+    for name, entry in report["backends"].items():
+        status = "lolos" if entry.get("passed") else "tidak lolos"
+        print(f"  {name:<10} latency={entry.get('latency_ms')} ms  "
+              f"iou={entry.get('mean_box_iou', '-')}  dmAP50={entry.get('map50_delta', '-')}  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# folder_watcher.py
+"""
+Pemantau folder yang otomatis melabeli rontgen baru.
+
+Perangkat pencitraan menaruh gambar baru ke folder bersama. Watcher mendeteksi
+file baru/berubah (watchdog/inotify bila terpasang, selain itu polling
+os.scandir), menunggu sampai ukuran dan mtime file stabil selama
+WATCHER_DEBOUNCE detik (file yang masih ditulis tidak ikut diproses), lalu
+hanya mengirim delta itu ke inference batch dan menulis label YOLO.
+
+Status setiap gambar (ukuran, mtime, versi model) disimpan di
+<folder label>/.label_state.sqlite, sehingga restart tidak memproses ulang
+semuanya. Bila model aktif berganti dan relabel=True, gambar lama dilabeli
+ulang di latar belakang dengan prioritas rendah: sedikit demi sedikit dan
+hanya saat tidak ada gambar baru yang menunggu. Gambar yang gagal diproses
+tetap dicatat dengan versi model saat itu plus pesan error-nya, sehingga
+tidak dicoba terus-menerus; gambar itu dicoba lagi bila file-nya berubah
+atau model berganti.
+
+    python folder_watcher.py data/incoming data/labels --conf 0.4 --relabel
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import config
+from inference import predict_batch
+from labeling_pipeline import IMAGE_SUFFIXES, label_path_for
+from model_registry import get_registry, latest_detection_model_path, model_fingerprint
+from preprocess_pipeline import pipeline_for_model
+from telemetry import get_logger
+
+log = get_logger("watcher")
+
+STATE_FILE = ".label_state.sqlite"
+
+
+def default_model_provider():
+    return get_registry().get(latest_detection_model_path(), task="detect")
+
+
+class LabelState:
+    """Indeks gambar yang sudah diproses: nama -> (ukuran, mtime_ns, versi model, error)"""
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER, "
+                         "mtime_ns INTEGER, model TEXT, labeled REAL, error TEXT)")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(files)")]
+        if "error" not in columns:
+            # State dari versi sebelumnya belum punya kolom error
+            self._db.execute("ALTER TABLE files ADD COLUMN error TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_model ON files (model)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            return self._db.execute("SELECT size, mtime_ns, model FROM files WHERE name = ?",
+                                    (name,)).fetchone()
+
+    def mark(self, rows, error=None):
+        """rows: iterable (name, size, mtime_ns, model); `error` menandai gambar yang gagal"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO files (name, size, mtime_ns, model, labeled, error) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", [(*row, now, error) for row in rows])
+            self._db.commit()
+
+    def outdated(self, model, limit):
+        """Nama gambar yang dilabeli dengan model lain"""
+        with self._lock:
+            rows = self._db.execute("SELECT name FROM files WHERE model != ? LIMIT ?",
+                                    (model, limit)).fetchall()
+        return [r[0] for r in rows]
+
+    def counts(self, model):
+        with self._lock:
+            total, current, failed = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(model = ? AND error IS NULL), 0), "
+                "COALESCE(SUM(model = ? AND error IS NOT NULL), 0) FROM files", (model, model)).fetchone()
+        return {"indexed": total, "current_model": current, "failed": failed}
+
+    def close(self):
+        self._db.close()
+
+
+class FolderWatcher:
+    """Pantau satu folder dan labeli gambar baru secara inkremental"""
+
+    def __init__(self, input_folder, output_folder, confidence, batch_size=None,
+                 model_provider=None, debounce=None, poll_interval=None, relabel=False,
+                 use_watchdog=True):
+        self.input_folder = Path(input_folder)
+        self.output_folder = Path(output_folder)
+        self.confidence = confidence
+        self.batch_size = int(batch_size or config.INFERENCE_BATCH_SIZE)
+        self.model_provider = model_provider or default_model_provider
+        self.debounce = config.WATCHER_DEBOUNCE if debounce is None else debounce
+        self.poll_interval = poll_interval or config.WATCHER_POLL_INTERVAL
+        self.relabel = relabel
+        self.use_watchdog = use_watchdog
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        self.state = LabelState(self.output_folder / STATE_FILE)
+        self._pending = {}          # nama -> (ukuran, mtime_ns, waktu perubahan terakhir)
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._observer = None
+        self.mode = None
+        self.model_version = None
+        self.labeled = 0
+        self.relabeled = 0
+        self.errors = deque(maxlen=config.WATCHER_MAX_ERRORS)
+        self.last_scan = 0.0
+
+    # ---------- Kontrol ----------
+
+    def start(self):
+        self._start_observer()
+        self._thread = threading.Thread(target=self._loop, name="folder-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+        self.state.close()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "model": self.model_version,
+            "pending": pending,
+            "labeled": self.labeled,
+            "relabeled": self.relabeled,
+            "errors": list(self.errors)[-20:],
+            **(self.state.counts(self.model_version) if self.model_version else {}),
+        }
+
+    # ---------- Deteksi perubahan ----------
+
+    def _start_observer(self):
+        self.mode = "polling"
+        if not self.use_watchdog:
+            return
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                watcher._notify(event.src_path, event.is_directory)
+
+            def on_modified(self, event):
+                watcher._notify(event.src_path, event.is_directory)
+
+            def on_moved(self, event):
+                watcher._notify(event.dest_path, event.is_directory)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(self.input_folder), recursive=False)
+        self._observer.start()
+        self.mode = "watchdog"
+
+    def _notify(self, path, is_directory=False):
+        name = os.path.basename(path)
+        if is_directory or not name.lower().endswith(IMAGE_SUFFIXES):
+            return
+        with self._pending_lock:
+            self._pending[name] = (-1, -1, time.monotonic())
+        self._wake.set()
+
+    def _scan(self):
+        """Polling (atau rekonsiliasi awal): masukkan gambar yang belum/berubah sejak dilabeli"""
+        with os.scandir(self.input_folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(IMAGE_SUFFIXES):
+                    continue
+                stat = entry.stat()
+                known = self.state.get(entry.name)
+                if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                    continue
+                with self._pending_lock:
+                    if entry.name not in self._pending:
+                        self._pending[entry.name] = (-1, -1, time.monotonic())
+        self.last_scan = time.monotonic()
+
+    def _ready(self):
+        """Gambar yang ukuran dan mtime-nya tidak berubah selama `debounce` detik"""
+        now = time.monotonic()
+        ready = []
+        with self._pending_lock:
+            for name, (size, mtime_ns, changed) in list(self._pending.items()):
+                try:
+                    stat = os.stat(self.input_folder / name)
+                except FileNotFoundError:
+                    del self._pending[name]
+                    continue
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    self._pending[name] = (stat.st_size, stat.st_mtime_ns, now)
+                elif stat.st_size > 0 and now - changed >= self.debounce:
+                    ready.append((name, stat.st_size, stat.st_mtime_ns))
+        return ready
+
+    # ---------- Pemrosesan ----------
+
+    def _loop(self):
+        try:
+            self._scan()
+        except OSError as e:
+            self.errors.append({"file": str(self.input_folder), "error": str(e)})
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                self.errors.append({"file": None, "error": str(e)})
+                log.error("Error: %s", e)
+            self._wake.wait(min(self.debounce, self.poll_interval) / 2 or 0.5)
+            self._wake.clear()
+
+    def _tick(self):
+        if self.mode == "polling" and time.monotonic() - self.last_scan >= self.poll_interval:
+            self._scan()
+
+        model = self.model_provider()
+        version = model_fingerprint(model)
+        if version != self.model_version:
+            if self.model_version is not None:
+                log.info("Model berganti: %s -> %s", self.model_version, version)
+            self.model_version = version
+
+        ready = self._ready()
+        for start in range(0, len(ready), self.batch_size):
+            batch = ready[start:start + self.batch_size]
+            self.labeled += self._label(model, version, batch)
+            with self._pending_lock:
+                for name, size, mtime_ns in batch:
+                    # Hanya dibuang bila tidak berubah lagi selama diproses
+                    if self._pending.get(name, (None, None))[:2] == (size, mtime_ns):
+                        del self._pending[name]
+
+        if self.relabel and not ready:
+            # Prioritas rendah: satu batch per putaran, hanya saat tidak ada gambar baru
+            names = self.state.outdated(version, self.batch_size)
+            batch = []
+            for name in names:
+                try:
+                    stat = os.stat(self.input_folder / name)
+                    batch.append((name, stat.st_size, stat.st_mtime_ns))
+                except FileNotFoundError:
+                    self.state.mark([(name, -1, -1, version)])
+            if batch:
+                self.relabeled += self._label(model, version, batch)
+                self._wake.set()
+
+    def _label(self, model, version, batch):
+        import cv2
+
+        images, names, stats = [], [], {}
+        for name, size, mtime_ns in batch:
+            image = cv2.imread(str(self.input_folder / name), cv2.IMREAD_COLOR)
+            if image is None:
+                self._failed(name, size, mtime_ns, version, "gagal membaca gambar")
+                continue
+            images.append(image)
+            names.append(name)
+            stats[name] = (size, mtime_ns)
+        if not images:
+            return 0
+
+        done = []
+        for result in predict_batch(model, images, self.confidence, batch_size=len(images),
+                                    names=names, plot=False, pipeline=pipeline_for_model(model)):
+            name = result["name"]
+            if not result["success"]:
+                self._failed(name, *stats[name], version, result["error"])
+                continue
+            result["detections"].save_yolo(label_path_for(self.output_folder, name))
+            done.append((name, *stats[name], version))
+        self.state.mark(done)
+        return len(done)
+
+    def _failed(self, name, size, mtime_ns, version, error):
+        """Catat gambar gagal dengan versi model ini agar tidak diulang sampai file/model berubah"""
+        self.errors.append({"file": name, "error": error})
+        self.state.mark([(name, size, mtime_ns, version)], error=error)
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(input_folder, output_folder, confidence, relabel=False, start=True):
+    """Satu watcher per pasangan folder per proses (dipakai halaman labeling)"""
+    key = (str(Path(input_folder).resolve()), str(Path(output_folder).resolve()))
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None or not watcher.running:
+            if not start:
+                return None
+            watcher = FolderWatcher(input_folder, output_folder, confidence, relabel=relabel).start()
+            _watchers[key] = watcher
+        return watcher
+
+
+def stop_watcher(input_folder, output_folder):
+    key = (str(Path(input_folder).resolve()), str(Path(output_folder).resolve()))
+    with _watchers_lock:
+        watcher = _watchers.pop(key, None)
+    if watcher is not None:
+        watcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Labeli otomatis gambar baru di sebuah folder")
+    parser.add_argument("input_folder")
+    parser.add_argument("output_folder")
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--batch", type=int, default=None)
+    parser.add_argument("--relabel", action="store_true", help="labeli ulang saat model berganti")
+    parser.add_argument("--polling", action="store_true", help="paksa polling tanpa watchdog")
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.input_folder, args.output_folder, args.conf, batch_size=args.batch,
+                            relabel=args.relabel, use_watchdog=not args.polling).start()
+    print(f"[WATCHER] Memantau {args.input_folder} ({watcher.mode})")
+    try:
+        while True:
+            time.sleep(10)
+            s = watcher.status()
+            print(f"[WATCHER] {s['labeled']} baru, {s['relabeled']} dilabeli ulang, "
+                  f"{s['pending']} menunggu, {len(s['errors'])} error")
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# image_loader.py
+"""
+Pemuat gambar bersama untuk halaman deteksi, batch dan preprocessing.
+
+- Bila ukuran target diketahui, JPEG didecode langsung pada resolusi lebih
+  kecil (PIL draft = skala DCT libjpeg 1/2, 1/4, 1/8), tidak pernah lebih
+  kecil dari target. Rontgen panoramik besar jadi jauh lebih cepat dan hemat
+  memori.
+- Orientasi EXIF diterapkan, rontgen 16 bit dipetakan ke uint8 dengan
+  windowing persentil, dan gambar grayscale bisa tetap satu kanal.
+- Jumlah piksel dicek dari header sebelum decode (MAX_IMAGE_PIXELS).
+- Pratinjau untuk browser (st.image) dibuat terpisah dan diperkecil ke
+  PREVIEW_MAX_SIDE, sedangkan array untuk model tetap pada resolusi decode.
+"""
+import io
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import config
+from lazy_imports import lazy_import
+from telemetry import stage_timer
+
+cv2 = lazy_import("cv2")
+
+# Tag EXIF Orientation yang memutar 90/270 derajat (lebar dan tinggi tertukar)
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+class ImageTooLarge(ValueError):
+    """Gambar melebihi batas jumlah piksel"""
+
+
+class LoadedImage:
+    """Array gambar hasil decode plus ukuran asli dan skala decode"""
+
+    __slots__ = ("array", "original_size", "name", "format", "_preview")
+
+    def __init__(self, array, original_size, name=None, format=None):
+        self.array = array                  # BGR uint8 (atau H x W untuk grayscale)
+        self.original_size = original_size  # (lebar, tinggi) setelah orientasi EXIF
+        self.name = name
+        self.format = format
+        self._preview = {}
+
+    @property
+    def size(self):
+        return self.array.shape[1], self.array.shape[0]
+
+    @property
+    def scale(self):
+        """Skala decode terhadap gambar asli (1.0 = resolusi penuh)"""
+        return self.size[0] / self.original_size[0]
+
+    def preview(self, max_side=None):
+        """Pratinjau RGB untuk ditampilkan, di-cache per ukuran"""
+        max_side = max_side or config.PREVIEW_MAX_SIDE
+        if max_side not in self._preview:
+            self._preview[max_side] = make_preview(self.array, max_side, bgr=True)
+        return self._preview[max_side]
+
+    def to_original(self, detections):
+        """Kotak Detections dari koordinat decode ke koordinat gambar asli"""
+        if self.size == self.original_size:
+            return detections
+        return detections.rescale(self.original_size)
+
+
+def make_preview(image, max_side=None, bgr=False):
+    """Perkecil gambar (RGB atau BGR bila bgr=True) sehingga sisi terpanjang <= max_side, hasil RGB"""
+    max_side = max_side or config.PREVIEW_MAX_SIDE
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if bgr else image
+
+
+def _window_uint8(array):
+    """Rontgen 16 bit / float -> uint8 dengan windowing persentil 0.5-99.5"""
+    sample = array[::4, ::4]
+    low, high = np.percentile(sample, (0.5, 99.5))
+    if high <= low:
+        high = low + 1
+    scaled = (array.astype(np.float32) - low) * (255.0 / (high - low))
+    return np.clip(scaled, 0, 255).astype(np.uint8)
+
+
+def _to_array(img, channels):
+    """PIL Image -> uint8 BGR (channels=3) atau kanal asli (channels=None: H x W untuk grayscale)"""
+    if img.mode in ("I;16", "I;16B", "I;16L", "I", "F"):
+        gray = _window_uint8(np.asarray(img))
+    elif img.mode == "L":
+        gray = np.asarray(img)
+    elif img.mode == "LA":
+        gray = np.asarray(img.getchannel("L"))
+    else:
+        rgb = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+    return gray if channels is None else cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source)), None
+    if isinstance(source, (str, Path)):
+        return Image.open(source), Path(source).name
+    # File-like (mis. UploadedFile Streamlit): baca dari awal
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return Image.open(source), getattr(source, "name", None)
+
+
+def load_image(source, target_size=None, max_pixels=None, channels=3):
+    """
+    Decode gambar dari path, bytes atau file-like menjadi LoadedImage.
+
+    `target_size`: sisi minimum yang dibutuhkan pemakai (mis. imgsz model);
+    JPEG didecode pada skala terkecil yang masih >= target_size di kedua sisi.
+    None = resolusi penuh (mode tile/kaskade butuh detail asli).
+    Melempar ImageTooLarge bila jumlah piksel decode melebihi `max_pixels`.
+    """
+    max_pixels = max_pixels or config.MAX_IMAGE_PIXELS
+    with stage_timer("decode", imgsz=target_size):
+        img, name = _open(source)
+        with img:
+            width, height = img.size
+            orientation = img.getexif().get(0x0112, 1)
+            original_size = (height, width) if orientation in _TRANSPOSED_ORIENTATIONS else (width, height)
+
+            if target_size and img.format == "JPEG":
+                img.draft("L" if img.mode == "L" else "RGB", (int(target_size), int(target_size)))
+            if img.size[0] * img.size[1] > max_pixels:
+                raise ImageTooLarge(f"Gambar terlalu besar: {width}x{height} piksel "
+                                    f"(batas {max_pixels / 1e6:.0f} MP)")
+            fmt = img.format
+            img = ImageOps.exif_transpose(img)
+            array = _to_array(img, channels)
+    return LoadedImage(np.ascontiguousarray(array), original_size, name, fmt)
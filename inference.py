@@ -0,0 +1,288 @@
+# inference.py
+"""Inference batch untuk halaman deteksi dan labeling otomatis"""
+import time
+
+import numpy as np
+
+import config
+from model_registry import model_fingerprint
+from detections import Detections
+from result_cache import cache_key, image_fingerprint
+from telemetry import observe_speed, stage_timer
+
+
+def iter_batches(items, batch_size):
+    """Bagi list menjadi potongan berukuran batch_size"""
+    batch_size = max(1, int(batch_size))
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def box_iou(a, b):
+    """Matriks IoU antara kotak a (N x 4) dan b (M x 4) format xyxy"""
+    a = np.asarray(a, dtype=np.float32)[:, None, :4]
+    b = np.asarray(b, dtype=np.float32)[None, :, :4]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def model_imgsz(model):
+    """Ukuran input default model (imgsz saat training bila tersimpan di checkpoint)"""
+    overrides = getattr(model, "overrides", None) or {}
+    return overrides.get("imgsz") or 640
+
+
+def plot_detections(model, image, detections):
+    """Gambar kotak di atas gambar (RGB) memakai plotter Ultralytics"""
+    import torch
+    from ultralytics.engine.results import Results
+
+    result = Results(to_bgr(image), path="", names=model.names,
+                     boxes=torch.from_numpy(detections.to_array()))
+    return result.plot()[:, :, ::-1]
+
+
+def detection_output(model, image, detections, name=None, plot=True, imgsz=None):
+    """Dict hasil per gambar; `detections` adalah objek Detections"""
+    plotted = None
+    if plot:
+        with stage_timer("plot", detections.model, imgsz):
+            plotted = plot_detections(model, image, detections)
+    return {
+        "success": True,
+        "name": name,
+        "image_size": detections.image_size,
+        "plotted_image": plotted,
+        "detections": detections,
+        "speed": dict(detections.timings),
+    }
+
+
+def result_to_dict(result, name=None, plot=True, fingerprint=None, imgsz=None):
+    """Ubah satu Ultralytics Results menjadi dict terstruktur per gambar"""
+    detections = Detections.from_ultralytics(result, fingerprint)
+    plotted = None
+    if plot:
+        with stage_timer("plot", fingerprint, imgsz):
+            plotted = result.plot()[:, :, ::-1]
+    return {
+        "success": True,
+        "name": name,
+        "image_size": detections.image_size,
+        "plotted_image": plotted,
+        "detections": detections,
+        "speed": dict(detections.timings),
+    }
+
+
+def to_bgr(image):
+    """PIL Image / array RGB -> array BGR uint8 seperti yang dipakai Ultralytics"""
+    if isinstance(image, np.ndarray):
+        return image
+    return np.asarray(image.convert("RGB"))[:, :, ::-1]
+
+
+def run_on_preprocessed(compute, image, pipeline):
+    """
+    Bungkus compute(array, conf) -> (kotak, info, waktu) agar berjalan pada
+    gambar hasil `pipeline`; kotak dikembalikan ke koordinat `image`.
+    Tanpa pipeline (None/tidak aktif) compute langsung menerima gambar asli.
+    """
+    def wrapped(conf):
+        array = to_bgr(image)
+        if pipeline is None or not pipeline.active:
+            return compute(array, conf)
+        height, width = array.shape[:2]
+        start = time.perf_counter()
+        processed = pipeline(array)
+        preprocessing_ms = (time.perf_counter() - start) * 1000
+        boxes, info, timings = compute(processed, conf)
+        boxes = np.array(boxes, dtype=np.float32).reshape(-1, 6)
+        boxes[:, [0, 2]] *= width / processed.shape[1]
+        boxes[:, [1, 3]] *= height / processed.shape[0]
+        info = {**info, "preprocess": pipeline.to_dict()}
+        return boxes, info, {"preprocessing": preprocessing_ms, **timings}
+
+    return wrapped
+
+
+def predict_custom(model, image, confidence, compute, variant, name=None, plot=True, cache=None,
+                   imgsz=None, stage_prefix=""):
+    """
+    Kerangka bersama mode inference khusus (bertile, kaskade) untuk satu gambar.
+
+    `compute(conf)` mengembalikan (kotak N x 6 dalam koordinat gambar asli,
+    dict info tambahan, dict waktu per tahap dalam ms). Kotak mentah di-cache
+    dengan kunci `variant`, sehingga perubahan confidence cukup memfilter ulang.
+    Waktu per tahap dicatat ke telemetry dengan awalan `stage_prefix`.
+    """
+    if cache is not None and confidence < config.RESULT_CACHE_MIN_CONF:
+        # Entri cache selalu dihitung pada RESULT_CACHE_MIN_CONF; di bawahnya tidak bisa dilayani
+        cache = None
+    try:
+        key = None
+        fingerprint = model_fingerprint(model)
+        if cache is not None:
+            key = cache_key(image_fingerprint(image), fingerprint, variant)
+            entry = cache.get(key)
+            if entry is not None:
+                output = detection_output(model, image, entry.filter(confidence), name, plot, imgsz)
+                output.update(speed={}, cached=True)
+                return output
+
+        raw_conf = config.RESULT_CACHE_MIN_CONF if cache is not None else confidence
+        boxes, info, timings = compute(raw_conf)
+        observe_speed(timings, fingerprint, imgsz, stage_prefix)
+        height, width = to_bgr(image).shape[:2]
+        entry = Detections.from_array(boxes, (width, height), fingerprint, timings)
+        if cache is not None:
+            cache.put(key, entry)
+
+        start = time.perf_counter()
+        output = detection_output(model, image, entry.filter(confidence), name, plot, imgsz)
+        timings["plot"] = (time.perf_counter() - start) * 1000
+        output.update(speed=timings, cached=False, **info)
+        return output
+    except Exception as e:
+        return {"success": False, "name": name, "error": str(e)}
+
+
+def predict_preprocessed(model, image, confidence, pipeline, name=None, plot=True, cache=None,
+                         imgsz=None):
+    """
+    Deteksi satu gambar setelah PreprocessPipeline yang sama seperti saat training.
+
+    Model melihat gambar hasil pipeline (termasuk resize ke ukuran dataset),
+    lalu kotak dikembalikan ke koordinat gambar asli dan digambar di atasnya.
+    """
+    imgsz = imgsz or config.INFERENCE_IMGSZ or model_imgsz(model)
+
+    def compute(processed, conf):
+        result = model.predict(processed, conf=conf, imgsz=imgsz, verbose=False)[0]
+        return result.boxes.data.cpu().numpy(), {}, dict(result.speed)
+
+    return predict_custom(model, image, confidence, run_on_preprocessed(compute, image, pipeline),
+                          f"{pipeline.key}:{imgsz}", name, plot, cache, imgsz=imgsz)
+
+
+def _forward(model, images, conf, imgsz, fingerprint, pipeline=None):
+    """
+    Satu forward pass untuk satu potongan batch; list Detections per gambar.
+
+    Dengan `pipeline`, setiap gambar diproses dulu seperti saat training lalu
+    kotaknya dikembalikan ke koordinat gambar input, sama seperti
+    predict_preprocessed.
+    """
+    inputs, extra = images, {}
+    if pipeline is not None:
+        start = time.perf_counter()
+        inputs = [pipeline(to_bgr(img)) for img in images]
+        extra["preprocessing"] = (time.perf_counter() - start) * 1000 / len(images)
+    results = model.predict(inputs, conf=conf, imgsz=imgsz, batch=len(inputs), verbose=False)
+    detections = []
+    for image, r in zip(images, results):
+        timings = {**extra, **r.speed}
+        observe_speed(timings, fingerprint, imgsz)
+        height, width = r.orig_shape
+        entry = Detections.from_array(r.boxes.data.cpu().numpy(), (width, height), fingerprint, timings)
+        if pipeline is not None:
+            height, width = to_bgr(image).shape[:2]
+            entry = entry.rescale((width, height))
+        detections.append(entry)
+    return results, detections
+
+
+def predict_batch(model, images, confidence, batch_size=None, imgsz=None,
+                  names=None, plot=True, cache=None, pipeline=None):
+    """
+    Deteksi banyak gambar dengan batch tensor sungguhan.
+
+    Setiap potongan `batch_size` gambar dikirim sebagai satu list ke
+    model.predict, sehingga Ultralytics me-letterbox semuanya ke bentuk yang
+    sama (imgsz x imgsz) dan menjalankan satu forward pass per batch.
+    Hasil dikembalikan per gambar dengan urutan yang sama seperti input.
+
+    `pipeline` (PreprocessPipeline, lihat pipeline_for_model) diterapkan ke
+    setiap gambar sebelum batch dikirim; kotak tetap dalam koordinat input.
+
+    Bila `cache` (ResultCache) diberikan, gambar yang sudah pernah diproses
+    dengan model dan imgsz yang sama tidak di-inference ulang; kotak mentahnya
+    cukup difilter dengan confidence yang baru. Entri cache selalu dihitung
+    pada RESULT_CACHE_MIN_CONF, jadi confidence di bawahnya melewati cache.
+    """
+    if cache is not None and confidence < config.RESULT_CACHE_MIN_CONF:
+        cache = None
+    batch_size = batch_size or config.INFERENCE_BATCH_SIZE
+    imgsz = imgsz or config.INFERENCE_IMGSZ or model_imgsz(model)
+    images = list(images)
+    names = list(names) if names is not None else [None] * len(images)
+    if pipeline is not None and not pipeline.active:
+        pipeline = None
+
+    fingerprint = model_fingerprint(model)
+    if cache is None:
+        outputs = []
+        for batch_images, batch_names in zip(iter_batches(images, batch_size),
+                                             iter_batches(names, batch_size)):
+            try:
+                results, detections = _forward(model, batch_images, confidence, imgsz, fingerprint, pipeline)
+                if pipeline is None:
+                    outputs.extend(result_to_dict(r, n, plot, fingerprint, imgsz)
+                                   for r, n in zip(results, batch_names))
+                else:
+                    for img, d, n in zip(batch_images, detections, batch_names):
+                        outputs.append({**detection_output(model, img, d, n, plot, imgsz),
+                                        "preprocess": pipeline.to_dict()})
+            except Exception as e:
+                outputs.extend({"success": False, "name": n, "error": str(e)} for n in batch_names)
+        return outputs
+
+    # Varian sama seperti predict_preprocessed, sehingga entri cache dipakai bersama
+    variant = f"{pipeline.key}:{imgsz}" if pipeline is not None else imgsz
+    keys = [cache_key(image_fingerprint(img), fingerprint, variant) for img in images]
+    entries = [cache.get(k) for k in keys]
+    errors = {}
+
+    # Inference hanya untuk gambar yang belum ada di cache, dengan threshold mentah tetap
+    raw_conf = config.RESULT_CACHE_MIN_CONF
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    for batch_idx in iter_batches(missing, batch_size):
+        try:
+            _, detections = _forward(model, [images[i] for i in batch_idx], raw_conf, imgsz,
+                                     fingerprint, pipeline)
+            for i, entry in zip(batch_idx, detections):
+                entries[i] = entry
+                cache.put(keys[i], entry)
+        except Exception as e:
+            errors.update((i, str(e)) for i in batch_idx)
+
+    outputs = []
+    for i, (image, name, entry) in enumerate(zip(images, names, entries)):
+        if i in errors:
+            outputs.append({"success": False, "name": name, "error": errors[i]})
+            continue
+        cached = i not in missing
+        output = detection_output(model, image, entry.filter(confidence), name, plot, imgsz)
+        if cached:
+            output["speed"] = {}
+        output["cached"] = cached
+        if pipeline is not None:
+            output["preprocess"] = pipeline.to_dict()
+        outputs.append(output)
+    return outputs
+
+
+def save_yolo_labels(detections, label_path):
+    """Simpan objek Detections ke file label format YOLO"""
+    detections.save_yolo(label_path)
+
+
+def read_yolo_labels(label_path):
+    """Baca file label YOLO menjadi array float32 N x 5 (cls, x, y, w, h)"""
+    with open(label_path) as f:
+        values = f.read().split()
+    return np.array(values, dtype=np.float32).reshape(-1, 5)
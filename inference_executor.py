@@ -0,0 +1,263 @@
+# inference_executor.py
+"""
+Executor inference bersama untuk halaman deteksi (satu per proses Streamlit).
+
+Script Streamlit tidak lagi menjalankan forward pass sendiri di bawah
+st.spinner; permintaan dimasukkan ke sini dan dikembalikan sebagai
+InferenceTask yang bisa dipoll UI (lihat components/detection.py).
+
+- Terbatas: paling banyak INFERENCE_MAX_PENDING tugas antre, dan
+  INFERENCE_MAX_PENDING_PER_USER per user; lebih dari itu ExecutorBusy.
+- Dedup: permintaan dengan kunci yang sama dengan tugas yang masih antre/
+  berjalan mendapat tugas yang sama, bukan forward pass baru.
+- Pembatalan: permintaan baru dari sesi yang sama menggantikan yang lama;
+  tugas lama yang masih antre dan tidak dipakai sesi lain dibatalkan.
+  Tugas yang sudah berjalan dibiarkan selesai (hasilnya tetap masuk cache).
+- Adil per user: antrean per user dilayani bergiliran (round-robin),
+  sehingga batch satu user tidak membuat user lain menunggu di belakangnya.
+- Metrik: kedalaman antrean, jumlah berjalan, dan waktu tunggu/eksekusi.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+
+import config
+from telemetry import get_logger, get_telemetry
+
+log = get_logger("inference")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class ExecutorBusy(RuntimeError):
+    """Antrean inference penuh"""
+
+
+class InferenceTask:
+    """Handle satu permintaan inference; dipoll dengan done()/result()"""
+
+    def __init__(self, task_id, key, user, fn, args, kwargs):
+        self.id = task_id
+        self.key = key
+        self.user = user
+        self.sessions = set()
+        self.pinned = False                 # dipakai pemanggil tanpa sesi: tidak dibatalkan otomatis
+        self.status = QUEUED
+        self.result_value = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._fn, self._args, self._kwargs = fn, args, kwargs
+        self._event = threading.Event()
+
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def wait(self, timeout=None):
+        """Tunggu sampai selesai (hanya untuk CLI/benchmark, bukan script Streamlit)"""
+        self._event.wait(timeout)
+        return self.done()
+
+    def result(self):
+        """Hasil fungsi; melempar ulang error-nya bila gagal"""
+        if self.status == FAILED:
+            raise self.error
+        return self.result_value
+
+    @property
+    def wait_ms(self):
+        end = self.started or (self.finished if self.status == CANCELLED else None) or time.time()
+        return (end - self.submitted) * 1000
+
+    @property
+    def run_ms(self):
+        if self.started is None:
+            return 0.0
+        return ((self.finished or time.time()) - self.started) * 1000
+
+    def _finish(self, status, value=None, error=None):
+        self.status = status
+        self.result_value = value
+        self.error = error
+        self.finished = time.time()
+        self._fn = self._args = self._kwargs = None
+        self._event.set()
+
+
+class InferenceExecutor:
+    """Thread pool kecil dengan antrean per user, dedup dan pembatalan per sesi"""
+
+    def __init__(self, workers=1, max_pending=32, max_pending_per_user=8, history=200):
+        self.max_pending = int(max_pending)
+        self.max_pending_per_user = int(max_pending_per_user)
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()        # user -> deque[InferenceTask], urutan = giliran
+        self._inflight = {}                 # key -> InferenceTask (antre/berjalan)
+        self._latest = {}                   # sesi -> InferenceTask terakhir
+        self._ids = itertools.count(1)
+        self._pending = 0
+        self._running = 0
+        self._wait_ms = deque(maxlen=history)
+        self._run_ms = deque(maxlen=history)
+        self.counts = {"submitted": 0, "deduped": 0, "cancelled": 0, "completed": 0,
+                       "failed": 0, "rejected": 0}
+        self._threads = [threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True)
+                         for i in range(max(1, int(workers)))]
+        for thread in self._threads:
+            thread.start()
+
+    # ---------- Sisi UI ----------
+
+    def submit(self, key, fn, *args, user="anon", session=None, **kwargs):
+        """
+        Masukkan fn(*args, **kwargs) ke antrean dan kembalikan InferenceTask.
+
+        `key` mengidentifikasi hasil (gambar + model + parameter) untuk dedup;
+        `session` menandai pemilik sehingga permintaan berikutnya dari sesi
+        yang sama membatalkan yang lama.
+        """
+        with self._cond:
+            task = self._inflight.get(key)
+            if task is not None:
+                self.counts["deduped"] += 1
+            else:
+                queue = self._queues.get(user)
+                if self._pending >= self.max_pending or \
+                        (queue is not None and len(queue) >= self.max_pending_per_user):
+                    self.counts["rejected"] += 1
+                    raise ExecutorBusy("Antrean inference penuh, coba lagi sebentar lagi")
+                task = InferenceTask(next(self._ids), key, user, fn, args, kwargs)
+                self._queues.setdefault(user, deque()).append(task)
+                self._inflight[key] = task
+                self._pending += 1
+                self.counts["submitted"] += 1
+                self._cond.notify()
+            if session is not None:
+                previous = self._latest.get(session)
+                if previous is not None and previous is not task:
+                    self._release(previous, session)
+                self._latest[session] = task
+                task.sessions.add(session)
+            else:
+                task.pinned = True
+            return task
+
+    def cancel(self, task, session=None):
+        """
+        Lepaskan tugas dari sesi ini; dibatalkan bila masih antre dan tak dipakai
+        sesi lain. Tanpa `session` tugas yang masih antre selalu dibatalkan.
+        """
+        with self._cond:
+            if session is None:
+                task.pinned = False
+                task.sessions.clear()
+            elif self._latest.get(session) is task:
+                del self._latest[session]
+            return self._release(task, session)
+
+    def position(self, task):
+        """Perkiraan jumlah tugas yang dilayani sebelum `task` (0 = berikutnya / berjalan)"""
+        with self._cond:
+            if task.status != QUEUED:
+                return 0
+            queue = self._queues.get(task.user)
+            if queue is None or task not in queue:
+                return 0
+            index = queue.index(task)
+            # Round-robin: tiap user lain mendapat paling banyak index + 1 giliran lebih dulu
+            return index + sum(min(len(q), index + 1) for user, q in self._queues.items()
+                               if user != task.user)
+
+    def stats(self):
+        with self._cond:
+            now = time.time()
+            queued = [t for q in self._queues.values() for t in q]
+            waits = sorted(self._wait_ms)
+            return {
+                **self.counts,
+                "queue_depth": self._pending,
+                "running": self._running,
+                "workers": len(self._threads),
+                "queue_by_user": {user: len(q) for user, q in self._queues.items()},
+                "oldest_wait_ms": max(((now - t.submitted) * 1000 for t in queued), default=0.0),
+                "wait_ms_mean": sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p95": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+                "run_ms_mean": sum(self._run_ms) / len(self._run_ms) if self._run_ms else 0.0,
+            }
+
+    # ---------- Internal ----------
+
+    def _release(self, task, session):
+        task.sessions.discard(session)
+        if task.sessions or task.pinned or task.status != QUEUED:
+            return False
+        queue = self._queues.get(task.user)
+        if queue is not None and task in queue:
+            queue.remove(task)
+            if not queue:
+                del self._queues[task.user]
+        self._pending -= 1
+        self._inflight.pop(task.key, None)
+        self.counts["cancelled"] += 1
+        task._finish(CANCELLED)
+        return True
+
+    def _next(self):
+        """Ambil tugas dari user paling depan, lalu pindahkan user itu ke belakang giliran"""
+        user, queue = next(iter(self._queues.items()))
+        task = queue.popleft()
+        if queue:
+            self._queues.move_to_end(user)
+        else:
+            del self._queues[user]
+        self._pending -= 1
+        return task
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                task = self._next()
+                task.status = RUNNING
+                task.started = time.time()
+                self._running += 1
+                self._wait_ms.append(task.wait_ms)
+
+            try:
+                status, value, error = DONE, task._fn(*task._args, **task._kwargs), None
+            except Exception as e:
+                log.error("Tugas #%s gagal: %s", task.id, e)
+                status, value, error = FAILED, None, e
+
+            with self._cond:
+                self._running -= 1
+                self._inflight.pop(task.key, None)
+                self.counts["completed" if status == DONE else "failed"] += 1
+                task._finish(status, value, error)
+                self._run_ms.append(task.run_ms)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Instance executor bersama untuk seluruh proses"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = InferenceExecutor(workers=config.INFERENCE_WORKERS,
+                                          max_pending=config.INFERENCE_MAX_PENDING,
+                                          max_pending_per_user=config.INFERENCE_MAX_PENDING_PER_USER)
+            executor = _executor
+            telemetry = get_telemetry()
+            telemetry.add_gauge("karies_inference_queue_depth", "Tugas inference yang antre",
+                                lambda: executor.stats()["queue_depth"])
+            telemetry.add_gauge("karies_inference_running", "Tugas inference yang sedang berjalan",
+                                lambda: executor.stats()["running"])
+            telemetry.add_gauge("karies_inference_wait_seconds_p95", "Persentil 95 waktu tunggu antrean",
+                                lambda: executor.stats()["wait_ms_p95"] / 1000)
+        return _executor
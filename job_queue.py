@@ -0,0 +1,274 @@
+# job_queue.py
+"""
+Antrian job training persisten (SQLite) dengan scheduler.
+
+Halaman training dan components/train_karies.py sama-sama hanya men-submit job
+ke sini. Scheduler menjalankan paling banyak TRAIN_MAX_CONCURRENT_JOBS worker
+sekaligus (training_worker.py), masing-masing dibatasi TRAIN_THREADS_PER_JOB
+thread CPU. Setiap job mendapat nama run tetap (<prefix>_job0001), sehingga
+folder runs/train tidak lagi di-auto-increment, dan job yang terputus (mis.
+server restart) dilanjutkan dari weights/last.pt.
+"""
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import config
+from telemetry import get_logger
+from training_worker import launch_worker, read_events
+
+log = get_logger("scheduler")
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_name TEXT UNIQUE,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    threads INTEGER,
+    source TEXT,
+    pid INTEGER,
+    resume TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    metrics_file TEXT,
+    log_file TEXT,
+    error TEXT,
+    created REAL,
+    started REAL,
+    finished REAL
+)
+"""
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["epochs"] = job["params"]["epochs"]
+    return job
+
+
+class JobQueue:
+    """Antrian job training; aman dipakai beberapa proses sekaligus"""
+
+    def __init__(self, db_path, max_concurrent=1, threads_per_job=None,
+                 run_prefix="karies_yolo11_job", max_attempts=3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.threads_per_job = threads_per_job or max(1, (os.cpu_count() or 1) // self.max_concurrent)
+        self.run_prefix = run_prefix
+        self.max_attempts = max_attempts
+        self._processes = {}
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    # ---------- API ----------
+
+    def submit(self, data, model, epochs, batch, imgsz, threads=None, source="web"):
+        """Masukkan job baru ke antrian; kembalikan dict job"""
+        params = {"data": str(data), "model": str(model), "epochs": int(epochs),
+                  "batch": int(batch), "imgsz": int(imgsz)}
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            cur = db.execute(
+                "INSERT INTO jobs (status, params, threads, source, created) VALUES (?, ?, ?, ?, ?)",
+                ("queued", json.dumps(params), threads or self.threads_per_job, source, time.time()),
+            )
+            job_id = cur.lastrowid
+            run_name = f"{self.run_prefix}{job_id:04d}"
+            metrics_file = config.TRAIN_LOGS_DIR / f"{run_name}.jsonl"
+            db.execute("UPDATE jobs SET run_name = ?, metrics_file = ?, log_file = ? WHERE id = ?",
+                       (run_name, str(metrics_file), str(metrics_file.with_suffix(".log")), job_id))
+            db.execute("COMMIT")
+        self.tick()
+        return self.status(job_id)
+
+    def status(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list_jobs(self, limit=20):
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def cancel(self, job_id):
+        """Batalkan job yang masih antre atau hentikan yang sedang berjalan"""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT status, pid FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] not in ACTIVE_STATUSES:
+                db.execute("ROLLBACK")
+                return False
+            db.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ?",
+                       (time.time(), job_id))
+            db.execute("COMMIT")
+        if row["status"] == "running":
+            self._terminate(job_id, row["pid"])
+        return True
+
+    def wait(self, job_id, poll_interval=2.0, on_event=None):
+        """Jalankan scheduler di proses ini sampai job selesai (untuk CLI)"""
+        offset = 0
+        while True:
+            self.tick()
+            job = self.status(job_id)
+            if on_event and job["metrics_file"]:
+                events, offset = read_events(job["metrics_file"], offset)
+                for event in events:
+                    on_event(event)
+            if job["status"] not in ACTIVE_STATUSES:
+                return job
+            time.sleep(poll_interval)
+
+    # ---------- Scheduler ----------
+
+    def tick(self):
+        """Satu putaran scheduler: rapikan job yang berhenti lalu mulai job antre"""
+        with self._lock:
+            self._reap()
+            while self._start_next():
+                pass
+
+    def _reap(self):
+        with self._connect() as db:
+            running = [_row_to_job(r) for r in
+                       db.execute("SELECT * FROM jobs WHERE status = 'running'").fetchall()]
+        for job in running:
+            if self._is_alive(job):
+                continue
+            events, _ = read_events(job["metrics_file"]) if job["metrics_file"] else ([], 0)
+            end = next((e for e in events if e["event"] == "end"), None)
+            error = next((e for e in reversed(events) if e["event"] == "error"), None)
+            last_pt = config.TRAIN_RUNS_DIR / job["run_name"] / "weights" / "last.pt"
+
+            if end is not None:
+                self._finish(job["id"], "finished")
+            elif error is not None:
+                self._finish(job["id"], "failed", error["error"])
+            elif last_pt.exists() and job["attempts"] < self.max_attempts:
+                # Terputus tanpa pesan error (proses dimatikan/restart): lanjutkan nanti
+                with self._connect() as db:
+                    db.execute("UPDATE jobs SET status = 'queued', pid = NULL, resume = ? "
+                               "WHERE id = ? AND status = 'running'", (str(last_pt), job["id"]))
+            else:
+                self._finish(job["id"], "failed",
+                             f"Proses worker berhenti tanpa hasil, lihat log: {job['log_file']}")
+
+        # Buang Popen yang sudah selesai (termasuk job yang dibatalkan)
+        for job_id, process in list(self._processes.items()):
+            if process.poll() is not None:
+                self._processes.pop(job_id)
+
+    def _start_next(self):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            running = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if running >= self.max_concurrent or row is None:
+                db.execute("ROLLBACK")
+                return False
+            db.execute("UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1 "
+                       "WHERE id = ?", (time.time(), row["id"]))
+            db.execute("COMMIT")
+
+        job = _row_to_job(row)
+        try:
+            process = launch_worker(job["params"], job["run_name"], job["metrics_file"],
+                                    job["log_file"], threads=job["threads"], resume=job["resume"])
+        except Exception as e:
+            self._finish(job["id"], "failed", f"Gagal memulai worker: {e}")
+            return True
+        self._processes[job["id"]] = process
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET pid = ? WHERE id = ?", (process.pid, job["id"]))
+        return True
+
+    def _finish(self, job_id, status, error=None):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                       (status, error, time.time(), job_id))
+
+    def _is_alive(self, job):
+        process = self._processes.get(job["id"])
+        if process is not None:
+            return process.poll() is None
+        if not job["pid"]:
+            # Baru di-claim proses lain dan pid belum tercatat
+            return job["started"] and time.time() - job["started"] < 30
+        try:
+            import psutil
+            proc = psutil.Process(job["pid"])
+            return (proc.status() != psutil.STATUS_ZOMBIE
+                    and any("training_worker" in part for part in proc.cmdline()))
+        except ImportError:
+            # Tanpa psutil hanya bisa dicek apakah pid masih ada
+            try:
+                os.kill(job["pid"], 0)
+                return True
+            except OSError:
+                return False
+        except Exception:
+            return False
+
+    def _terminate(self, job_id, pid):
+        process = self._processes.get(job_id)
+        if process is not None:
+            process.terminate()
+            return
+        if pid:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+
+_queue = None
+_queue_lock = threading.Lock()
+_scheduler_thread = None
+
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(config.TRAIN_QUEUE_DB,
+                              max_concurrent=config.TRAIN_MAX_CONCURRENT_JOBS,
+                              threads_per_job=config.TRAIN_THREADS_PER_JOB,
+                              run_prefix=config.TRAIN_RUN_PREFIX,
+                              max_attempts=config.TRAIN_MAX_ATTEMPTS)
+        return _queue
+
+
+def start_scheduler(interval=2.0):
+    """Jalankan scheduler di thread latar belakang (sekali per proses)"""
+    global _scheduler_thread
+    queue = get_job_queue()
+    with _queue_lock:
+        if _scheduler_thread is not None and _scheduler_thread.is_alive():
+            return queue
+
+        def loop():
+            while True:
+                try:
+                    queue.tick()
+                except Exception as e:
+                    log.error("Error: %s", e)
+                time.sleep(interval)
+
+        _scheduler_thread = threading.Thread(target=loop, name="training-scheduler", daemon=True)
+        _scheduler_thread.start()
+    return queue
@@ -0,0 +1,313 @@
+# labeling_pipeline.py
+"""
+Pipeline labeling otomatis streaming: scan -> decode -> inference -> tulis.
+
+Setiap tahap berjalan di thread sendiri dan dihubungkan antrean berukuran
+tetap, sehingga memori tetap datar pada folder berisi puluhan ribu gambar:
+
+    scan (os.scandir)  ->  decoder (thread pool, cv2.imread)
+        ->  inference (batch predict_batch)  ->  writer (label .txt atomik)
+
+Pipeline bisa dilanjutkan (gambar yang file labelnya lebih baru dari file
+model dilewati), bisa dibatalkan, dan mencatat throughput per tahap agar
+bottleneck terlihat.
+
+    python labeling_pipeline.py data/unlabeled data/labels --conf 0.4
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import config
+from inference import predict_batch
+from preprocess_pipeline import pipeline_for_model
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+_DONE = object()
+
+
+def model_mtime(model):
+    """Waktu modifikasi file bobot model (0 bila tidak diketahui)"""
+    path = getattr(model, "ckpt_path", None) or getattr(model, "model_name", None)
+    try:
+        return os.stat(path).st_mtime
+    except (OSError, TypeError):
+        return 0.0
+
+
+def label_path_for(output_folder, image_name):
+    return Path(output_folder) / (os.path.splitext(image_name)[0] + ".txt")
+
+
+class StageStats:
+    """Jumlah item dan waktu sibuk satu tahap (thread-safe)"""
+
+    def __init__(self):
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items, seconds):
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def as_dict(self, workers=1):
+        # Throughput tahap = item / waktu sibuk per worker
+        busy = self.busy / max(1, workers)
+        return {"items": self.items, "busy_s": round(self.busy, 2),
+                "items_per_s": round(self.items / busy, 2) if busy else None}
+
+
+class LabelingPipeline:
+    """Labeling otomatis satu folder dengan tahap-tahap yang berjalan paralel"""
+
+    def __init__(self, model, input_folder, output_folder, confidence, batch_size=None,
+                 decode_workers=None, write_workers=None, queue_size=None, resume=True):
+        self.model = model
+        self.input_folder = Path(input_folder)
+        self.output_folder = Path(output_folder)
+        self.confidence = confidence
+        self.batch_size = int(batch_size or config.INFERENCE_BATCH_SIZE)
+        self.decode_workers = decode_workers or config.LABELING_DECODE_WORKERS
+        self.write_workers = write_workers or config.LABELING_WRITE_WORKERS
+        self.resume = resume
+        size = queue_size or config.LABELING_QUEUE_SIZE
+        self._paths = queue.Queue(maxsize=size)
+        self._decoded = queue.Queue(maxsize=max(size, self.batch_size * 2))
+        self._labels = queue.Queue(maxsize=size)
+        self._cancel = threading.Event()
+        self._threads = []
+        self._writers_left = self.write_workers
+        self._writers_lock = threading.Lock()
+        self.stats = {name: StageStats() for name in ("scan", "decode", "inference", "write")}
+        self.found = 0
+        self.skipped = 0
+        self.errors = deque(maxlen=config.LABELING_MAX_ERRORS)
+        self.failed = 0
+        self._errors_lock = threading.Lock()
+        self.scan_done = False
+        self.started = None
+        self.finished = None
+
+    def _error(self, file, error):
+        """Catat kegagalan; hanya LABELING_MAX_ERRORS error terakhir yang disimpan"""
+        with self._errors_lock:
+            self.failed += 1
+            self.errors.append({"file": file, "error": error})
+
+    # ---------- Kontrol ----------
+
+    def start(self):
+        """Jalankan semua tahap di thread latar belakang"""
+        self.output_folder.mkdir(parents=True, exist_ok=True)
+        self.started = time.perf_counter()
+        stages = [(self._scan, 1), (self._decode, self.decode_workers),
+                  (self._infer, 1), (self._write, self.write_workers)]
+        for target, workers in stages:
+            for i in range(workers):
+                thread = threading.Thread(target=target, name=f"label-{target.__name__[1:]}-{i}",
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def run(self):
+        """Jalankan sampai selesai (blocking); kembalikan status akhir"""
+        self.start()
+        self.join()
+        return self.status()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def status(self):
+        written = self.stats["write"].items
+        elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        return {
+            "found": self.found,
+            "scan_done": self.scan_done,
+            "skipped": self.skipped,
+            "written": written,
+            "failed": self.failed,
+            "errors": list(self.errors)[-20:],
+            "running": self.running,
+            "cancelled": self.cancelled,
+            "elapsed_s": round(elapsed, 2),
+            "images_per_s": round(written / elapsed, 2) if elapsed else None,
+            "stages": {
+                "scan": self.stats["scan"].as_dict(),
+                "decode": self.stats["decode"].as_dict(self.decode_workers),
+                "inference": self.stats["inference"].as_dict(),
+                "write": self.stats["write"].as_dict(self.write_workers),
+            },
+            "queues": {"paths": self._paths.qsize(), "decoded": self._decoded.qsize(),
+                       "labels": self._labels.qsize()},
+        }
+
+    # ---------- Tahap ----------
+
+    def _put(self, q, item):
+        """put ke antrean berbatas yang tetap responsif terhadap pembatalan"""
+        while not self._cancel.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q, timeout=0.2):
+        while not self._cancel.is_set():
+            try:
+                return q.get(timeout=timeout)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _scan(self):
+        min_mtime = model_mtime(self.model) if self.resume else None
+        try:
+            with os.scandir(self.input_folder) as entries:
+                for entry in entries:
+                    start = time.perf_counter()
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_SUFFIXES):
+                        continue
+                    self.found += 1
+                    done = min_mtime is not None and self._label_is_current(entry.name, min_mtime)
+                    self.stats["scan"].add(1, time.perf_counter() - start)
+                    if done:
+                        self.skipped += 1
+                        continue
+                    if not self._put(self._paths, entry.path):
+                        break
+        except OSError as e:
+            self._error(str(self.input_folder), str(e))
+        finally:
+            self.scan_done = True
+            for _ in range(self.decode_workers):
+                self._put(self._paths, _DONE)
+
+    def _label_is_current(self, image_name, min_mtime):
+        """Label sudah ada dan lebih baru dari file model"""
+        try:
+            return os.stat(label_path_for(self.output_folder, image_name)).st_mtime >= min_mtime
+        except FileNotFoundError:
+            return False
+
+    def _decode(self):
+        import cv2
+
+        while True:
+            path = self._get(self._paths)
+            if path is _DONE:
+                break
+            start = time.perf_counter()
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            self.stats["decode"].add(1, time.perf_counter() - start)
+            if image is None:
+                self._error(os.path.basename(path), "gagal membaca gambar")
+                continue
+            if not self._put(self._decoded, (os.path.basename(path), image)):
+                break
+        # Setiap decoder mengirim satu penanda selesai ke tahap inference
+        self._put(self._decoded, _DONE)
+
+    def _infer(self):
+        remaining = self.decode_workers
+        batch = []
+        while remaining:
+            item = self._get(self._decoded)
+            if item is _DONE:
+                if self._cancel.is_set():
+                    break
+                remaining -= 1
+            else:
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or item is _DONE):
+                self._infer_batch(batch)
+                batch = []
+        if batch and not self._cancel.is_set():
+            self._infer_batch(batch)
+        for _ in range(self.write_workers):
+            self._put(self._labels, _DONE)
+
+    def _infer_batch(self, batch):
+        names = [name for name, _ in batch]
+        start = time.perf_counter()
+        results = predict_batch(self.model, [image for _, image in batch], self.confidence,
+                                batch_size=len(batch), names=names, plot=False,
+                                pipeline=pipeline_for_model(self.model))
+        self.stats["inference"].add(len(batch), time.perf_counter() - start)
+        for result in results:
+            if result["success"]:
+                self._put(self._labels, (result["name"], result["detections"]))
+            else:
+                self._error(result["name"], result["error"])
+
+    def _write(self):
+        while True:
+            item = self._get(self._labels)
+            if item is _DONE:
+                break
+            name, detections = item
+            start = time.perf_counter()
+            try:
+                detections.save_yolo(label_path_for(self.output_folder, name))
+                self.stats["write"].add(1, time.perf_counter() - start)
+            except OSError as e:
+                self._error(name, str(e))
+        with self._writers_lock:
+            self._writers_left -= 1
+            if self._writers_left == 0:
+                self.finished = time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Labeling otomatis streaming")
+    parser.add_argument("input_folder")
+    parser.add_argument("output_folder")
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--batch", type=int, default=None)
+    parser.add_argument("--weights", default=None, help="default: model deteksi terpilih")
+    parser.add_argument("--no-resume", action="store_true", help="label ulang semua gambar")
+    args = parser.parse_args()
+
+    from model_registry import get_registry, latest_detection_model_path
+
+    model = get_registry().get(args.weights or latest_detection_model_path(), task="detect")
+    pipeline = LabelingPipeline(model, args.input_folder, args.output_folder, args.conf,
+                                batch_size=args.batch, resume=not args.no_resume).start()
+    try:
+        while pipeline.running:
+            time.sleep(2)
+            s = pipeline.status()
+            print(f"[LABEL] {s['written']} ditulis, {s['skipped']} dilewati, {s['failed']} gagal "
+                  f"({s['images_per_s']} gambar/s) antrean={s['queues']}")
+    except KeyboardInterrupt:
+        pipeline.cancel()
+        pipeline.join()
+    s = pipeline.status()
+    print(f"[LABEL] Selesai: {s['written']} ditulis, {s['skipped']} dilewati, {s['failed']} gagal")
+    for stage, stats in s["stages"].items():
+        print(f"  {stage:<10} {stats['items']:>7} item  {stats['items_per_s']} item/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# lazy_imports.py
+"""
+Impor tertunda untuk library berat (ultralytics, torch, cv2, pandas, plotly).
+
+    pd = lazy_import("pandas")      # belum mengimpor apa pun
+    pd.DataFrame(...)               # impor terjadi di sini, sekali saja
+
+Dipakai modul halaman agar memuat modulnya sendiri murah; biaya impor baru
+dibayar saat fungsi yang benar-benar memakai library tersebut dipanggil.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Proksi modul yang mengimpor modul aslinya saat atribut pertama diakses"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __repr__(self):
+        state = "dimuat" if self.loaded else "belum dimuat"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
+
+
+def import_attr(module_name, attr):
+    """Impor modul lalu ambil satu atribut, mis. fungsi halaman"""
+    return getattr(importlib.import_module(module_name), attr)
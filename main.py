@@ -9,15 +9,22 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Setelah itu baru import komponen lain
+# Setelah itu baru import komponen lain. Modul halaman (yang menarik
+# ultralytics, torch, cv2, pandas) baru diimpor saat halamannya dibuka.
 import sys
 import config
 from components.login import show_login_page
-from components.detection import show_detection_page
-from components.training import show_training_page
-from components.dashboard import show_about_page
-from components.preprocessing import show_preprocessing_page 
-from components.labeling import show_labeling_page 
+from lazy_imports import import_attr
+from run_catalog import warm_up_catalog
+from telemetry import start_metrics_server
+
+# Menu -> (modul, fungsi halaman)
+PAGES = {
+    "Dashboard": ("components.dashboard", "show_about_page"),
+    "Preprocessing": ("components.preprocessing", "show_preprocessing_page"),
+    "Latih Model": ("components.training", "show_training_page"),
+    "Deteksi Karies Gigi": ("components.detection", "show_detection_page"),
+}
 
 # ========== Custom CSS Styling ==========
 def setup_app():
@@ -101,6 +108,10 @@ def setup_app():
 
 def main():
     setup_app()
+    # Pindai runs/train sekali per proses di thread latar belakang
+    warm_up_catalog()
+    # GET /metrics lokal (METRICS_PORT) untuk histogram latensi proses ini
+    start_metrics_server()
     
     if "logged_in" not in st.session_state:
         st.session_state["logged_in"] = False
@@ -115,12 +126,7 @@ def main():
         # st.image("assets/logo.png", width=150)  # Make sure you have this image
         st.markdown("<h2 class='sidebar-header'>YOLO11 Karies</h2>", unsafe_allow_html=True)
         
-        menu_options = [
-        "Dashboard",
-        "Preprocessing",
-        "Latih Model",
-        "Deteksi Karies Gigi"
-        ]
+        menu_options = list(PAGES)
         
         # Create menu buttons
         for option in menu_options:
@@ -146,14 +152,9 @@ def main():
         st.markdown(f"## {st.session_state.menu_selected}")
         st.markdown("---")
         
-        if st.session_state.menu_selected == "Deteksi Karies Gigi":
-            show_detection_page()
-        elif st.session_state.menu_selected == "Latih Model":
-            show_training_page()
-        elif st.session_state.menu_selected == "Dashboard":
-            show_about_page()
-        elif st.session_state.menu_selected == "Preprocessing":
-            show_preprocessing_page()
+        page = PAGES.get(st.session_state.menu_selected)
+        if page is not None:
+            import_attr(*page)()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,340 @@
+# model_registry.py
+"""
+Registry model YOLO yang dipakai bersama oleh semua sesi dan rerun Streamlit.
+
+Modul Python hanya diimpor sekali per proses server, sehingga instance registry
+di sini bertahan melewati rerun script. Model disimpan berdasarkan
+(path absolut, mtime, ukuran file, task) sehingga file bobot yang ditimpa
+otomatis dimuat ulang, dan jumlah model yang tinggal di memori dibatasi LRU.
+"""
+import hashlib
+import importlib.util
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import config
+from telemetry import get_logger
+
+log = get_logger("registry")
+
+# Task Ultralytics untuk setiap jenis model di UI
+MODEL_TASKS = {
+    'Detection': 'detect',
+    'Segmentation': 'segment',
+    'Pose Estimation': 'pose',
+}
+
+
+def model_key(model_path, task=None):
+    """Kunci cache: path absolut + mtime + ukuran file + task"""
+    path = Path(model_path).resolve()
+    stat = path.stat()
+    return (str(path), stat.st_mtime_ns, stat.st_size, task)
+
+
+def model_fingerprint(model):
+    """Sidik jari singkat file bobot model (path + mtime + ukuran)"""
+    source = getattr(model, "ckpt_path", None) or getattr(model, "model_name", None) or repr(model)
+    try:
+        key = model_key(source)[:3]
+    except (OSError, TypeError):
+        key = (str(source),)
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+
+
+def model_memory_bytes(model):
+    """Perkiraan memori parameter + buffer model (byte)"""
+    try:
+        module = model.model
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        # Backend non-PyTorch: pakai ukuran file/folder bobot sebagai perkiraan
+        path = Path(getattr(model, "ckpt_path", None) or getattr(model, "model_name", ""))
+        if path.is_dir():
+            return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+        return path.stat().st_size if path.is_file() else 0
+
+
+# Lokasi file hasil export (lihat export_model.py) relatif terhadap best.pt
+BACKEND_SUFFIXES = {
+    'pytorch': '.pt',
+    'onnx': '.onnx',
+    'onnx-int8': '_int8.onnx',
+    'openvino': '_openvino_model',
+}
+BACKEND_RUNTIMES = {
+    'onnx': 'onnxruntime',
+    'onnx-int8': 'onnxruntime',
+    'openvino': 'openvino',
+}
+BACKEND_REPORT_NAME = 'backend_report.json'
+
+
+def backend_path(pt_path, backend):
+    pt_path = Path(pt_path)
+    return pt_path.with_name(pt_path.stem + BACKEND_SUFFIXES[backend])
+
+
+def backend_available(pt_path, backend):
+    """File hasil export ada dan runtime-nya terpasang"""
+    runtime = BACKEND_RUNTIMES.get(backend)
+    if runtime is not None and importlib.util.find_spec(runtime) is None:
+        return False
+    return backend_path(pt_path, backend).exists()
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    """SHA-1 isi file"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def weights_fingerprint(pt_path):
+    """Identitas file .pt yang dicatat di backend_report.json saat export"""
+    stat = Path(pt_path).stat()
+    return {"sha1": file_sha1(pt_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def report_matches_weights(pt_path, report):
+    """
+    True bila laporan export dibuat dari isi .pt yang sekarang. mtime + ukuran
+    yang sama dianggap cocok; bila mtime berubah, isi dibandingkan lewat SHA-1.
+    Laporan lama tanpa "source" dianggap kedaluwarsa.
+    """
+    source = (report or {}).get("source")
+    if not source:
+        return False
+    try:
+        stat = Path(pt_path).stat()
+        if stat.st_size != source.get("size"):
+            return False
+        return stat.st_mtime_ns == source.get("mtime_ns") or file_sha1(pt_path) == source.get("sha1")
+    except OSError:
+        return False
+
+
+def read_backend_report(pt_path):
+    report_path = Path(pt_path).with_name(BACKEND_REPORT_NAME)
+    try:
+        return json.loads(report_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def resolve_backend_path(pt_path, backend=None):
+    """
+    Path model untuk backend yang dipilih di config.INFERENCE_BACKEND.
+
+    'auto' memilih backend dengan latency terendah di backend_report.json yang
+    lolos uji paritas akurasi dan tersedia di mesin ini; tanpa laporan, tetap
+    memakai checkpoint PyTorch. Backend eksplisit yang tidak tersedia juga
+    jatuh kembali ke .pt. File export yang dibuat dari isi .pt lain (best.pt
+    ditimpa oleh resume atau training ulang) tidak pernah dipakai.
+    """
+    backend = backend or config.INFERENCE_BACKEND
+    if Path(pt_path).suffix != '.pt' or backend == 'pytorch':
+        return str(pt_path)
+
+    report = read_backend_report(pt_path)
+    if report is not None and not report_matches_weights(pt_path, report):
+        log.warning("Export untuk %s dibuat dari bobot lama, memakai PyTorch", pt_path)
+        return str(pt_path)
+
+    if backend != 'auto':
+        if report is not None and backend_available(pt_path, backend):
+            return str(backend_path(pt_path, backend))
+        log.warning("Backend %s tidak tersedia untuk %s, memakai PyTorch", backend, pt_path)
+        return str(pt_path)
+
+    report = report or {}
+    candidates = [
+        (result["latency_ms"], name)
+        for name, result in report.get("backends", {}).items()
+        if result.get("passed") and result.get("latency_ms") is not None
+        and (name == 'pytorch' or backend_available(pt_path, name))
+    ]
+    if not candidates:
+        return str(pt_path)
+    return str(backend_path(pt_path, min(candidates)[1]))
+
+
+def _load_yolo(model_path, task=None):
+    from ultralytics import YOLO
+    model = YOLO(Path(model_path), task=task)
+    # Model hasil export tidak menyimpan imgsz training; ambil dari laporan export
+    if Path(model_path).suffix != '.pt':
+        report = read_backend_report(model_path) or {}
+        if report.get("imgsz"):
+            model.overrides.setdefault("imgsz", report["imgsz"])
+    return model
+
+
+class ModelEntry:
+    """Satu model yang sedang tinggal di memori beserta statistiknya"""
+
+    def __init__(self, key, model, load_time):
+        self.key = key
+        self.model = model
+        self.load_time = load_time
+        self.warmup_time = 0.0
+        self.hits = 0
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.memory_bytes = model_memory_bytes(model)
+
+    def as_dict(self):
+        path, mtime_ns, size, task = self.key
+        return {
+            "Model": Path(path).name,
+            "Path": path,
+            "Task": task or "-",
+            "Load (detik)": round(self.load_time, 3),
+            "Warm-up (detik)": round(self.warmup_time, 3),
+            "Hit": self.hits,
+            "Memori (MB)": round(self.memory_bytes / 1024 ** 2, 1),
+            "Terakhir Dipakai": time.strftime("%H:%M:%S", time.localtime(self.last_used)),
+        }
+
+
+class ModelRegistry:
+    """Cache model LRU yang aman dipakai banyak thread"""
+
+    def __init__(self, max_models=3, warmup_imgsz=640, loader=_load_yolo):
+        self.max_models = max(1, int(max_models))
+        self.warmup_imgsz = warmup_imgsz
+        self._loader = loader
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_path, task=None):
+        """Ambil model dari cache, atau muat + warm-up bila belum ada"""
+        key = model_key(model_path, task)
+
+        with self._lock:
+            entry = self._touch(key)
+            if entry is not None:
+                return entry.model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Muat di luar lock utama supaya model lain tetap bisa dilayani
+        with key_lock:
+            try:
+                with self._lock:
+                    entry = self._touch(key)
+                    if entry is not None:
+                        return entry.model
+
+                start = time.perf_counter()
+                model = self._loader(model_path, task)
+                entry = ModelEntry(key, model, time.perf_counter() - start)
+                entry.warmup_time = self._warmup(model)
+
+                with self._lock:
+                    self.misses += 1
+                    self._drop_stale_versions(key)
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_models:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                return model
+            finally:
+                # Juga saat loader gagal, supaya _key_locks tidak menumpuk
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+
+    def _touch(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            entry.last_used = time.time()
+            self.hits += 1
+        return entry
+
+    def _drop_stale_versions(self, key):
+        """Buang versi lama dari file yang sama (bobot sudah ditimpa)"""
+        path, _, _, task = key
+        for old_key in [k for k in self._entries if k[0] == path and k[3] == task]:
+            del self._entries[old_key]
+            self.evictions += 1
+
+    def _warmup(self, model):
+        """Jalankan satu prediksi dummy agar fuse dan setup predictor terjadi sekarang"""
+        if not self.warmup_imgsz:
+            return 0.0
+        try:
+            import numpy as np
+            dummy = np.zeros((self.warmup_imgsz, self.warmup_imgsz, 3), dtype=np.uint8)
+            start = time.perf_counter()
+            model.predict(dummy, imgsz=self.warmup_imgsz, verbose=False)
+            return time.perf_counter() - start
+        except Exception as e:
+            log.warning("Warm-up gagal: %s", e)
+            return 0.0
+
+    def evict(self, model_path=None):
+        """Hapus satu model (atau semua bila path kosong) dari cache"""
+        with self._lock:
+            if model_path is None:
+                self.evictions += len(self._entries)
+                self._entries.clear()
+                return
+            path = str(Path(model_path).resolve())
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+                self.evictions += 1
+
+    def stats(self):
+        """Ringkasan hit/miss dan daftar model yang tinggal di memori"""
+        with self._lock:
+            entries = [e.as_dict() for e in reversed(self._entries.values())]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "resident_bytes": sum(e.memory_bytes for e in self._entries.values()),
+                "entries": entries,
+            }
+
+
+_registry = ModelRegistry(max_models=config.MODEL_CACHE_SIZE,
+                          warmup_imgsz=config.MODEL_WARMUP_IMGSZ)
+
+_latest_lock = threading.Lock()
+_latest_checked = 0.0
+_latest_path = None
+
+
+def get_registry():
+    return _registry
+
+
+def latest_detection_model_path():
+    """
+    Path model deteksi terpilih (katalog run, MODEL_SELECTION) untuk backend di
+    INFERENCE_BACKEND. Katalog dibaca ulang paling sering sekali per
+    MODEL_RESCAN_INTERVAL detik, sehingga best.pt baru dari training otomatis
+    dipakai tanpa restart aplikasi.
+    """
+    global _latest_checked, _latest_path
+    with _latest_lock:
+        now = time.monotonic()
+        if _latest_path is None or now - _latest_checked >= config.MODEL_RESCAN_INTERVAL:
+            latest = config.get_latest_trained_model_path()
+            _latest_path = resolve_backend_path(latest or config.DETECTION_MODEL)
+            _latest_checked = now
+        return _latest_path
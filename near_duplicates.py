@@ -0,0 +1,354 @@
+# near_duplicates.py
+"""
+Deteksi gambar hampir sama (perceptual hash) dan kebocoran train/val/test.
+
+Setiap gambar diringkas menjadi pHash 64 bit (DCT 32x32 -> 8x8 frekuensi
+rendah). Hash dihitung paralel di process pool dan di-cache per file
+(ukuran + mtime), jadi hanya gambar baru/berubah yang didecode ulang.
+
+Pencarian tetangga memakai multi-index hashing: hash dipecah menjadi
+4 potongan 16 bit. Dua hash dengan jarak Hamming <= r pasti memiliki satu
+potongan yang berjarak <= ceil((r + 1) / 4) - 1, sehingga kandidat cukup dicari
+dengan membalik sedikit bit pada satu potongan dan searchsorted di array
+potongan yang terurut. Tidak ada perbandingan semua pasangan (O(n^2)).
+
+    python near_duplicates.py config/karies.yaml --radius 6
+    python near_duplicates.py config/karies.yaml --move-to runs/duplikat
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+import config
+from dataset_index import IMAGE_SUFFIXES, labels_dir_for, resolve_splits
+
+CHUNKS = 4
+CHUNK_BITS = 16
+HASH_VERSION = 1
+# Saat menghapus, anggota grup yang disimpan diutamakan dari split evaluasi
+KEEP_PRIORITY = ("test", "valid", "train")
+
+
+def popcount(x):
+    """Jumlah bit 1 per elemen array uint64"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).astype(np.int32)
+    bits = np.unpackbits(np.ascontiguousarray(x, dtype=np.uint64).view(np.uint8).reshape(-1, 8), axis=1)
+    return bits.sum(axis=1).astype(np.int32)
+
+
+def phash(gray):
+    """pHash 64 bit dari gambar grayscale uint8 (ukuran berapa pun)"""
+    import cv2
+
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].reshape(-1)
+    # Komponen DC tidak ikut menentukan median agar kecerahan tidak mendominasi
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hash_file(path):
+    """pHash satu file, atau None bila gagal dibaca"""
+    import cv2
+
+    # Decode JPEG sudah diperkecil 4x oleh libjpeg: hash hanya butuh 32x32
+    gray = cv2.imread(str(path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None or gray.size == 0:
+        gray = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+    return None if gray is None else phash(gray)
+
+
+def _hash_many(paths):
+    import cv2
+
+    cv2.setNumThreads(1)
+    return [hash_file(p) for p in paths]
+
+
+def hash_files(paths, workers=None, chunk_size=64):
+    """pHash banyak file secara paralel -> (hash uint64, mask berhasil)"""
+    paths = [str(p) for p in paths]
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if len(chunks) <= 1 or workers == 1:
+        results = [h for chunk in chunks for h in _hash_many(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            results = [h for hashes in pool.map(_hash_many, chunks) for h in hashes]
+    ok = np.array([h is not None for h in results], dtype=bool)
+    hashes = np.array([h or 0 for h in results], dtype=np.uint64)
+    return hashes, ok
+
+
+def _flip_masks(width, radius):
+    """Semua bitmask selebar `width` dengan paling banyak `radius` bit 1"""
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(width), r):
+            masks.append(sum(1 << b for b in bits))
+    return np.array(masks, dtype=np.uint64)
+
+
+class HashIndex:
+    """Indeks multi-index hashing untuk query jarak Hamming pada hash 64 bit"""
+
+    def __init__(self, hashes):
+        self.hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+        self._order, self._sorted = [], []
+        for c in range(CHUNKS):
+            keys = self._chunk(self.hashes, c)
+            order = np.argsort(keys, kind="stable")
+            self._order.append(order)
+            self._sorted.append(keys[order])
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def _chunk(hashes, c):
+        return (hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64((1 << CHUNK_BITS) - 1)
+
+    @staticmethod
+    def chunk_radius(radius):
+        # Pigeonhole: jarak total <= radius -> ada potongan dengan jarak <= nilai ini
+        return -(-(radius + 1) // CHUNKS) - 1
+
+    def _probe(self, queries, radius):
+        """Pasangan kandidat (indeks query, indeks di indeks) untuk setiap potongan dan bitmask"""
+        masks = _flip_masks(CHUNK_BITS, self.chunk_radius(radius))
+        for c in range(CHUNKS):
+            keys = self._chunk(queries, c)
+            for mask in masks:
+                probe = keys ^ mask
+                lo = np.searchsorted(self._sorted[c], probe, side="left")
+                hi = np.searchsorted(self._sorted[c], probe, side="right")
+                counts = hi - lo
+                if not counts.any():
+                    continue
+                q = np.repeat(np.arange(len(queries)), counts)
+                # Posisi dalam run tiap query: lo + 0..count-1
+                offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                yield q, self._order[c][np.repeat(lo, counts) + offsets]
+
+    def neighbors(self, query, radius):
+        """Indeks hash yang berjarak Hamming <= radius dari satu hash"""
+        queries = np.array([query], dtype=np.uint64)
+        found = set()
+        for _, idx in self._probe(queries, radius):
+            dist = popcount(self.hashes[idx] ^ queries[0])
+            found.update(idx[dist <= radius].tolist())
+        return sorted(found)
+
+    def pairs(self, radius):
+        """Semua pasangan (i, j, jarak) dengan i < j dan jarak Hamming <= radius"""
+        found = []
+        for i, j in self._probe(self.hashes, radius):
+            keep = i < j
+            i, j = i[keep], j[keep]
+            dist = popcount(self.hashes[i] ^ self.hashes[j])
+            ok = dist <= radius
+            found.append(np.stack([i[ok], j[ok], dist[ok]], axis=1))
+        if not found:
+            return np.zeros((0, 3), np.int64)
+        return np.unique(np.concatenate(found).astype(np.int64), axis=0)
+
+
+def _groups(n, pairs):
+    """Komponen terhubung (union-find) dari pasangan -> list indeks per grup (ukuran >= 2)"""
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j, _ in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+    members = {}
+    for idx in np.unique(pairs[:, :2]):
+        members.setdefault(int(find(idx)), []).append(int(idx))
+    return list(members.values())
+
+
+class _HashCache:
+    """pHash per file dari pemindaian sebelumnya, dikunci ukuran + mtime"""
+
+    def __init__(self, path, load=True):
+        self.path = Path(path)
+        self.entries = {}
+        if not load:
+            return
+        try:
+            with np.load(self.path) as data:
+                if int(data["version"]) == HASH_VERSION:
+                    for key, size, mtime, h in zip(data["keys"], data["sizes"], data["mtimes"], data["hashes"]):
+                        self.entries[str(key)] = (int(size), int(mtime), np.uint64(h))
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # Cache rusak/terpotong dianggap kosong; penyimpanan berikutnya menimpanya
+            self.entries = {}
+
+    def get(self, key, size, mtime_ns):
+        entry = self.entries.get(key)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    def save(self, keys, sizes, mtimes, hashes):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, version=HASH_VERSION, keys=np.array(keys, dtype=str),
+                 sizes=np.array(sizes, np.int64), mtimes=np.array(mtimes, np.int64),
+                 hashes=np.asarray(hashes, np.uint64))
+        os.replace(tmp, self.path)
+
+
+def find_duplicates(dataset_config, radius=None, workers=None, use_cache=True):
+    """
+    Cari gambar hampir sama di seluruh split dataset.
+
+    Mengembalikan dict: images (split, path), groups (list grup indeks gambar),
+    pairs (N x 3: i, j, jarak), within (jumlah gambar duplikat per split),
+    leakage (jumlah pasangan lintas split, mis. "train-valid") dan waktu.
+    """
+    radius = config.DEDUP_RADIUS if radius is None else radius
+    start = time.perf_counter()
+    _, splits = resolve_splits(dataset_config)
+
+    images = []
+    for split, images_dir in splits.items():
+        try:
+            with os.scandir(images_dir) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_file() and entry.name.lower().endswith(IMAGE_SUFFIXES):
+                        stat = entry.stat()
+                        images.append((split, Path(entry.path), stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            continue
+
+    key = "|".join(f"{s}={p.resolve()}" for s, p in sorted(splits.items()))
+    cache = _HashCache(Path(config.DATASET_INDEX_DIR) / f"phash-{hashlib.sha1(key.encode()).hexdigest()[:16]}.npz",
+                       load=use_cache)
+    keys = [f"{split}/{path.name}" for split, path, _, _ in images]
+    hashes = np.zeros(len(images), np.uint64)
+    ok = np.ones(len(images), bool)
+    todo = []
+    for i, (k, (_, path, size, mtime)) in enumerate(zip(keys, images)):
+        cached = cache.get(k, size, mtime) if use_cache else None
+        if cached is None:
+            todo.append(i)
+        else:
+            hashes[i] = cached
+    hashed_at = time.perf_counter()
+    if todo:
+        new_hashes, new_ok = hash_files([images[i][1] for i in todo], workers=workers)
+        hashes[todo], ok[todo] = new_hashes, new_ok
+    hash_seconds = time.perf_counter() - hashed_at
+    if use_cache:
+        keep = np.flatnonzero(ok)
+        cache.save([keys[i] for i in keep], [images[i][2] for i in keep],
+                   [images[i][3] for i in keep], hashes[keep])
+
+    valid = np.flatnonzero(ok)
+    index = HashIndex(hashes[valid])
+    pairs = index.pairs(radius)
+    pairs[:, :2] = valid[pairs[:, :2]] if len(pairs) else pairs[:, :2]
+    groups = _groups(len(images), pairs)
+
+    split_of = np.array([split for split, *_ in images], dtype=object)
+    within, leakage = {}, {}
+    for group in groups:
+        for split in set(split_of[group]):
+            count = int((split_of[group] == split).sum())
+            if count > 1:
+                within[split] = within.get(split, 0) + count - 1
+    for i, j, _ in pairs:
+        if split_of[i] != split_of[j]:
+            name = "-".join(sorted((split_of[i], split_of[j]), key=list(splits).index))
+            leakage[name] = leakage.get(name, 0) + 1
+
+    return {
+        "images": [(split, path) for split, path, _, _ in images],
+        "unreadable": [str(images[i][1]) for i in np.flatnonzero(~ok)],
+        "pairs": pairs,
+        "groups": groups,
+        "within": within,
+        "leakage": leakage,
+        "radius": radius,
+        "hashed": len(todo),
+        "hash_seconds": round(hash_seconds, 3),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def removal_plan(report):
+    """Satu gambar disimpan per grup (utamakan test, lalu valid); sisanya (split, path) dibuang"""
+    images = report["images"]
+    plan = []
+    for group in report["groups"]:
+        rank = sorted(group, key=lambda i: (KEEP_PRIORITY.index(images[i][0])
+                                            if images[i][0] in KEEP_PRIORITY else len(KEEP_PRIORITY),
+                                            images[i][1].name))
+        plan += [images[i] for i in rank[1:]]
+    return plan
+
+
+def move_duplicates(plan, target_dir):
+    """Pindahkan gambar duplikat beserta labelnya ke target_dir/<split>/{images,labels}"""
+    moved = 0
+    for split, path in plan:
+        dest = Path(target_dir) / split
+        (dest / "images").mkdir(parents=True, exist_ok=True)
+        (dest / "labels").mkdir(parents=True, exist_ok=True)
+        label = labels_dir_for(path.parent) / f"{path.stem}.txt"
+        shutil.move(str(path), str(dest / "images" / path.name))
+        if label.exists():
+            shutil.move(str(label), str(dest / "labels" / label.name))
+        moved += 1
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deteksi duplikat dan kebocoran antar split dataset")
+    parser.add_argument("dataset_config", help="file YAML dataset, mis. config/karies.yaml")
+    parser.add_argument("--radius", type=int, default=None, help="jarak Hamming maksimum (default config)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--list", action="store_true", help="tampilkan setiap grup duplikat")
+    parser.add_argument("--move-to", default=None,
+                        help="pindahkan duplikat (gambar + label) ke folder ini, bukan dihapus")
+    args = parser.parse_args()
+
+    report = find_duplicates(args.dataset_config, radius=args.radius, workers=args.workers,
+                             use_cache=not args.no_cache)
+    images = report["images"]
+    print(f"[DEDUP] {len(images)} gambar, {report['hashed']} di-hash ({report['hash_seconds']} detik), "
+          f"{len(report['pairs'])} pasangan dalam radius {report['radius']}, "
+          f"{len(report['groups'])} grup, total {report['seconds']} detik")
+    for split, count in report["within"].items():
+        print(f"[DEDUP] Duplikat di {split}: {count} gambar")
+    for name, count in report["leakage"].items():
+        print(f"[DEDUP] Kebocoran {name}: {count} pasangan")
+    for path in report["unreadable"]:
+        print(f"[DEDUP] Gagal dibaca: {path}")
+    if args.list:
+        for group in report["groups"]:
+            print("  " + "  ".join(f"{images[i][0]}/{images[i][1].name}" for i in group))
+    if args.move_to:
+        plan = removal_plan(report)
+        moved = move_duplicates(plan, args.move_to)
+        print(f"[DEDUP] {moved} gambar dipindahkan ke {args.move_to}")
+
+
+if __name__ == "__main__":
+    main()
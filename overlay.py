@@ -0,0 +1,146 @@
+# overlay.py
+"""
+Overlay kotak deteksi ringan untuk halaman deteksi.
+
+Alih-alih result.plot() pada gambar resolusi penuh lalu st.image mengirim
+PNG besar ke browser, kotak digambar di atas pratinjau yang sudah diperkecil
+(LoadedImage.preview, sisi terpanjang PREVIEW_MAX_SIDE) dan hasilnya dikirim
+sebagai JPEG. Hasil encode di-cache per (gambar, kotak yang tampil), sehingga
+rerun yang tidak mengubah apa pun tidak meng-encode ulang, dan mengubah
+threshold atau kelas yang ditampilkan hanya menggambar ulang overlay di atas
+pratinjau yang sama, tanpa inference maupun decode ulang.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from lazy_imports import lazy_import
+from telemetry import stage_timer
+
+cv2 = lazy_import("cv2")
+
+# Palet warna kelas (RGB), urutan sama seperti plotter Ultralytics
+PALETTE = [(255, 56, 56), (255, 157, 151), (255, 112, 31), (255, 178, 29), (207, 210, 49),
+           (72, 249, 10), (146, 204, 23), (61, 219, 134), (26, 147, 52), (0, 212, 187)]
+
+
+def class_color(class_id):
+    return PALETTE[int(class_id) % len(PALETTE)]
+
+
+def draw_overlay(preview, detections, labels=None):
+    """Salinan `preview` (RGB) dengan kotak Detections yang diskalakan ke ukuran pratinjau"""
+    canvas = preview.copy()
+    if detections is None or len(detections) == 0:
+        return canvas
+    height, width = canvas.shape[:2]
+    scale = np.array([width / detections.image_size[0], height / detections.image_size[1]] * 2,
+                     dtype=np.float32)
+    boxes = np.rint(detections.xyxy * scale).astype(np.int32)
+    thickness = max(1, round(max(height, width) / 500))
+    font_scale = thickness / 3
+    for (x1, y1, x2, y2), conf, cls in zip(boxes.tolist(), detections.conf.tolist(), detections.cls.tolist()):
+        color = class_color(cls)
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), color, thickness, cv2.LINE_AA)
+        name = labels[cls] if labels is not None and 0 <= cls < len(labels) else str(cls)
+        text = f"{name} {conf:.2f}"
+        (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)
+        top = y1 - text_h - baseline - 2 if y1 - text_h - baseline - 2 >= 0 else y1
+        cv2.rectangle(canvas, (x1, top), (x1 + text_w + 2, top + text_h + baseline + 2), color, -1)
+        cv2.putText(canvas, text, (x1 + 1, top + text_h + 1), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                    (255, 255, 255), 1, cv2.LINE_AA)
+    return canvas
+
+
+def encode_jpeg(rgb, quality=None):
+    """Array RGB -> byte JPEG untuk st.image"""
+    quality = quality or config.PREVIEW_JPEG_QUALITY
+    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR) if rgb.ndim == 3 else rgb
+    ok, buffer = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("Gagal meng-encode pratinjau JPEG")
+    return buffer.tobytes()
+
+
+def detections_digest(detections):
+    """Hash pendek kotak yang tampil (None/kosong -> "kosong")"""
+    if detections is None or len(detections) == 0:
+        return "kosong"
+    h = hashlib.sha1(detections.to_array().tobytes())
+    h.update(str(detections.image_size).encode())
+    return h.hexdigest()[:16]
+
+
+class OverlayCache:
+    """LRU byte JPEG hasil render, dibatasi total ukuran"""
+
+    def __init__(self, max_bytes=32 * 1024 ** 2):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                    "bytes": self._bytes, "hit_rate": self.hits / total if total else 0.0}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_overlay_cache():
+    """Instance cache overlay bersama untuk seluruh proses"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = OverlayCache(max_bytes=config.OVERLAY_CACHE_MAX_BYTES)
+        return _cache
+
+
+def render_overlay(preview, detections=None, labels=None, image_key=None):
+    """
+    JPEG pratinjau dengan overlay kotak (tanpa kotak bila `detections` None).
+
+    `image_key` mengidentifikasi gambar sumber (mis. nama + ukuran unggahan);
+    bila diberikan, hasil encode di-cache per (gambar, ukuran pratinjau, kotak).
+    """
+    key = None
+    if image_key is not None:
+        key = (image_key, preview.shape, detections_digest(detections), tuple(labels or ()))
+        data = get_overlay_cache().get(key)
+        if data is not None:
+            return data
+    with stage_timer("overlay", detections.model if detections is not None else None):
+        data = encode_jpeg(draw_overlay(preview, detections, labels))
+    if key is not None:
+        get_overlay_cache().put(key, data)
+    return data
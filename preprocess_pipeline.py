@@ -0,0 +1,236 @@
+# preprocess_pipeline.py
+"""
+Pipeline perbaikan gambar yang sama untuk preprocessing dataset dan inference.
+
+PreprocessPipeline bekerja langsung pada buffer NumPy uint8 (BGR atau
+grayscale) tanpa bolak-balik ke PIL:
+
+- jalur cepat grayscale: rontgen yang ketiga kanalnya sama diproses sebagai
+  satu kanal (denoise/sharpen/CLAHE sekitar 3x lebih sedikit kerja);
+- resize digabung di depan: bila gambar diperkecil, resize dilakukan dulu
+  sehingga filter berjalan di resolusi target, bukan resolusi asli;
+- buffer kerja (scratch) dipakai ulang per thread, dan hasil ditulis ke
+  `out` bila diberikan, sehingga satu panggilan tidak membuat salinan
+  gambar penuh di setiap tahap.
+
+Konfigurasi pipeline disimpan sebagai preprocess.json di folder dataset
+hasil preprocessing, lalu disalin ke folder run training. Halaman deteksi
+membacanya dari run model yang aktif (pipeline_for_model), sehingga model
+melihat input yang sama seperti saat dilatih.
+"""
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from lazy_imports import lazy_import
+
+cv2 = lazy_import("cv2")
+
+PIPELINE_FILE = "preprocess.json"
+# Selisih kanal maksimum yang masih dianggap grayscale (artefak JPEG)
+GRAY_TOLERANCE = 2
+SHARPEN_KERNEL = np.array([[0, -1, 0],
+                           [-1, 5, -1],
+                           [0, -1, 0]], dtype=np.float32)
+
+
+def is_grayscale(image, tolerance=GRAY_TOLERANCE, step=4):
+    """True bila gambar 1 kanal atau ketiga kanalnya (hampir) sama; diperiksa pada sampel piksel"""
+    if image.ndim == 2 or image.shape[2] == 1:
+        return True
+    sample = image[::step, ::step, :3]
+    return int(cv2.absdiff(sample[..., 0], sample[..., 1]).max()) <= tolerance and \
+        int(cv2.absdiff(sample[..., 1], sample[..., 2]).max()) <= tolerance
+
+
+class PreprocessPipeline:
+    """Denoise -> sharpen -> CLAHE (+ resize ke size x size) pada array uint8"""
+
+    VERSION = 1
+
+    def __init__(self, size=None, sharpen=True, denoise=True, contrast=False, grayscale="auto"):
+        self.size = int(size) if size else None
+        self.sharpen = bool(sharpen)
+        self.denoise = bool(denoise)
+        self.contrast = bool(contrast)
+        self.grayscale = grayscale      # "auto", True (selalu) atau False (selalu warna)
+        self._local = threading.local()
+
+    # ---------- Serialisasi ----------
+
+    @classmethod
+    def from_params(cls, params):
+        """Dari dict parameter preprocessing_engine (ukuran, ketajaman, noise, kontras)"""
+        return cls(size=params.get("ukuran"), sharpen=params.get("ketajaman", True),
+                   denoise=params.get("noise", True), contrast=params.get("kontras", False))
+
+    def to_dict(self):
+        return {"version": self.VERSION, "size": self.size, "sharpen": self.sharpen,
+                "denoise": self.denoise, "contrast": self.contrast, "grayscale": self.grayscale}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(size=data.get("size"), sharpen=data.get("sharpen", True),
+                   denoise=data.get("denoise", True), contrast=data.get("contrast", False),
+                   grayscale=data.get("grayscale", "auto"))
+
+    def save(self, path):
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    @property
+    def key(self):
+        """String pendek untuk kunci cache hasil"""
+        flags = "".join("1" if f else "0" for f in (self.denoise, self.sharpen, self.contrast))
+        return f"pre{self.VERSION}:{self.size}:{flags}:{self.grayscale}"
+
+    def __repr__(self):
+        return f"PreprocessPipeline({self.to_dict()})"
+
+    @property
+    def active(self):
+        return bool(self.size or self.sharpen or self.denoise or self.contrast)
+
+    # ---------- Buffer kerja ----------
+
+    def _scratch(self, name, shape):
+        """Buffer uint8 milik thread ini, dialokasikan ulang hanya bila bentuknya berubah"""
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def _clahe(self):
+        # Objek CLAHE menyimpan state internal, jadi satu per thread
+        if not hasattr(self._local, "clahe"):
+            self._local.clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+        return self._local.clahe
+
+    def _other(self, current, shape):
+        """Buffer ping-pong yang bukan `current`"""
+        first = self._scratch("a", shape)
+        return self._scratch("b", shape) if current is first else first
+
+    # ---------- Eksekusi ----------
+
+    def __call__(self, image, out=None, channels=3):
+        """
+        Proses satu gambar uint8 (H x W, H x W x 3 BGR atau H x W x 4).
+
+        `channels=3` mengembalikan BGR (untuk model), `channels=None` membiarkan
+        hasil grayscale tetap 1 kanal (untuk disimpan). Input tidak diubah.
+        """
+        image = np.asarray(image)
+        if image.dtype != np.uint8:
+            raise ValueError(f"PreprocessPipeline butuh gambar uint8, bukan {image.dtype}")
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR, dst=self._scratch("bgr", image.shape[:2] + (3,)))
+
+        gray = is_grayscale(image) if self.grayscale == "auto" else bool(self.grayscale)
+        current = image
+        if gray and image.ndim == 3:
+            current = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._scratch("gray", image.shape[:2]))
+        elif not gray and image.ndim == 2:
+            current = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR, dst=self._scratch("bgr", image.shape + (3,)))
+
+        height, width = current.shape[:2]
+        resize_last = False
+        if self.size and (width, height) != (self.size, self.size):
+            if self.size * self.size <= width * height:
+                # Diperkecil: resize dulu agar filter berjalan di resolusi target
+                shape = (self.size, self.size) + current.shape[2:]
+                current = cv2.resize(current, (self.size, self.size), dst=self._scratch("resize", shape),
+                                     interpolation=cv2.INTER_AREA)
+            else:
+                resize_last = True
+
+        shape = current.shape
+        if self.denoise:
+            dst = self._other(current, shape)
+            if current.ndim == 2:
+                cv2.fastNlMeansDenoising(current, dst, 10, 7, 21)
+            else:
+                cv2.fastNlMeansDenoisingColored(current, dst, 10, 10, 7, 21)
+            current = dst
+
+        if self.sharpen:
+            current = cv2.filter2D(current, -1, SHARPEN_KERNEL, dst=self._other(current, shape))
+
+        if self.contrast:
+            clahe = self._clahe()
+            if current.ndim == 2:
+                current = clahe.apply(current, dst=self._other(current, shape))
+            else:
+                # Hanya kanal L yang diubah; a/b tetap di buffer LAB
+                lab = cv2.cvtColor(current, cv2.COLOR_BGR2LAB, dst=self._scratch("lab", shape))
+                plane = cv2.extractChannel(lab, 0, dst=self._scratch("plane", shape[:2]))
+                clahe.apply(plane, dst=plane)
+                cv2.insertChannel(plane, lab, 0)
+                current = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=self._other(current, shape))
+
+        if resize_last:
+            shape = (self.size, self.size) + current.shape[2:]
+            current = cv2.resize(current, (self.size, self.size), dst=self._scratch("resize", shape),
+                                 interpolation=cv2.INTER_LINEAR)
+
+        expand = channels == 3 and current.ndim == 2
+        final_shape = current.shape[:2] + (3,) if expand else current.shape
+        if out is None:
+            out = np.empty(final_shape, dtype=np.uint8)
+        elif out.shape != final_shape:
+            raise ValueError(f"out berbentuk {out.shape}, dibutuhkan {final_shape}")
+        if expand:
+            cv2.cvtColor(current, cv2.COLOR_GRAY2BGR, dst=out)
+        else:
+            np.copyto(out, current)
+        return out
+
+
+def dataset_pipeline(dataset_config):
+    """Pipeline dari preprocess.json dataset di YAML (None bila dataset tidak dipreprocess)"""
+    from dataset_index import resolve_splits
+
+    _, splits = resolve_splits(dataset_config)
+    candidates = []
+    for images_dir in splits.values():
+        candidates += [images_dir.parent.parent, images_dir.parent]
+    candidates.append(Path(dataset_config).resolve().parent)
+    for folder in candidates:
+        if (folder / PIPELINE_FILE).exists():
+            return PreprocessPipeline.load(folder / PIPELINE_FILE)
+    return None
+
+
+def record_run_pipeline(dataset_config, run_dir):
+    """Salin pipeline dataset ke folder run training; kembalikan pipeline atau None"""
+    pipeline = dataset_pipeline(dataset_config)
+    if pipeline is not None:
+        pipeline.save(Path(run_dir) / PIPELINE_FILE)
+    return pipeline
+
+
+_model_pipelines = {}
+_model_pipelines_lock = threading.Lock()
+
+
+def pipeline_for_model(model):
+    """Pipeline yang dipakai saat model ini dilatih (preprocess.json di folder run), atau None"""
+    weights = getattr(model, "ckpt_path", None) or getattr(model, "model_name", None)
+    if not weights:
+        return None
+    path = Path(weights).resolve().parent.parent / PIPELINE_FILE
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    with _model_pipelines_lock:
+        cached = _model_pipelines.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _model_pipelines[path] = (mtime, PreprocessPipeline.load(path))
+        return cached[1]
@@ -0,0 +1,275 @@
+# preprocessing_engine.py
+"""
+Mesin preprocessing dataset yang bisa berjalan paralel dan dilanjutkan.
+
+Dipakai oleh halaman Preprocessing (components/preprocessing.py) dan bisa
+dijalankan tanpa UI dari command line:
+
+    python preprocessing_engine.py dataset_raw datasets/karies --size 640 --contrast
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from image_loader import load_image
+from model_registry import file_sha1
+from preprocess_pipeline import PIPELINE_FILE, PreprocessPipeline
+
+# Naikkan bila hasil PreprocessPipeline berubah, agar manifest lama tidak dipakai
+PIPELINE_VERSION = 2
+MANIFEST_NAME = ".preprocess_manifest.json"
+IMAGE_PATTERN = "*.[jJpP]*[gG]"
+
+
+def perbaikan_gambar(img, ketajaman=True, noise=True, kontras=False):
+    """Menerapkan teknik peningkatan kualitas gambar (PIL -> PIL, lihat PreprocessPipeline)"""
+    pipeline = PreprocessPipeline(sharpen=ketajaman, denoise=noise, contrast=kontras)
+    hasil = pipeline(np.asarray(img.convert("RGB"))[:, :, ::-1])  # RGB ke BGR (view)
+    return Image.fromarray(hasil[:, :, ::-1])  # BGR ke RGB
+
+
+def _tmp_path(path):
+    path = Path(path)
+    return path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+
+
+def simpan_gambar_atomik(img, path):
+    """Tulis ke file sementara lalu rename, supaya tidak ada file setengah jadi"""
+    tmp = _tmp_path(path)
+    try:
+        if isinstance(img, np.ndarray):
+            ok, buffer = cv2.imencode(Path(path).suffix or ".jpg", img)
+            if not ok:
+                raise ValueError(f"Gagal meng-encode {path}")
+            tmp.write_bytes(buffer.tobytes())
+        else:
+            img.save(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def salin_atomik(src, dst):
+    tmp = _tmp_path(dst)
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _init_worker():
+    # Satu thread OpenCV per proses agar pool tidak saling berebut core
+    cv2.setNumThreads(1)
+
+
+def _proses_satu(tugas):
+    """Dijalankan di proses worker: perbaiki, resize, simpan gambar + label"""
+    file_gambar, file_output, file_label, label_output, params = tugas
+    # Decode JPEG langsung mendekati ukuran target; rontgen grayscale tetap 1 kanal
+    img = load_image(file_gambar, target_size=params["ukuran"], channels=None).array
+    hasil = PreprocessPipeline.from_params(params)(img, channels=None)
+    simpan_gambar_atomik(hasil, file_output)
+    if file_label is not None:
+        salin_atomik(file_label, label_output)
+    return file_output
+
+
+class Manifest:
+    """Catatan input (hash + parameter) -> output untuk melewati file yang sudah diproses"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text()).get("files", {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def input_hash(self, key, file_gambar):
+        """Hash input; dihitung ulang hanya bila ukuran/mtime file berubah"""
+        stat = file_gambar.stat()
+        entry = self.entries.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["input_hash"], stat
+        return file_sha1(file_gambar), stat
+
+    def is_current(self, key, input_hash, params, file_output):
+        entry = self.entries.get(key)
+        return (entry is not None and entry["input_hash"] == input_hash
+                and entry["params"] == params and Path(file_output).exists())
+
+    def record(self, key, input_hash, stat, params, file_output):
+        self.entries[key] = {
+            "input_hash": input_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "params": params,
+            "output": str(file_output),
+        }
+
+    def save(self):
+        tmp = _tmp_path(self.path)
+        tmp.write_text(json.dumps({"version": PIPELINE_VERSION, "files": self.entries}))
+        os.replace(tmp, self.path)
+
+
+def run_preprocessing(folder_input, folder_output, ukuran_gambar, ketajaman=True,
+                      noise=True, kontras=False, splits=("train", "valid"),
+                      workers=None, progress=None, progress_interval=0.5,
+                      manifest_interval=50, shard_dir=None):
+    """
+    Proses seluruh dataset memakai process pool.
+
+    `progress(selesai, total, nama_file)` dipanggil paling sering sekali per
+    `progress_interval` detik (dan sekali di akhir). File dengan hash input dan
+    parameter yang sama seperti di manifest dilewati.
+    Bila shard_dir diberikan, hasilnya juga dipaket menjadi shard mmap
+    (lihat shard_dataset.py) untuk disalin ke mesin training.
+    Mengembalikan ringkasan dict: total, diproses, dilewati, gagal, durasi.
+    """
+    path_input = Path(folder_input)
+    path_output = Path(folder_output)
+    path_output.mkdir(parents=True, exist_ok=True)
+    params = {
+        "ukuran": int(ukuran_gambar),
+        "ketajaman": bool(ketajaman),
+        "noise": bool(noise),
+        "kontras": bool(kontras),
+        "versi": PIPELINE_VERSION,
+    }
+    manifest = Manifest(path_output / MANIFEST_NAME)
+    # Dibaca training_worker -> folder run -> halaman deteksi (paritas train/serve)
+    PreprocessPipeline.from_params(params).save(path_output / PIPELINE_FILE)
+    start = time.perf_counter()
+
+    # Susun daftar tugas, lewati yang sudah up to date
+    tugas_list, pending, dilewati = [], {}, 0
+    for bagian in splits:
+        dir_gambar = path_input / bagian / "images"
+        dir_label = path_input / bagian / "labels"
+        (path_output / bagian / "images").mkdir(parents=True, exist_ok=True)
+        (path_output / bagian / "labels").mkdir(parents=True, exist_ok=True)
+
+        for file_gambar in sorted(dir_gambar.glob(IMAGE_PATTERN)):
+            key = f"{bagian}/{file_gambar.name}"
+            file_output = path_output / bagian / "images" / file_gambar.name
+            file_label = dir_label / f"{file_gambar.stem}.txt"
+            label_output = path_output / bagian / "labels" / file_label.name
+
+            input_hash, stat = manifest.input_hash(key, file_gambar)
+            if manifest.is_current(key, input_hash, params, file_output):
+                dilewati += 1
+                # Label bisa berubah tanpa gambarnya berubah
+                if file_label.exists() and (not label_output.exists()
+                                            or label_output.stat().st_mtime < file_label.stat().st_mtime):
+                    salin_atomik(file_label, label_output)
+                continue
+
+            tugas_list.append((file_gambar, file_output,
+                               file_label if file_label.exists() else None,
+                               label_output, params))
+            pending[str(file_output)] = (key, input_hash, stat)
+
+    total = len(tugas_list) + dilewati
+    selesai, gagal = dilewati, []
+    last_report = 0.0
+
+    def lapor(nama, force=False):
+        nonlocal last_report
+        now = time.monotonic()
+        if progress and (force or now - last_report >= progress_interval):
+            last_report = now
+            progress(selesai, total, nama)
+
+    lapor("", force=True)
+    if tugas_list:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(_proses_satu, t): t for t in tugas_list}
+            try:
+                for future in as_completed(futures):
+                    tugas = futures[future]
+                    selesai += 1
+                    try:
+                        file_output = future.result()
+                        key, input_hash, stat = pending[str(file_output)]
+                        manifest.record(key, input_hash, stat, params, file_output)
+                        if (selesai - dilewati) % manifest_interval == 0:
+                            manifest.save()
+                    except Exception as e:
+                        gagal.append((tugas[0].name, str(e)))
+                    lapor(tugas[0].name)
+            finally:
+                # Saat dibatalkan: buang tugas yang belum mulai dan simpan progres
+                # supaya run berikutnya melanjutkan dari sini
+                for future in futures:
+                    future.cancel()
+                manifest.save()
+
+    lapor("", force=True)
+    shards, gagal_shard = None, []
+    if shard_dir:
+        from shard_dataset import pack_dataset
+
+        hasil = pack_dataset(path_output, shard_dir, splits)
+        shards = hasil["images"]
+        # Dilaporkan terpisah: gagal paket tidak mengurangi jumlah yang diproses
+        gagal_shard = hasil["failed"]
+    return {
+        "shards": shards,
+        "gagal_shard": gagal_shard,
+        "total": total,
+        "diproses": total - dilewati - len(gagal),
+        "dilewati": dilewati,
+        "gagal": gagal,
+        "durasi": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocessing dataset karies secara paralel")
+    parser.add_argument("input", help="folder dataset mentah (berisi train/valid/...)")
+    parser.add_argument("output", help="folder dataset hasil preprocessing")
+    parser.add_argument("--size", type=int, default=640, help="ukuran gambar output")
+    parser.add_argument("--no-sharpen", action="store_true", help="tanpa perbaikan ketajaman")
+    parser.add_argument("--no-denoise", action="store_true", help="tanpa penghilangan noise")
+    parser.add_argument("--contrast", action="store_true", help="dengan peningkatan kontras (CLAHE)")
+    parser.add_argument("--splits", nargs="+", default=["train", "valid"])
+    parser.add_argument("--workers", type=int, default=None, help="jumlah proses (default: semua core)")
+    parser.add_argument("--shards", default=None, help="paket juga hasilnya ke folder shard ini")
+    args = parser.parse_args()
+
+    def progress(selesai, total, nama):
+        print(f"\r[PREPROCESS] {selesai}/{total} {nama[:60]:<60}", end="", flush=True)
+
+    ringkasan = run_preprocessing(args.input, args.output, args.size,
+                                  ketajaman=not args.no_sharpen, noise=not args.no_denoise,
+                                  kontras=args.contrast, splits=args.splits,
+                                  workers=args.workers, progress=progress,
+                                  shard_dir=args.shards)
+    print()
+    print(f"[PREPROCESS] Selesai dalam {ringkasan['durasi']:.1f} detik: "
+          f"{ringkasan['diproses']} diproses, {ringkasan['dilewati']} dilewati, "
+          f"{len(ringkasan['gagal'])} gagal")
+    if ringkasan["shards"]:
+        print(f"[PREPROCESS] Shard ditulis ke {args.shards}: {ringkasan['shards']}")
+    for nama, error in ringkasan["gagal"]:
+        print(f"[PREPROCESS] Gagal {nama}: {error}")
+    for nama, error in ringkasan["gagal_shard"]:
+        print(f"[PREPROCESS] Gagal dipaket ke shard {nama}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# result_cache.py
+"""
+Cache hasil inference berbasis isi gambar.
+
+Kunci cache = hash isi gambar + fingerprint model + imgsz. Yang disimpan adalah
+kotak mentah yang selalu dihitung pada threshold tetap RESULT_CACHE_MIN_CONF,
+sehingga menggeser slider confidence cukup memfilter ulang hasil yang sudah ada.
+Permintaan dengan confidence di bawah threshold itu tidak memakai cache.
+Entri cache adalah objek detections.Detections.
+Ada dua tingkat: memori (LRU dengan batas byte) dan SQLite opsional di disk
+yang bertahan setelah aplikasi di-restart (dibatasi jumlah baris; baris
+tertua menurut kolom `created` dibuang lebih dulu).
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import config
+from detections import Detections
+
+
+def image_fingerprint(image):
+    """Hash isi gambar (PIL Image, array NumPy, atau bytes)"""
+    h = hashlib.sha1()
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        h.update(image)
+    elif isinstance(image, np.ndarray):
+        h.update(str((image.shape, image.dtype.str)).encode())
+        h.update(np.ascontiguousarray(image).data)
+    else:
+        h.update(str((image.size, image.mode)).encode())
+        h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def cache_key(image_hash, model_fingerprint, imgsz):
+    return f"{image_hash}:{model_fingerprint}:{imgsz}"
+
+
+class ResultCache:
+    """Cache dua tingkat (memori + SQLite) dengan statistik hit-rate"""
+
+    def __init__(self, max_bytes=64 * 1024 ** 2, db_path=None, max_rows=None):
+        self.max_bytes = int(max_bytes)
+        self.max_rows = int(max_rows) if max_rows else None
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, boxes BLOB, height INTEGER, width INTEGER, created REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._db.commit()
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT boxes, height, width FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    boxes = np.frombuffer(row[0], dtype=np.float32)
+                    entry = Detections.from_array(boxes, (row[2], row[1]), model=key.split(":")[1])
+                    self._put_memory(key, entry)
+                    self.disk_hits += 1
+                    return entry
+
+            self.misses += 1
+            return None
+
+    def put(self, key, entry):
+        with self._lock:
+            self._put_memory(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, entry.to_array().tobytes(), entry.image_size[1], entry.image_size[0], time.time()),
+                )
+                # Perkiraan (REPLACE ikut terhitung); dihitung ulang saat melewati batas
+                self._disk_rows += 1
+                if self.max_rows and self._disk_rows > self.max_rows:
+                    self._evict_disk()
+                self._db.commit()
+
+    def _evict_disk(self):
+        """Buang baris tertua sampai ~90% max_rows agar eviction tidak terjadi di setiap put"""
+        self._disk_rows = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = self._disk_rows - int(self.max_rows * 0.9)
+        if self._disk_rows > self.max_rows and excess > 0:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created LIMIT ?)",
+                (excess,),
+            )
+            self._disk_rows -= excess
+
+    def _put_memory(self, key, entry):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.nbytes
+        self._memory[key] = entry
+        self._memory_bytes += entry.nbytes
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._disk_rows = 0
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            disk_entries = 0
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": disk_entries,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Instance cache bersama untuk seluruh proses"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(max_bytes=config.RESULT_CACHE_MAX_BYTES,
+                                 db_path=config.RESULT_CACHE_DB,
+                                 max_rows=config.RESULT_CACHE_DB_MAX_ROWS)
+        return _cache
@@ -0,0 +1,259 @@
+# run_catalog.py
+"""
+Katalog run training (SQLite) sebagai pengganti pemindaian folder runs/train.
+
+Setiap run dicatat sekali saat training selesai (training_worker.py): argumen
+dari args.yaml, metrik epoch terbaik dari results.csv, serta path dan SHA-1
+best.pt/last.pt. Pemilihan model deteksi cukup satu query berindeks:
+
+    select_model('best')    # mAP50-95 tertinggi
+    select_model('latest')  # run yang paling akhir selesai
+    select_model('pinned')  # run yang dipin lewat pin_run(), jatuh ke 'best'
+
+Karena semua proses (Streamlit, server.py, worker) membaca DB yang sama,
+pilihan model selalu konsisten. Run lama bisa dimasukkan dengan:
+
+    python run_catalog.py --rebuild
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import config
+from lazy_imports import lazy_import
+from model_registry import file_sha1
+from telemetry import get_logger
+
+yaml = lazy_import("yaml")
+
+log = get_logger("catalog")
+
+SELECTION_MODES = ("best", "latest", "pinned")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    model TEXT,
+    data TEXT,
+    epochs INTEGER,
+    epochs_done INTEGER,
+    best_epoch INTEGER,
+    imgsz INTEGER,
+    batch INTEGER,
+    args TEXT,
+    precision REAL,
+    recall REAL,
+    map50 REAL,
+    map50_95 REAL,
+    best_path TEXT,
+    best_sha1 TEXT,
+    last_path TEXT,
+    last_sha1 TEXT,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS runs_map ON runs (map50_95) WHERE best_path IS NOT NULL;
+CREATE INDEX IF NOT EXISTS runs_finished ON runs (finished) WHERE best_path IS NOT NULL;
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def read_results_csv(path):
+    """Baris results.csv sebagai list dict float (nama kolom di-strip)"""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return [{k.strip(): float(v) for k, v in row.items() if k and v not in (None, "")} for row in rows]
+
+
+def _fitness(row):
+    # Kriteria yang sama dengan Ultralytics saat memilih best.pt
+    return 0.1 * row.get("metrics/mAP50(B)", 0) + 0.9 * row.get("metrics/mAP50-95(B)", 0)
+
+
+def describe_run(run_dir):
+    """Kumpulkan argumen, metrik epoch terbaik dan checksum bobot sebuah folder run"""
+    run_dir = Path(run_dir)
+    args_path = run_dir / "args.yaml"
+    args = yaml.safe_load(args_path.read_text()) if args_path.exists() else {}
+    args = args or {}
+
+    results_path = run_dir / "results.csv"
+    rows = read_results_csv(results_path) if results_path.exists() else []
+    best = max(rows, key=_fitness) if rows else {}
+
+    weights = {}
+    for kind in ("best", "last"):
+        path = run_dir / "weights" / f"{kind}.pt"
+        weights[kind] = (str(path), file_sha1(path)) if path.exists() else (None, None)
+
+    finished = max((p.stat().st_mtime for p in (results_path, run_dir / "weights" / "last.pt", args_path)
+                    if p.exists()), default=None)
+    return {
+        "id": run_dir.name,
+        "path": str(run_dir),
+        "model": args.get("model"),
+        "data": args.get("data"),
+        "epochs": args.get("epochs"),
+        "epochs_done": int(rows[-1]["epoch"]) if rows else 0,
+        "best_epoch": int(best["epoch"]) if best else None,
+        "imgsz": args.get("imgsz"),
+        "batch": args.get("batch"),
+        "args": json.dumps(args, default=str),
+        "precision": best.get("metrics/precision(B)"),
+        "recall": best.get("metrics/recall(B)"),
+        "map50": best.get("metrics/mAP50(B)"),
+        "map50_95": best.get("metrics/mAP50-95(B)"),
+        "best_path": weights["best"][0],
+        "best_sha1": weights["best"][1],
+        "last_path": weights["last"][0],
+        "last_sha1": weights["last"][1],
+        "finished": finished,
+    }
+
+
+class RunCatalog:
+    """Indeks run training; aman dibaca dan ditulis beberapa proses sekaligus"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def record_run(self, run_dir):
+        """Catat (atau perbarui) satu folder run; kembalikan entri katalog"""
+        entry = describe_run(run_dir)
+        columns = ", ".join(entry)
+        placeholders = ", ".join("?" for _ in entry)
+        with self._connect() as db:
+            db.execute(f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({placeholders})",
+                       list(entry.values()))
+        log.info("Run dicatat: %s (mAP50-95=%s)", entry["id"], entry["map50_95"])
+        return entry
+
+    def rebuild(self, runs_dir=None):
+        """Isi ulang katalog dari folder runs/train (sekali, bukan di setiap start)"""
+        runs_dir = Path(runs_dir or config.TRAIN_RUNS_DIR)
+        entries = [self.record_run(d) for d in sorted(runs_dir.iterdir()) if d.is_dir()] \
+            if runs_dir.exists() else []
+        self.set_setting("rebuilt", time.time())
+        return entries
+
+    def get_run(self, run_id):
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_runs(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM runs ORDER BY finished DESC").fetchall()
+        return [dict(r) for r in rows]
+
+    def get_setting(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_setting(self, key, value):
+        with self._connect() as db:
+            if value is None:
+                db.execute("DELETE FROM settings WHERE key = ?", (key,))
+            else:
+                db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def pin_run(self, run_id):
+        """Pin run tertentu sebagai model deteksi; None untuk melepas pin"""
+        if run_id is not None and self.get_run(run_id) is None:
+            raise KeyError(f"Run tidak ada di katalog: {run_id}")
+        self.set_setting("pinned", run_id)
+
+    def select(self, mode="best"):
+        """Entri run terpilih yang punya best.pt, atau None"""
+        if mode not in SELECTION_MODES:
+            raise ValueError(f"Mode pemilihan tidak dikenal: {mode}")
+        if mode == "pinned":
+            pinned = self.get_setting("pinned")
+            run = self.get_run(pinned) if pinned else None
+            if run and run["best_path"]:
+                return run
+            mode = "best"
+        order = "map50_95 DESC" if mode == "best" else "finished DESC"
+        with self._connect() as db:
+            row = db.execute(f"SELECT * FROM runs WHERE best_path IS NOT NULL "
+                             f"ORDER BY {order} LIMIT 1").fetchone()
+        return dict(row) if row else None
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+_warm_up_thread = None
+
+
+def get_catalog():
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = RunCatalog(config.RUN_CATALOG_DB)
+            if _catalog.get_setting("rebuilt") is None:
+                # Pertama kali: masukkan run yang sudah ada sebelum katalog dibuat
+                _catalog.rebuild()
+        return _catalog
+
+
+def warm_up_catalog():
+    """Buka (dan bila perlu bangun) katalog di thread latar belakang, sekali per proses"""
+    global _warm_up_thread
+    with _catalog_lock:
+        if _catalog is not None or _warm_up_thread is not None:
+            return _warm_up_thread
+        _warm_up_thread = threading.Thread(target=get_catalog, name="catalog-warm-up", daemon=True)
+        _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def select_model(mode=None):
+    """Path best.pt untuk mode pemilihan (default config.MODEL_SELECTION), atau None"""
+    run = get_catalog().select(mode or config.MODEL_SELECTION)
+    if run and Path(run["best_path"]).exists():
+        return Path(run["best_path"])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Katalog run training")
+    parser.add_argument("--rebuild", action="store_true", help="pindai ulang runs/train")
+    parser.add_argument("--record", default=None, help="catat satu folder run")
+    parser.add_argument("--pin", default=None, help="pin run ID sebagai model deteksi")
+    parser.add_argument("--unpin", action="store_true")
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    if args.rebuild:
+        catalog.rebuild()
+    if args.record:
+        catalog.record_run(args.record)
+    if args.pin:
+        catalog.pin_run(args.pin)
+    if args.unpin:
+        catalog.pin_run(None)
+
+    pinned = catalog.get_setting("pinned")
+    for run in catalog.list_runs():
+        mark = "*" if run["id"] == pinned else " "
+        print(f"{mark} {run['id']:<28} epoch {run['epochs_done']}/{run['epochs']}  "
+              f"mAP50={run['map50']}  mAP50-95={run['map50_95']}  best.pt={'ada' if run['best_path'] else '-'}")
+    for mode in SELECTION_MODES:
+        print(f"{mode:<7} -> {select_model(mode)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# server.py
+"""
+Server inference HTTP tanpa UI, berjalan berdampingan dengan aplikasi Streamlit.
+
+    uvicorn server:app --host 0.0.0.0 --port 8000
+
+Endpoint:
+    POST /predict        satu file (field `file`), form opsional `confidence`
+    POST /predict/batch  banyak file (field `files`), form opsional `confidence`
+    GET  /health, /stats
+    GET  /metrics        histogram latensi per tahap (format teks Prometheus)
+
+Permintaan yang datang bersamaan dikumpulkan selama SERVER_BATCH_WINDOW_MS
+lalu dijalankan dalam satu batch (micro-batching) untuk throughput maksimum.
+Decode gambar berjalan di pool thread tersendiri (SERVER_DECODE_WORKERS),
+sehingga event loop dan thread inference tidak ikut menunggu decode.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse
+
+import config
+from image_loader import ImageTooLarge, load_image
+from inference import predict_batch
+from model_registry import get_registry, latest_detection_model_path
+from preprocess_pipeline import pipeline_for_model
+from result_cache import get_result_cache
+from telemetry import get_telemetry, render_prometheus
+
+
+def get_detection_model():
+    """Model deteksi terbaru dari registry bersama (di-cache dan di-warm-up)"""
+    return get_registry().get(latest_detection_model_path(), task="detect")
+
+
+def format_result(result, confidence, elapsed_ms):
+    """Respons JSON satu gambar, dengan baris tabel yang sama seperti halaman deteksi"""
+    if not result["success"]:
+        return {"file": result["name"], "success": False, "error": result["error"]}
+    detections = result["detections"].filter(confidence)
+    counts = detections.class_counts(len(config.CLASSIFICATION))
+    return {
+        "file": result["name"],
+        "success": True,
+        "image_size": list(result["image_size"]),
+        "counts": {label: int(n) for label, n in zip(config.CLASSIFICATION, counts)},
+        "detections": detections.to_table(config.CLASSIFICATION).to_dict("records"),
+        "speed_ms": result["speed"],
+        "latency_ms": round(elapsed_ms, 2),
+    }
+
+
+class MicroBatcher:
+    """Mengumpulkan permintaan bersamaan menjadi satu batch inference"""
+
+    def __init__(self, max_batch=8, window_ms=10):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.queue = asyncio.Queue()
+        # Satu thread inference: predictor Ultralytics tidak aman dipakai paralel
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.batches = 0
+        self.images = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, image, confidence, name):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((image, confidence, name, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(self.executor, self._predict, items)
+            except Exception as e:
+                for *_, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.images += len(items)
+            now = time.perf_counter()
+            for (_, confidence, _, future, submitted), result in zip(items, results):
+                if not future.done():
+                    future.set_result(format_result(result, confidence, (now - submitted) * 1000))
+
+    def _predict(self, items):
+        # Satu forward pass dengan threshold terendah di batch; tiap respons
+        # difilter lagi dengan confidence masing-masing di format_result
+        model = get_detection_model()
+        return predict_batch(model, [item[0] for item in items],
+                             min(item[1] for item in items),
+                             batch_size=self.max_batch, names=[item[2] for item in items],
+                             plot=False, pipeline=pipeline_for_model(model),
+                             cache=get_result_cache() if config.SERVER_USE_RESULT_CACHE else None)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": self.images / self.batches if self.batches else 0.0,
+            "queue_depth": self.queue.qsize(),
+        }
+
+
+batcher = None
+decode_pool = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global batcher, decode_pool
+    decode_pool = ThreadPoolExecutor(max_workers=config.SERVER_DECODE_WORKERS, thread_name_prefix="decode")
+    batcher = MicroBatcher(config.SERVER_MAX_BATCH, config.SERVER_BATCH_WINDOW_MS)
+    batcher.start()
+    telemetry = get_telemetry()
+    telemetry.add_gauge("karies_server_queue_depth", "Permintaan yang menunggu micro-batch",
+                        lambda: batcher.queue.qsize())
+    telemetry.add_gauge("karies_server_avg_batch_size", "Rata-rata ukuran micro-batch",
+                        lambda: batcher.stats()["avg_batch_size"])
+    # Muat dan warm-up model sebelum permintaan pertama datang
+    await asyncio.get_running_loop().run_in_executor(batcher.executor, get_detection_model)
+    yield
+    await batcher.stop()
+    decode_pool.shutdown(wait=False)
+
+
+app = FastAPI(title="YOLO11 Deteksi Karies", lifespan=lifespan)
+
+
+async def read_image(upload):
+    # Resolusi penuh agar koordinat respons tetap koordinat gambar asli
+    data = await upload.read()
+    try:
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(decode_pool, load_image, data)).array
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"{upload.filename}: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Gambar tidak valid ({upload.filename}): {e}")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "model": latest_detection_model_path()}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "batcher": batcher.stats(),
+        "models": get_registry().stats(),
+        "result_cache": get_result_cache().stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def check_confidence(confidence):
+    if not 0.0 <= confidence <= 1.0:
+        raise HTTPException(status_code=422, detail=f"confidence harus di antara 0 dan 1, bukan {confidence}")
+
+
+@app.post("/predict")
+async def predict(file: UploadFile = File(...), confidence: float = Form(config.SERVER_CONFIDENCE)):
+    check_confidence(confidence)
+    image = await read_image(file)
+    return await batcher.submit(image, confidence, file.filename)
+
+
+@app.post("/predict/batch")
+async def predict_many(files: list[UploadFile] = File(...),
+                       confidence: float = Form(config.SERVER_CONFIDENCE)):
+    check_confidence(confidence)
+    images = await asyncio.gather(*(read_image(f) for f in files))
+    return await asyncio.gather(*(batcher.submit(img, confidence, f.filename)
+                                  for img, f in zip(images, files)))
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=config.SERVER_HOST, port=config.SERVER_PORT)
@@ -0,0 +1,302 @@
+# shard_dataset.py
+"""
+Format dataset terpaket: gambar hasil preprocessing + label dalam shard besar.
+
+Ribuan file JPEG kecil lambat disalin ke mesin training dan lambat dibuka
+dataloader. Format ini menggabungkannya per split menjadi beberapa file
+<split>-00000.bin (ukuran ~SHARD_SIZE_MB) berisi byte gambar berurutan, plus
+<split>.index.npz yang menyimpan shard, offset dan panjang setiap gambar
+serta seluruh label sebagai satu array float32 N x 5.
+
+Pembaca (ShardDataset) memetakan shard dengan mmap sekali saja, sehingga
+akses acak ke gambar ke-i hanya berupa slice memori tanpa open/stat per
+file. Kelas ini berbentuk dataset map-style (__len__/__getitem__) dan aman
+di-pickle ke worker DataLoader (mmap dibuka ulang di proses worker).
+
+    python shard_dataset.py pack dataset runs/shards/karies
+    python shard_dataset.py pack datasets/karies runs/shards/karies --imgsz 640
+    python shard_dataset.py info runs/shards/karies
+    python shard_dataset.py unpack runs/shards/karies /data/karies
+"""
+import argparse
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+import config
+from dataset_index import IMAGE_SUFFIXES, parse_label_texts
+from preprocess_pipeline import PIPELINE_FILE
+
+INDEX_SUFFIX = ".index.npz"
+META_NAME = "shards.json"
+
+
+def _shard_name(split, number):
+    return f"{split}-{number:05d}.bin"
+
+
+class ShardWriter:
+    """Tulis gambar terenkode + label satu split ke shard berurutan"""
+
+    def __init__(self, output_dir, split, shard_size_mb=None):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.split = split
+        self.shard_size = int((shard_size_mb or config.SHARD_SIZE_MB) * 1024 ** 2)
+        self.names, self.shard, self.offset, self.length = [], [], [], []
+        self.label_start, self.label_count, self.labels = [], [], []
+        self.sizes = []
+        self.shard_files = []
+        self._file = None
+        self._position = 0
+        self._labels_total = 0
+
+    def _open_next(self):
+        if self._file is not None:
+            self._file.close()
+        name = _shard_name(self.split, len(self.shard_files))
+        self.shard_files.append(name)
+        self._file = open(self.output_dir / f".{name}.tmp", "wb")
+        self._position = 0
+
+    def add(self, name, data, labels, size=(0, 0)):
+        """data: byte gambar terenkode; labels: array N x 5 (cls, xc, yc, w, h); size: (lebar, tinggi)"""
+        if self._file is None or (self._position and self._position + len(data) > self.shard_size):
+            self._open_next()
+        self._file.write(data)
+        labels = np.asarray(labels, dtype=np.float32).reshape(-1, 5)
+        self.names.append(name)
+        self.shard.append(len(self.shard_files) - 1)
+        self.offset.append(self._position)
+        self.length.append(len(data))
+        self.label_start.append(self._labels_total)
+        self.label_count.append(len(labels))
+        self.labels.append(labels)
+        self.sizes.append(size)
+        self._position += len(data)
+        self._labels_total += len(labels)
+
+    def close(self):
+        """Selesaikan shard (rename atomik) lalu tulis index; kembalikan jumlah gambar"""
+        if self._file is not None:
+            self._file.close()
+        for name in self.shard_files:
+            os.replace(self.output_dir / f".{name}.tmp", self.output_dir / name)
+        index_path = self.output_dir / f"{self.split}{INDEX_SUFFIX}"
+        tmp = self.output_dir / f".{self.split}.{os.getpid()}.tmp.npz"
+        np.savez(tmp,
+                 names=np.array(self.names, dtype=str),
+                 shard_files=np.array(self.shard_files, dtype=str),
+                 shard=np.array(self.shard, np.int32),
+                 offset=np.array(self.offset, np.int64),
+                 length=np.array(self.length, np.int64),
+                 label_start=np.array(self.label_start, np.int64),
+                 label_count=np.array(self.label_count, np.int32),
+                 labels=np.concatenate(self.labels) if self.labels else np.zeros((0, 5), np.float32),
+                 sizes=np.array(self.sizes, np.int32).reshape(-1, 2))
+        os.replace(tmp, index_path)
+        return len(self.names)
+
+
+class ShardDataset:
+    """Akses acak ke satu split dataset terpaket lewat mmap"""
+
+    def __init__(self, root, split):
+        self.root = Path(root)
+        self.split = split
+        with np.load(self.root / f"{split}{INDEX_SUFFIX}") as index:
+            self.names = index["names"]
+            self.shard_files = [str(s) for s in index["shard_files"]]
+            self.shard = index["shard"]
+            self.offset = index["offset"]
+            self.length = index["length"]
+            self.label_start = index["label_start"]
+            self.label_count = index["label_count"]
+            self.labels = index["labels"]
+            self.sizes = index["sizes"]
+        self._maps = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # mmap tidak bisa di-pickle; worker membuka ulang saat pertama dipakai
+        state = self.__dict__.copy()
+        state["_maps"] = None
+        return state
+
+    def _open(self):
+        maps = []
+        for name in self.shard_files:
+            with open(self.root / name, "rb") as f:
+                maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                            if os.fstat(f.fileno()).st_size else b"")
+        self._maps = maps
+
+    def close(self):
+        for m in self._maps or []:
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self._maps = None
+
+    def raw(self, i):
+        """Byte gambar terenkode ke-i sebagai memoryview (tanpa salinan)"""
+        if self._maps is None:
+            self._open()
+        start = int(self.offset[i])
+        return memoryview(self._maps[self.shard[i]])[start:start + int(self.length[i])]
+
+    def labels_for(self, i):
+        """Label gambar ke-i: view array N x 5 (cls, xc, yc, w, h)"""
+        start = self.label_start[i]
+        return self.labels[start:start + self.label_count[i]]
+
+    def image(self, i, flags=None):
+        import cv2
+
+        buffer = np.frombuffer(self.raw(i), dtype=np.uint8)
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR if flags is None else flags)
+
+    def __getitem__(self, i):
+        """(nama, gambar BGR, label N x 5)"""
+        return str(self.names[i]), self.image(i), self.labels_for(i)
+
+
+def read_meta(root):
+    path = Path(root) / META_NAME
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _encode(path, imgsz, quality):
+    """Byte gambar untuk shard: file asli apa adanya, atau di-resize ke imgsz x imgsz"""
+    if not imgsz:
+        data = Path(path).read_bytes()
+        size = (0, 0)
+        try:
+            from PIL import Image
+            with Image.open(path) as img:
+                size = img.size
+        except (ImportError, OSError):
+            pass
+        return data, size
+
+    import cv2
+
+    image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("gagal membaca gambar")
+    image = cv2.resize(image, (imgsz, imgsz), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("gagal meng-encode gambar")
+    return buffer.tobytes(), (imgsz, imgsz)
+
+
+def pack_dataset(dataset_dir, output_dir, splits=("train", "valid", "test"), imgsz=None,
+                 quality=95, shard_size_mb=None, progress=None):
+    """
+    Konversi layout dataset/<split>/{images,labels} menjadi shard.
+
+    Tanpa imgsz byte file disalin apa adanya (hasil proses_dataset sudah di-resize);
+    dengan imgsz gambar di-resize dan di-encode ulang sebagai JPEG.
+    Mengembalikan dict jumlah gambar per split dan daftar gambar yang gagal.
+    """
+    dataset_dir, output_dir = Path(dataset_dir), Path(output_dir)
+    summary, failed = {}, []
+    for split in splits:
+        images_dir = dataset_dir / split / "images"
+        if not images_dir.exists():
+            continue
+        paths = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        label_texts = []
+        for path in paths:
+            label = dataset_dir / split / "labels" / f"{path.stem}.txt"
+            label_texts.append(label.read_text(errors="replace") if label.exists() else "")
+        rows, owner, bad = parse_label_texts(label_texts, num_classes=10 ** 6)
+        failed += [(f"{split}/{paths[f].stem}.txt:{line}", reason) for f, line, reason in bad]
+        bounds = np.searchsorted(owner, np.arange(len(paths) + 1))
+
+        writer = ShardWriter(output_dir, split, shard_size_mb)
+        for i, path in enumerate(paths):
+            try:
+                data, size = _encode(path, imgsz, quality)
+            except (OSError, ValueError) as e:
+                failed.append((f"{split}/{path.name}", str(e)))
+                continue
+            writer.add(path.name, data, rows[bounds[i]:bounds[i + 1]], size)
+            if progress:
+                progress(split, i + 1, len(paths))
+        summary[split] = writer.close()
+
+    # preprocess.json ikut dipaket agar run training dari shard tetap tahu pipeline-nya
+    pipeline_file = dataset_dir / PIPELINE_FILE
+    if pipeline_file.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(pipeline_file, output_dir / PIPELINE_FILE)
+
+    meta = {"splits": summary, "imgsz": imgsz, "source": str(dataset_dir),
+            "shard_size_mb": shard_size_mb or config.SHARD_SIZE_MB}
+    (output_dir / META_NAME).write_text(json.dumps(meta, indent=2))
+    return {"images": summary, "failed": failed}
+
+
+def unpack_dataset(root, output_dir):
+    """Kembalikan shard menjadi layout <split>/{images,labels} (mis. di disk lokal mesin training)"""
+    output_dir = Path(output_dir)
+    counts = {}
+    for split in read_meta(root).get("splits", {}):
+        dataset = ShardDataset(root, split)
+        (output_dir / split / "images").mkdir(parents=True, exist_ok=True)
+        (output_dir / split / "labels").mkdir(parents=True, exist_ok=True)
+        for i in range(len(dataset)):
+            name = str(dataset.names[i])
+            (output_dir / split / "images" / name).write_bytes(dataset.raw(i))
+            labels = dataset.labels_for(i)
+            with open(output_dir / split / "labels" / f"{os.path.splitext(name)[0]}.txt", "w") as f:
+                np.savetxt(f, labels, fmt=["%d", "%.6f", "%.6f", "%.6f", "%.6f"])
+        dataset.close()
+        counts[split] = len(dataset)
+    if (Path(root) / PIPELINE_FILE).exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(Path(root) / PIPELINE_FILE, output_dir / PIPELINE_FILE)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paket dataset YOLO ke shard mmap")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack = sub.add_parser("pack", help="dataset/<split>/{images,labels} -> shard")
+    pack.add_argument("dataset_dir")
+    pack.add_argument("output_dir")
+    pack.add_argument("--splits", nargs="+", default=["train", "valid", "test"])
+    pack.add_argument("--imgsz", type=int, default=None, help="resize ke ukuran ini (default: apa adanya)")
+    pack.add_argument("--quality", type=int, default=95)
+    pack.add_argument("--shard-mb", type=int, default=None)
+    info = sub.add_parser("info", help="ringkasan shard")
+    info.add_argument("root")
+    unpack = sub.add_parser("unpack", help="shard -> dataset/<split>/{images,labels}")
+    unpack.add_argument("root")
+    unpack.add_argument("output_dir")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        result = pack_dataset(args.dataset_dir, args.output_dir, args.splits, args.imgsz,
+                              args.quality, args.shard_mb)
+        print(f"[SHARD] Dipaket: {result['images']}")
+        for name, error in result["failed"]:
+            print(f"[SHARD] Gagal {name}: {error}")
+    elif args.command == "info":
+        for split in read_meta(args.root).get("splits", {}):
+            dataset = ShardDataset(args.root, split)
+            print(f"[SHARD] {split}: {len(dataset)} gambar, {len(dataset.labels)} kotak, "
+                  f"{len(dataset.shard_files)} shard, {dataset.length.sum() / 1024 ** 2:.1f} MB")
+    else:
+        print(f"[SHARD] Dibongkar: {unpack_dataset(args.root, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
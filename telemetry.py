@@ -0,0 +1,238 @@
+# telemetry.py
+"""
+Instrumentasi latensi per tahap dan logger berlevel.
+
+    with stage_timer("decode", imgsz=640):
+        ...
+    observe_speed(result.speed, model=fingerprint, imgsz=640)   # speed Ultralytics
+    render_prometheus()                                         # teks untuk /metrics
+
+Setiap tahap jalur panas (decode, pipeline preprocessing, preprocess/
+inference/NMS model, plot, render tabel, tulis label) dicatat ke satu
+histogram `karies_stage_duration_seconds` dengan label stage, model
+(fingerprint bobot) dan imgsz. Histogram diekspor dalam format teks
+Prometheus lewat GET /metrics di server.py, atau lewat server HTTP kecil
+di proses Streamlit (METRICS_PORT). Bila METRICS_TRACE_FILE diisi, setiap
+pengukuran juga ditulis sebagai satu baris JSON.
+
+Log debug memakai modul logging standar (get_logger); pesan dengan argumen
+%s tidak diformat sama sekali selama level DEBUG tidak aktif.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import config
+
+STAGE_METRIC = "karies_stage_duration_seconds"
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LABEL_NAMES = ("stage", "model", "imgsz")
+# Nama tahap untuk kunci dict speed Ultralytics (ms per gambar)
+ULTRALYTICS_STAGES = {"preprocess": "model_preprocess", "inference": "model_inference",
+                      "postprocess": "model_nms"}
+
+
+class Histogram:
+    """Histogram kumulatif ala Prometheus per kombinasi label"""
+
+    def __init__(self, name, help_text, buckets=STAGE_BUCKETS, label_names=LABEL_NAMES):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series = {}   # label values -> [jumlah per bucket (+Inf terakhir), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def snapshot(self):
+        """{label values: (jumlah per bucket, sum, count)}"""
+        with self._lock:
+            return {labels: (list(counts), total, sum(counts))
+                    for labels, (counts, total) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{base},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Telemetry:
+    """Histogram tahap, gauge tambahan dan trace JSONL untuk satu proses"""
+
+    def __init__(self, enabled=True, trace_file=None):
+        self.enabled = enabled
+        self.stages = Histogram(STAGE_METRIC, "Latensi per tahap pipeline deteksi (detik)")
+        self._gauges = {}   # nama -> (help, fungsi tanpa argumen)
+        self._trace_file = Path(trace_file) if trace_file else None
+        self._trace = None
+        self._trace_lock = threading.Lock()
+
+    def observe(self, stage, ms, model=None, imgsz=None):
+        """Catat satu durasi tahap dalam milidetik"""
+        if not self.enabled:
+            return
+        labels = (stage, model or "-", str(imgsz) if imgsz else "-")
+        self.stages.observe(ms / 1000, labels)
+        if self._trace_file is not None:
+            self._write_trace({"ts": round(time.time(), 3), "stage": stage, "ms": round(ms, 3),
+                               "model": labels[1], "imgsz": labels[2]})
+
+    def observe_speed(self, speed, model=None, imgsz=None, prefix=""):
+        """
+        Catat dict waktu (ms) per tahap, mis. result.speed Ultralytics. Dengan
+        `prefix` (mis. "tiled_") kunci dipakai apa adanya sebagai nama tahap.
+        """
+        if not self.enabled:
+            return
+        for key, ms in speed.items():
+            if key != "total" and ms is not None:
+                stage = f"{prefix}{key}" if prefix else ULTRALYTICS_STAGES.get(key, key)
+                self.observe(stage, ms, model, imgsz)
+
+    def add_gauge(self, name, help_text, fn):
+        """Gauge yang nilainya dibaca dari fn() setiap kali /metrics diminta"""
+        self._gauges[name] = (help_text, fn)
+
+    def render_prometheus(self):
+        lines = self.stages.render()
+        for name, (help_text, fn) in sorted(self._gauges.items()):
+            try:
+                value = float(fn())
+            except Exception as e:
+                get_logger("telemetry").debug("Gauge %s gagal dibaca: %s", name, e)
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def _write_trace(self, record):
+        line = json.dumps(record) + "\n"
+        with self._trace_lock:
+            if self._trace is None:
+                self._trace_file.parent.mkdir(parents=True, exist_ok=True)
+                self._trace = open(self._trace_file, "a", buffering=1)
+            self._trace.write(line)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    """Instance telemetri bersama untuk seluruh proses"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry(enabled=config.METRICS_ENABLED, trace_file=config.METRICS_TRACE_FILE)
+        return _telemetry
+
+
+def observe_stage(stage, ms, model=None, imgsz=None):
+    get_telemetry().observe(stage, ms, model, imgsz)
+
+
+def observe_speed(speed, model=None, imgsz=None, prefix=""):
+    get_telemetry().observe_speed(speed, model, imgsz, prefix)
+
+
+@contextmanager
+def stage_timer(stage, model=None, imgsz=None):
+    """Ukur blok `with` sebagai satu tahap; tanpa biaya pengukuran bila metrik dimatikan"""
+    telemetry = get_telemetry()
+    if not telemetry.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        telemetry.observe(stage, (time.perf_counter() - start) * 1000, model, imgsz)
+
+
+def render_prometheus():
+    return get_telemetry().render_prometheus()
+
+
+# ---------- Logger berlevel ----------
+
+_logging_configured = False
+
+
+def get_logger(name):
+    """Logger `karies.<name>`; level dari config.LOG_LEVEL"""
+    global _logging_configured
+    if not _logging_configured:
+        root = logging.getLogger("karies")
+        if not root.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("[%(levelname)s %(name)s] %(message)s"))
+            root.addHandler(handler)
+        root.setLevel(config.LOG_LEVEL)
+        root.propagate = False
+        _logging_configured = True
+    return logging.getLogger(f"karies.{name}")
+
+
+# ---------- Endpoint /metrics untuk proses tanpa FastAPI ----------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(host=None, port=None):
+    """Jalankan GET /metrics di thread latar belakang, sekali per proses (None bila dimatikan/gagal)"""
+    global _metrics_server
+    host = host or config.METRICS_HOST
+    port = config.METRICS_PORT if port is None else port
+    with _metrics_server_lock:
+        if _metrics_server is not None or not port or not config.METRICS_ENABLED:
+            return _metrics_server or None
+        try:
+            _metrics_server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError as e:
+            # Port dipakai proses lain (mis. beberapa instance Streamlit)
+            get_logger("telemetry").warning("Endpoint metrik tidak dijalankan di %s:%s: %s", host, port, e)
+            _metrics_server = False     # jangan dicoba lagi di setiap rerun
+            return None
+        _metrics_server.daemon_threads = True
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+        return _metrics_server
@@ -0,0 +1,162 @@
+# tiled_inference.py
+"""
+Inference bertile untuk rontgen panoramik beresolusi tinggi.
+
+Gambar 2000-3000 px yang di-letterbox langsung ke 640 membuat lesi kecil
+kelas cavity hilang. Mode ini memotong gambar menjadi tile yang saling
+tumpang tindih (berupa view NumPy, tanpa menyalin gambar penuh), menjalankan
+semua tile sebagai satu batch pada resolusi aslinya, memetakan kotak kembali
+ke koordinat global, lalu menggabungkan kotak di sambungan tile dengan NMS
+atau WBF per kelas. Waktu setiap tahap dilaporkan di result["speed"].
+"""
+import time
+
+import numpy as np
+
+import config
+from inference import box_iou, model_imgsz, predict_custom, run_on_preprocessed, to_bgr
+
+
+def tile_grid(width, height, tile_size, overlap):
+    """Koordinat tile (N x 4, x0 y0 x1 y1); tile terakhir ditempel ke tepi gambar"""
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        return positions + [length - tile_size]
+
+    xs, ys = starts(width), starts(height)
+    grid = np.array([(x, y) for y in ys for x in xs], dtype=np.int32)
+    x1 = np.minimum(grid[:, 0] + tile_size, width)
+    y1 = np.minimum(grid[:, 1] + tile_size, height)
+    return np.column_stack([grid, x1, y1])
+
+
+def is_empty_tile(tile, min_std):
+    """Tile hampir seragam (latar hitam/putih di tepi rontgen) dilewati"""
+    sample = tile[::8, ::8]
+    return float(sample.std()) < min_std
+
+
+def nms(boxes, iou_threshold):
+    """NMS per kelas pada array N x 6 (x1, y1, x2, y2, conf, cls)"""
+    if len(boxes) == 0:
+        return boxes
+    # Geser kotak per kelas agar kelas berbeda tidak pernah saling menekan
+    offset = boxes[:, 5:6] * (boxes[:, :4].max() + 1)
+    shifted = boxes[:, :4] + offset
+    order = np.argsort(-boxes[:, 4])
+    iou = box_iou(shifted[order], shifted[order])
+    keep = np.ones(len(order), dtype=bool)
+    for i in range(len(order)):
+        if keep[i]:
+            keep[i + 1:] &= iou[i, i + 1:] <= iou_threshold
+    return boxes[order[keep]]
+
+
+def weighted_boxes_fusion(boxes, iou_threshold):
+    """WBF sederhana per kelas: kotak yang tumpang tindih dirata-rata berbobot confidence"""
+    if len(boxes) == 0:
+        return boxes
+    fused = []
+    for class_id in np.unique(boxes[:, 5]):
+        group = boxes[boxes[:, 5] == class_id]
+        group = group[np.argsort(-group[:, 4])]
+        iou = box_iou(group, group)
+        used = np.zeros(len(group), dtype=bool)
+        for i in range(len(group)):
+            if used[i]:
+                continue
+            members = ~used & (iou[i] > iou_threshold)
+            used |= members
+            weights = group[members, 4:5]
+            xyxy = (group[members, :4] * weights).sum(axis=0) / weights.sum()
+            fused.append([*xyxy, group[members, 4].mean(), class_id])
+    return np.array(fused, dtype=np.float32).reshape(-1, 6)
+
+
+def merge_boxes(boxes, method="nms", iou_threshold=0.5):
+    if method == "wbf":
+        return weighted_boxes_fusion(boxes, iou_threshold)
+    return nms(boxes, iou_threshold)
+
+
+def tile_options(tile_size=None, overlap=None, skip_empty=None, merge=None,
+                 iou_threshold=None, include_full=None):
+    """Opsi tile lengkap; nilai None diisi dari config"""
+    return {
+        "tile_size": int(tile_size or config.TILE_SIZE),
+        "overlap": float(config.TILE_OVERLAP if overlap is None else overlap),
+        "skip_empty": bool(config.TILE_SKIP_EMPTY if skip_empty is None else skip_empty),
+        "merge": merge or config.TILE_MERGE,
+        "iou_threshold": float(iou_threshold or config.TILE_MERGE_IOU),
+        "include_full": bool(config.TILE_INCLUDE_FULL if include_full is None else include_full),
+    }
+
+
+def predict_tiled_boxes(model, image, confidence, tile_size, overlap, skip_empty,
+                        merge, iou_threshold, include_full):
+    """
+    Kotak global (N x 6) untuk satu gambar, statistik tile dan waktu per tahap (ms).
+    `include_full` menambahkan satu pass gambar utuh untuk objek besar (tooth)
+    yang terpotong oleh beberapa tile.
+    """
+
+    timings = {}
+    start = time.perf_counter()
+    array = to_bgr(image)
+    height, width = array.shape[:2]
+    grid = tile_grid(width, height, tile_size, overlap)
+    # Slicing NumPy menghasilkan view, bukan salinan
+    tiles = [array[y0:y1, x0:x1] for x0, y0, x1, y1 in grid]
+    tile_stats = {"tiles": len(tiles), "tiles_skipped": 0}
+    if skip_empty:
+        kept = [i for i, t in enumerate(tiles) if not is_empty_tile(t, config.TILE_EMPTY_STD)]
+        tile_stats["tiles_skipped"] = len(tiles) - len(kept)
+        grid, tiles = grid[kept], [tiles[i] for i in kept]
+    timings["tiling"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    parts = []
+    if tiles:
+        results = model.predict(tiles, conf=confidence, imgsz=tile_size,
+                                batch=len(tiles), verbose=False)
+        for (x0, y0, _, _), r in zip(grid, results):
+            boxes = r.boxes.data.cpu().numpy().copy()
+            boxes[:, [0, 2]] += x0
+            boxes[:, [1, 3]] += y0
+            parts.append(boxes)
+    if include_full:
+        r = model.predict(array, conf=confidence, imgsz=model_imgsz(model), verbose=False)[0]
+        parts.append(r.boxes.data.cpu().numpy())
+    timings["inference"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    boxes = np.concatenate(parts).astype(np.float32) if parts else np.zeros((0, 6), np.float32)
+    boxes = merge_boxes(boxes, merge, iou_threshold)
+    timings["merge"] = (time.perf_counter() - start) * 1000
+    timings["total"] = sum(timings.values())
+
+    return boxes, tile_stats, timings
+
+
+def predict_tiled(model, image, confidence, name=None, plot=True, cache=None, pipeline=None, **options):
+    """
+    Deteksi bertile satu gambar dengan struktur hasil yang sama seperti
+    inference.predict_batch (dipakai display_detection_results).
+
+    `pipeline` (PreprocessPipeline saat training) diterapkan ke gambar utuh
+    sebelum dipotong menjadi tile; kotak dikembalikan ke koordinat asli.
+    """
+    options = tile_options(**options)
+    variant = "tiled:" + ":".join(str(options[k]) for k in sorted(options))
+    if pipeline is not None and pipeline.active:
+        variant += f":{pipeline.key}"
+
+    def compute(array, conf):
+        return predict_tiled_boxes(model, array, conf, **options)
+
+    return predict_custom(model, image, confidence, run_on_preprocessed(compute, image, pipeline), variant,
+                          name, plot, cache, imgsz=options["tile_size"], stage_prefix="tiled_")
@@ -0,0 +1,223 @@
+# tooth_assignment.py
+"""
+Menentukan gigi tempat setiap karies berada.
+
+Setiap kotak karies dipasangkan dengan kotak gigi yang paling banyak
+menampungnya (containment = luas irisan / luas kotak karies), minimal
+TOOTH_MIN_OVERLAP. Untuk jumlah kotak biasa, matriks karies x gigi dihitung
+sekaligus dengan NumPy. Bila jumlah pasangan melebihi ASSIGN_DENSE_MAX_PAIRS
+(mis. hasil tile rontgen panoramik atau batch besar), gigi dimasukkan ke
+grid seragam dan containment hanya dihitung untuk pasangan yang berbagi sel.
+
+Gigi diurutkan kira-kira dari kiri ke kanan gambar; bila pusat-pusat gigi
+terpisah jelas secara vertikal (rontgen panoramik), rahang atas dan bawah
+diurutkan terpisah.
+
+    python benchmarks/assignment_benchmark.py   # adegan sintetis ribuan kotak
+"""
+import time
+
+import numpy as np
+
+import config
+
+CAVITY_CLASS = 0    # indeks "karies" di config.CLASSIFICATION
+TOOTH_CLASS = 1     # indeks "gigi"
+
+
+def _areas(boxes):
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def containment_matrix(inner, outer):
+    """Matriks N x M: bagian luas kotak inner[i] yang berada di dalam outer[j]"""
+    a = np.asarray(inner, dtype=np.float32)[:, None, :4]
+    b = np.asarray(outer, dtype=np.float32)[None, :, :4]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    return inter_w * inter_h / np.maximum(_areas(a[:, 0])[:, None], 1e-9)
+
+
+def _assign_dense(cavities, teeth):
+    scores = containment_matrix(cavities, teeth)
+    best = scores.argmax(axis=1)
+    return best, scores[np.arange(len(cavities)), best]
+
+
+def _cell_ranges(boxes, cell, shape):
+    """Rentang sel grid (x0, y0, x1, y1 inklusif) yang disentuh setiap kotak"""
+    ranges = np.floor(boxes / cell).astype(np.int64)
+    ranges[:, [0, 2]] = np.clip(ranges[:, [0, 2]], 0, shape[0] - 1)
+    ranges[:, [1, 3]] = np.clip(ranges[:, [1, 3]], 0, shape[1] - 1)
+    return ranges
+
+
+def _cell_pairs(ranges, shape):
+    """(id sel, indeks kotak) untuk setiap sel yang disentuh setiap kotak"""
+    nx = ranges[:, 2] - ranges[:, 0] + 1
+    ny = ranges[:, 3] - ranges[:, 1] + 1
+    counts = nx * ny
+    owner = np.repeat(np.arange(len(ranges)), counts)
+    # Posisi lokal sel di dalam persegi panjang milik kotaknya
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx = ranges[owner, 0] + local % nx[owner]
+    cy = ranges[owner, 1] + local // nx[owner]
+    return cy * shape[0] + cx, owner
+
+
+def _assign_grid(cavities, teeth):
+    """Sama seperti _assign_dense, tetapi hanya pasangan yang berbagi sel grid yang dihitung"""
+    # Sel seukuran gigi tipikal: satu gigi menyentuh sekitar 1-4 sel
+    cell = max(float(np.median(teeth[:, 2:] - teeth[:, :2])), 1.0)
+    extent = max(float(teeth[:, 2:].max()), float(cavities[:, 2:].max()), cell)
+    side = int(extent // cell) + 1
+    shape = (side, side)
+
+    tooth_cells, tooth_idx = _cell_pairs(_cell_ranges(teeth, cell, shape), shape)
+    order = np.argsort(tooth_cells, kind="stable")
+    tooth_cells, tooth_idx = tooth_cells[order], tooth_idx[order]
+    cavity_cells, cavity_idx = _cell_pairs(_cell_ranges(cavities, cell, shape), shape)
+
+    # Gabungkan (join) pada id sel: setiap sel karies x semua gigi di sel itu
+    start = np.searchsorted(tooth_cells, cavity_cells, side="left")
+    counts = np.searchsorted(tooth_cells, cavity_cells, side="right") - start
+    pair_cavity = np.repeat(cavity_idx, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    pair_tooth = tooth_idx[np.repeat(start, counts) + offsets]
+
+    best = np.zeros(len(cavities), dtype=np.int64)
+    best_score = np.zeros(len(cavities), dtype=np.float32)
+    if len(pair_cavity) == 0:
+        return best, best_score
+    # Pasangan yang sama bisa muncul di beberapa sel; cukup dihitung sekali
+    codes = np.unique(pair_cavity * len(teeth) + pair_tooth)
+    pair_cavity, pair_tooth = codes // len(teeth), codes % len(teeth)
+
+    a, b = cavities[pair_cavity], teeth[pair_tooth]
+    inter_w = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    scores = inter_w * inter_h / np.maximum(_areas(a), 1e-9)
+
+    # Skor tertinggi per karies: urutkan (karies, skor) lalu ambil entri terakhir tiap karies;
+    # skor sama -> gigi dengan indeks terkecil, sama seperti argmax
+    order = np.lexsort((-pair_tooth, scores, pair_cavity))
+    last = np.r_[pair_cavity[order][1:] != pair_cavity[order][:-1], True]
+    winners = order[last]
+    best[pair_cavity[winners]] = pair_tooth[winners]
+    best_score[pair_cavity[winners]] = scores[winners]
+    return best, best_score
+
+
+def choose_method(num_cavities, num_teeth):
+    """Metode "grid" bila matriks penuh melebihi ASSIGN_DENSE_MAX_PAIRS pasangan, selain itu dense"""
+    return "grid" if num_cavities * num_teeth > config.ASSIGN_DENSE_MAX_PAIRS else "dense"
+
+
+def assign_boxes(cavities, teeth, min_overlap=None, method="auto"):
+    """
+    Indeks gigi untuk setiap kotak karies (-1 bila tidak ada gigi dengan
+    containment >= min_overlap) dan skor containment-nya.
+
+    `method`: "dense" (matriks penuh), "grid" (indeks grid) atau "auto"
+    (grid bila jumlah pasangan > ASSIGN_DENSE_MAX_PAIRS).
+    """
+    min_overlap = config.TOOTH_MIN_OVERLAP if min_overlap is None else min_overlap
+    cavities = np.asarray(cavities, dtype=np.float32).reshape(-1, 4)
+    teeth = np.asarray(teeth, dtype=np.float32).reshape(-1, 4)
+    if len(cavities) == 0 or len(teeth) == 0:
+        return np.full(len(cavities), -1, dtype=np.int64), np.zeros(len(cavities), dtype=np.float32)
+    if method == "auto":
+        method = choose_method(len(cavities), len(teeth))
+    best, score = (_assign_grid if method == "grid" else _assign_dense)(cavities, teeth)
+    return np.where(score >= min_overlap, best, -1), score
+
+
+def tooth_order(teeth):
+    """
+    Urutan kiri-ke-kanan gigi dan rahangnya (0 = atas/satu baris, 1 = bawah).
+
+    Rahang dipisah pada celah terbesar antara pusat vertikal gigi, bila celah
+    itu lebih dari setengah median tinggi gigi.
+    """
+    teeth = np.asarray(teeth, dtype=np.float32).reshape(-1, 4)
+    jaw = np.zeros(len(teeth), dtype=np.int64)
+    if len(teeth) >= 2:
+        center_y = (teeth[:, 1] + teeth[:, 3]) / 2
+        sorted_y = np.sort(center_y)
+        gaps = np.diff(sorted_y)
+        split = gaps.argmax()
+        if gaps[split] > 0.5 * np.median(teeth[:, 3] - teeth[:, 1]):
+            jaw = (center_y > sorted_y[split]).astype(np.int64)
+    center_x = (teeth[:, 0] + teeth[:, 2]) / 2
+    order = np.lexsort((center_x, jaw))
+    rank = np.empty(len(teeth), dtype=np.int64)
+    for value in np.unique(jaw):
+        members = order[jaw[order] == value]
+        rank[members] = np.arange(1, len(members) + 1)
+    return rank, jaw
+
+
+class ToothAssignment:
+    """Hasil pemasangan karies -> gigi untuk satu gambar"""
+
+    def __init__(self, teeth, tooth_conf, cavity_conf, cavity_tooth, cavity_score, method, elapsed_ms):
+        self.teeth = teeth                  # N x 4 xyxy kotak gigi
+        self.tooth_conf = tooth_conf
+        self.cavity_conf = cavity_conf
+        self.cavity_tooth = cavity_tooth    # indeks gigi per karies, -1 = tidak di gigi mana pun
+        self.cavity_score = cavity_score
+        self.method = method
+        self.elapsed_ms = elapsed_ms
+        self.rank, self.jaw = tooth_order(teeth)
+        self.two_jaws = bool(self.jaw.any())
+
+    @property
+    def unassigned(self):
+        return int((self.cavity_tooth < 0).sum())
+
+    def cavities_per_tooth(self):
+        assigned = self.cavity_tooth[self.cavity_tooth >= 0]
+        return np.bincount(assigned, minlength=len(self.teeth))
+
+    def tooth_label(self, i):
+        if not self.two_jaws:
+            return f"Gigi {self.rank[i]}"
+        return f"{'Atas' if self.jaw[i] == 0 else 'Bawah'} {self.rank[i]}"
+
+    def findings(self, only_affected=True):
+        """Satu dict per gigi, urut rahang lalu kiri ke kanan"""
+        counts = self.cavities_per_tooth()
+        max_conf = np.zeros(len(self.teeth), dtype=np.float32)
+        assigned = self.cavity_tooth >= 0
+        np.maximum.at(max_conf, self.cavity_tooth[assigned], self.cavity_conf[assigned])
+        rows = []
+        for i in np.lexsort((self.rank, self.jaw)):
+            if only_affected and counts[i] == 0:
+                continue
+            x1, y1, x2, y2 = np.rint(self.teeth[i]).astype(int).tolist()
+            rows.append({
+                "Gigi": self.tooth_label(i),
+                "Jumlah Karies": int(counts[i]),
+                "Keyakinan Karies Maks.": f"{max_conf[i]:.2f}" if counts[i] else "-",
+                "Posisi Gigi (x1, y1, x2, y2)": f"({x1}, {y1}, {x2}, {y2})",
+            })
+        return rows
+
+    def to_table(self, only_affected=True):
+        import pandas as pd
+
+        return pd.DataFrame(self.findings(only_affected))
+
+
+def assign_cavities(detections, min_overlap=None, method="auto",
+                    cavity_class=CAVITY_CLASS, tooth_class=TOOTH_CLASS):
+    """Pasangkan kotak karies dengan kotak gigi dari satu objek Detections"""
+    start = time.perf_counter()
+    cavity = detections.cls == cavity_class
+    tooth = detections.cls == tooth_class
+    teeth = detections.xyxy[tooth]
+    if method == "auto":
+        method = choose_method(int(cavity.sum()), len(teeth))
+    cavity_tooth, score = assign_boxes(detections.xyxy[cavity], teeth, min_overlap, method)
+    return ToothAssignment(teeth, detections.conf[tooth], detections.conf[cavity], cavity_tooth, score,
+                           method, (time.perf_counter() - start) * 1000)
@@ -0,0 +1,208 @@
+# training_worker.py
+"""
+Training YOLO di proses terpisah dengan metrik nyata per epoch.
+
+Proses worker dijalankan oleh scheduler di job_queue.py. Worker mendaftarkan
+callback Ultralytics dan menulis satu baris JSON per kejadian (start, resume,
+epoch, end, error) ke file metrik. Halaman training cukup membaca baris baru
+dari file itu secara berkala, sehingga thread Streamlit tidak pernah
+terblokir selama training.
+
+    python training_worker.py --data config/karies.yaml --model yolo11n.pt \\
+        --epochs 50 --batch 16 --imgsz 640 --name karies_yolo11_web --metrics runs/logs/x.jsonl
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import config
+
+
+class MetricsWriter:
+    """Menulis kejadian training sebagai JSON lines (di-flush setiap baris)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, event, **data):
+        data = {"event": event, "time": time.time(), **data}
+        self._file.write(json.dumps(data) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_events(path, offset=0):
+    """Baca kejadian baru sejak `offset` byte; kembalikan (events, offset_baru)"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+    except FileNotFoundError:
+        return [], offset
+    # Baris terakhir yang belum lengkap dibaca lagi pada polling berikutnya
+    end = chunk.rfind(b"\n") + 1
+    events = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+    return events, offset + end
+
+
+def _device_utilization():
+    """Pemakaian CPU (%) sejak panggilan sebelumnya dan GPU bila ada"""
+    stats = {}
+    try:
+        import psutil
+        stats["cpu_percent"] = psutil.cpu_percent(interval=None)
+        stats["ram_percent"] = psutil.virtual_memory().percent
+    except ImportError:
+        pass
+    try:
+        import torch
+        if torch.cuda.is_available():
+            stats["gpu_mem_mb"] = round(torch.cuda.max_memory_allocated() / 1024 ** 2, 1)
+            try:
+                stats["gpu_percent"] = torch.cuda.utilization()
+            except Exception:
+                pass  # butuh pynvml
+    except ImportError:
+        pass
+    return stats
+
+
+def register_callbacks(model, writer):
+    """Pasang callback Ultralytics yang menulis metrik nyata per epoch"""
+    state = {}
+
+    def on_train_start(trainer):
+        writer.write("start", epochs=trainer.epochs, save_dir=str(trainer.save_dir),
+                     images=len(trainer.train_loader.dataset))
+        _device_utilization()
+
+    def on_train_epoch_start(trainer):
+        state["epoch_start"] = time.perf_counter()
+
+    def on_train_epoch_end(trainer):
+        state["train_time"] = time.perf_counter() - state["epoch_start"]
+
+    def on_fit_epoch_end(trainer):
+        losses = trainer.label_loss_items(trainer.tloss, prefix="train")
+        metrics = trainer.metrics or {}
+        n_images = len(trainer.train_loader.dataset)
+        train_time = state.get("train_time") or 0.0
+        writer.write(
+            "epoch",
+            epoch=trainer.epoch + 1,
+            epochs=trainer.epochs,
+            box_loss=float(losses.get("train/box_loss", 0)),
+            cls_loss=float(losses.get("train/cls_loss", 0)),
+            dfl_loss=float(losses.get("train/dfl_loss", 0)),
+            precision=float(metrics.get("metrics/precision(B)", 0)),
+            recall=float(metrics.get("metrics/recall(B)", 0)),
+            map50=float(metrics.get("metrics/mAP50(B)", 0)),
+            map50_95=float(metrics.get("metrics/mAP50-95(B)", 0)),
+            epoch_time=round(time.perf_counter() - state["epoch_start"], 3),
+            images_per_s=round(n_images / train_time, 2) if train_time else None,
+            **_device_utilization(),
+        )
+
+    def on_train_end(trainer):
+        best = Path(trainer.best)
+        writer.write("end", save_dir=str(trainer.save_dir),
+                     best=str(best) if best.exists() else None)
+
+    model.add_callback("on_train_start", on_train_start)
+    model.add_callback("on_train_epoch_start", on_train_epoch_start)
+    model.add_callback("on_train_epoch_end", on_train_epoch_end)
+    model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+    model.add_callback("on_train_end", on_train_end)
+
+
+def run_training(data, model_arch, epochs, batch, imgsz, name, metrics_path,
+                 project=None, threads=None, resume=None, **train_args):
+    """Dijalankan di proses worker; `resume` = path last.pt untuk melanjutkan run"""
+    from ultralytics import YOLO
+
+    if threads:
+        import torch
+        torch.set_num_threads(int(threads))
+        train_args.setdefault("workers", min(int(threads), 8))
+
+    writer = MetricsWriter(metrics_path)
+    try:
+        if resume:
+            writer.write("resume", checkpoint=str(resume))
+            model = YOLO(resume)
+            register_callbacks(model, writer)
+            model.train(resume=True)
+        else:
+            model = YOLO(model_arch)
+            register_callbacks(model, writer)
+            # exist_ok: nama run sudah ditentukan pemanggil, jangan di-auto-increment
+            model.train(data=data, epochs=int(epochs), imgsz=int(imgsz), batch=int(batch),
+                        project=str(project or config.TRAIN_RUNS_DIR), name=name,
+                        exist_ok=True, **train_args)
+
+        # Simpan pipeline preprocessing dataset di folder run agar inference memakai yang sama
+        from preprocess_pipeline import record_run_pipeline
+        record_run_pipeline(model.trainer.args.data, model.trainer.save_dir)
+
+        # Catat run ke katalog agar model deteksi bisa dipilih tanpa memindai folder
+        from run_catalog import get_catalog
+        get_catalog().record_run(model.trainer.save_dir)
+    except BaseException as e:
+        writer.write("error", error=str(e), traceback=traceback.format_exc())
+        raise
+    finally:
+        writer.close()
+
+
+def launch_worker(params, run_name, metrics_path, log_path, threads=None, resume=None):
+    """Mulai proses worker training; kembalikan objek Popen"""
+    cmd = [
+        sys.executable, str(Path(__file__).resolve()),
+        "--data", str(params["data"]), "--model", str(params["model"]),
+        "--epochs", str(params["epochs"]), "--batch", str(params["batch"]),
+        "--imgsz", str(params["imgsz"]), "--name", run_name, "--metrics", str(metrics_path),
+    ]
+    env = dict(os.environ)
+    if threads:
+        cmd += ["--threads", str(threads)]
+        env["OMP_NUM_THREADS"] = env["MKL_NUM_THREADS"] = str(threads)
+    if resume:
+        cmd += ["--resume", str(resume)]
+
+    Path(metrics_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a") as log_file:
+        return subprocess.Popen(cmd, cwd=str(config.ROOT), env=env,
+                                stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker training YOLO dengan metrik per epoch")
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--epochs", type=int, required=True)
+    parser.add_argument("--batch", type=int, required=True)
+    parser.add_argument("--imgsz", type=int, required=True)
+    parser.add_argument("--name", required=True)
+    parser.add_argument("--metrics", required=True)
+    parser.add_argument("--project", default=None)
+    parser.add_argument("--threads", type=int, default=None, help="batas thread CPU untuk job ini")
+    parser.add_argument("--resume", default=None, help="last.pt untuk melanjutkan run yang terputus")
+    args = parser.parse_args()
+
+    os.chdir(config.ROOT)
+    run_training(args.data, args.model, args.epochs, args.batch, args.imgsz,
+                 args.name, args.metrics, project=args.project,
+                 threads=args.threads, resume=args.resume)
+
+
+if __name__ == "__main__":
+    main()
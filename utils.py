@@ -1,21 +1,32 @@
 # utils.py
-import cv2
 import streamlit as st
-from pathlib import Path
-from ultralytics import YOLO
-from PIL import Image
 import os
-import yaml
-import pandas as pd
-import re
-
-from config import TRAIN_RUNS_DIR, get_latest_trained_model_path
+import uuid
+import config
+from lazy_imports import lazy_import
+
+# Hanya dipakai di tabel statistik cache dan validasi YAML
+pd = lazy_import("pandas")
+yaml = lazy_import("yaml")
+
+from model_registry import MODEL_TASKS, get_registry, latest_detection_model_path, model_fingerprint
+from inference import model_imgsz, predict_batch, predict_preprocessed, save_yolo_labels
+from preprocess_pipeline import pipeline_for_model
+from result_cache import get_result_cache, image_fingerprint
+from inference_executor import CANCELLED, get_executor
+from telemetry import get_logger, stage_timer
+from tooth_assignment import assign_cavities
+from tiled_inference import predict_tiled
+from cascade_inference import predict_cascade
+from job_queue import start_scheduler
+
+log = get_logger("utils")
 
 def load_model(model_type, config):
-    """Load YOLO model based on type"""
+    """Load YOLO model based on type (cached across reruns and sessions)"""
     try:
         if model_type == 'Detection':
-            model_path = config.DETECTION_MODEL
+            model_path = latest_detection_model_path()
         elif model_type == 'Segmentation':
             model_path = config.SEGMENTATION_MODEL
         elif model_type == 'Pose Estimation':
@@ -25,48 +36,69 @@ def load_model(model_type, config):
             st.error(f"File model tidak ditemukan: {model_path}")
             return None
 
-        return YOLO(Path(model_path))
+        return get_registry().get(model_path, task=MODEL_TASKS.get(model_type))
     except Exception as e:
         st.error(f"Unable to load model. Check path: {model_path}")
         st.error(e)
         return None
 
-def display_detection_results(detection_data, classification_labels):
+def display_model_cache_stats():
+    """Menampilkan biaya cache model dan cache hasil deteksi"""
+    stats = get_registry().stats()
+    with st.expander("Cache Model", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Hit", stats["hits"])
+        col2.metric("Miss", stats["misses"])
+        col3.metric("Memori", f"{stats['resident_bytes'] / 1024 ** 2:.1f} MB")
+        if stats["entries"]:
+            st.dataframe(pd.DataFrame(stats["entries"]), use_container_width=True)
+        else:
+            st.write("Belum ada model yang dimuat.")
+
+        result_stats = get_result_cache().stats()
+        st.write(f"Cache hasil deteksi: hit-rate **{result_stats['hit_rate']:.0%}** "
+                 f"({result_stats['memory_hits']} memori, {result_stats['disk_hits']} disk, "
+                 f"{result_stats['misses']} miss), {result_stats['memory_entries']} entri di memori, "
+                 f"{result_stats['disk_entries']} entri di disk")
+
+        queue_stats = get_executor().stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Antrean Inference", queue_stats["queue_depth"], f"{queue_stats['running']} berjalan",
+                    delta_color="off")
+        col2.metric("Rata-rata Tunggu", f"{queue_stats['wait_ms_mean']:.0f} ms",
+                    f"p95 {queue_stats['wait_ms_p95']:.0f} ms", delta_color="off")
+        col3.metric("Rata-rata Proses", f"{queue_stats['run_ms_mean']:.0f} ms")
+        st.write(f"Tugas: {queue_stats['submitted']} dikirim, {queue_stats['deduped']} digabung, "
+                 f"{queue_stats['cancelled']} dibatalkan, {queue_stats['rejected']} ditolak")
+
+def display_detection_results(detections, classification_labels):
     """Menampilkan hasil deteksi dalam dua bagian: Ringkasan dan Tabel"""
-    # Debug print
-    print("Classification labels:", classification_labels)
-    
+    log.debug("Label klasifikasi: %s", classification_labels)
+
     with st.expander("Kesimpulan Hasil Deteksi", expanded=True):
         st.write("#### Ringkasan Deteksi Gigi")
-        if detection_data is None or len(detection_data) == 0:
+        if detections is None or len(detections) == 0:
             st.write("Tidak ada objek yang terdeteksi.")
             st.info("Kesimpulan: Model tidak mengidentifikasi adanya gigi atau karies dalam gambar.")
             return
 
-        carious_detections_count = 0
-        total_gigi_detections_count = 0
-
-        for box in detection_data:
-            try:
-                class_id = int(box.data[0][5])
-                print("Processing class_id:", class_id)  # Debug print
-                
-                # Validate class_id before using it
-                if class_id < 0 or class_id >= len(classification_labels):
-                    print(f"Warning: Invalid class_id {class_id}, max is {len(classification_labels)-1}")
-                    continue
-                    
-                if class_id == 0:
-                    carious_detections_count += 1
-                elif class_id == 1:
-                    total_gigi_detections_count += 1
-            except Exception as e:
-                print(f"Error processing detection box: {e}")
-                continue
+        # Hitung per kelas sekaligus; class_id di luar label diabaikan
+        counts = detections.class_counts(len(classification_labels))
+        carious_detections_count = int(counts[0])
+        total_gigi_detections_count = int(counts[1]) if len(counts) > 1 else 0
 
         st.write(f"Terdapat **{carious_detections_count}** titik lokasi **{classification_labels[0]}**"
                  f"{f' dari **{total_gigi_detections_count}** **{classification_labels[1]}** yang terdeteksi.' if total_gigi_detections_count > 0 else '.'}")
         st.markdown(f"**Kesimpulan:** Ada **{carious_detections_count}** titik lokasi karies yang diidentifikasi oleh model pada gambar ini.")
+        if carious_detections_count > 0 and total_gigi_detections_count > 0:
+            with stage_timer("tooth_assignment", detections.model):
+                assignment = assign_cavities(detections)
+            affected = int((assignment.cavities_per_tooth() > 0).sum())
+            st.write(f"Karies ditemukan pada **{affected}** dari **{total_gigi_detections_count}** gigi"
+                     f"{f' ({assignment.unassigned} titik tidak berada di gigi mana pun)' if assignment.unassigned else ''}.")
+            st.dataframe(assignment.to_table(), use_container_width=True)
+            st.caption("Urutan gigi diperkirakan dari kiri ke kanan gambar"
+                       f"{', rahang atas dan bawah dipisah' if assignment.two_jaws else ''}.")
         if carious_detections_count > 0:
             st.warning("Disarankan untuk konsultasi lebih lanjut dengan profesional gigi.")
         else:
@@ -74,48 +106,57 @@ def display_detection_results(detection_data, classification_labels):
 
     with st.expander("Detail Hasil Deteksi", expanded=True):
         st.write("#### Objek Terdeteksi")
-        table_data = []
-        for i, box in enumerate(detection_data):
-            try:
-                data = box.data[0].tolist()
-                x1, y1, x2, y2, conf, class_id = data
-                
-                # Safe class name retrieval
-                try:
-                    class_name = classification_labels[int(class_id)]
-                except IndexError:
-                    print(f"Warning: class_id {class_id} out of range for classification_labels (max {len(classification_labels)-1})")
-                    class_name = f"unknown (id:{class_id})"
-                
-                row = {
-                    "Deteksi": f"#{i+1}",
-                    "Kelas": class_name,
-                    "Keyakinan": f"{conf:.2f} ({conf*100:.0f}%)",
-                    "Posisi (x1, y1, x2, y2)": f"({x1:.0f}, {y1:.0f}, {x2:.0f}, {y2:.0f})"
-                }
-                table_data.append(row)
-            except Exception as e:
-                print(f"Error processing detection box #{i}: {e}")
-                continue
-                
-        st.dataframe(pd.DataFrame(table_data), use_container_width=True)
-
-def process_image_detection(model, image, confidence):
-    """Process single image detection"""
-    try:
-        result = model.predict(image, conf=confidence)
-        boxes = result[0].boxes
-        result_plotted = result[0].plot()[:, :, ::-1]
-        return {
-            "success": True,
-            "plotted_image": result_plotted,
-            "detection_data": boxes
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        with stage_timer("table_render", detections.model):
+            st.dataframe(detections.to_table(classification_labels), use_container_width=True)
+
+def process_image_detection(model, image, confidence, use_cache=True, tiling=None, cascade=None,
+                            preprocess=True, plot=True):
+    """Process single image detection (re-filters cached raw boxes when possible)
+
+    `tiling` (opsi tiled_inference.tile_options) mengaktifkan mode bertile untuk
+    rontgen panoramik; `cascade` (opsi cascade_inference.cascade_options)
+    mengaktifkan mode kaskade gigi -> karies. Di semua mode, bila model
+    dilatih dengan dataset hasil preprocessing, pipeline yang sama diterapkan
+    dulu (`preprocess=False` untuk melewatinya). `plot=False` melewati
+    result.plot() (halaman deteksi menggambar overlay sendiri, lihat overlay.py).
+    """
+    cache = get_result_cache() if use_cache else None
+    pipeline = pipeline_for_model(model) if preprocess else None
+    if tiling is not None:
+        return predict_tiled(model, image, confidence, plot=plot, cache=cache, pipeline=pipeline, **tiling)
+    if cascade is not None:
+        return predict_cascade(model, image, confidence, plot=plot, cache=cache, pipeline=pipeline, **cascade)
+    if pipeline is not None and pipeline.active:
+        return predict_preprocessed(model, image, confidence, pipeline, plot=plot, cache=cache)
+    return predict_batch(model, [image], confidence, batch_size=1, plot=plot, cache=cache)[0]
+
+def submit_image_detection(model, image, confidence, tiling=None, cascade=None, plot=True):
+    """Kirim process_image_detection ke executor bersama; kembalikan InferenceTask untuk dipoll
+
+    Tugas disimpan di session_state: rerun dengan gambar dan parameter yang sama
+    memakai tugas (dan hasil) yang sama, sedangkan parameter baru menggantikan
+    tugas lama sesi ini. Melempar inference_executor.ExecutorBusy bila antrean penuh.
+    """
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    key = (f"{model_fingerprint(model)}:{image_fingerprint(image)}:{confidence}:{plot}:"
+           f"{sorted((tiling or {}).items())}:{sorted((cascade or {}).items())}")
+    task = st.session_state.get("deteksi_task")
+    if task is None or task.key != key or task.status == CANCELLED:
+        task = get_executor().submit(key, process_image_detection, model, image, confidence,
+                                     tiling=tiling, cascade=cascade, plot=plot,
+                                     user=st.session_state.get("username", "anon"),
+                                     session=st.session_state.session_id)
+        st.session_state.deteksi_task = task
+    return task
+
+def detection_decode_size(model, tiling=None, cascade=None):
+    """Sisi minimum decode gambar unggahan; None = resolusi penuh (mode tile/kaskade)"""
+    if tiling is not None or cascade is not None:
+        return None
+    imgsz = config.INFERENCE_IMGSZ or model_imgsz(model)
+    pipeline = pipeline_for_model(model)
+    return max(imgsz, pipeline.size or 0) if pipeline is not None else imgsz
 
 def validate_training_config(dataset_config):
     """Validasi file YAML YOLO dan pastikan path dataset valid"""
@@ -139,9 +180,8 @@ def validate_training_config(dataset_config):
         train_path = os.path.join(base_path_abs, train_rel) if not os.path.isabs(train_rel) else train_rel
         val_path = os.path.join(base_path_abs, val_rel) if not os.path.isabs(val_rel) else val_rel
 
-        print(f"[VALIDATOR] base_path: {base_path_abs}")
-        print(f"[VALIDATOR] train_path: {train_path}")
-        print(f"[VALIDATOR] val_path: {val_path}")
+        log.debug("Validasi dataset: base_path=%s train_path=%s val_path=%s",
+                  base_path_abs, train_path, val_path)
 
         if not os.path.exists(train_path):
             st.error(f"Folder train tidak ditemukan: {train_path}")
@@ -162,47 +202,18 @@ def validate_training_config(dataset_config):
         return False
 
 def start_training(dataset_config, model_arch, epochs, batch, imgsz):
-    """Jalankan training YOLO"""
-    st.info("Training dimulai...")
-
+    """Masukkan training YOLO ke antrian job; kembalikan job untuk dipantau"""
     if not validate_training_config(dataset_config):
-        return False
+        return None
 
     try:
-        model = YOLO(model_arch)
-        run_name = 'karies_yolo11_web'
-
-        with st.spinner("Sedang melatih model..."):
-            results = model.train(
-                data=dataset_config,
-                epochs=int(epochs),
-                imgsz=int(imgsz),
-                batch=int(batch),
-                project='runs/train',
-                name=run_name
-            )
-
-        latest_model_path = get_latest_trained_model_path(base_name=run_name)
-        if latest_model_path and latest_model_path.exists():
-            st.success(f"Training selesai! Model terbaik disimpan di: `{latest_model_path}`")
-            st.info("Model deteksi akan otomatis diperbarui untuk sesi berikutnya.")
-            return True
+        queue = start_scheduler()
+        job = queue.submit(dataset_config, model_arch, epochs, batch, imgsz, source='web')
+        if job['status'] == 'queued':
+            st.info(f"Training #{job['id']} masuk antrian, menunggu job lain selesai...")
         else:
-            st.warning("Training selesai! Namun model terbaik tidak ditemukan otomatis.")
-            st.info(f"Cek folder `{TRAIN_RUNS_DIR}` untuk melihat hasil.")
-            return True
-
+            st.info(f"Training #{job['id']} dimulai di latar belakang...")
+        return job
     except Exception as e:
-        st.error(f"Terjadi error saat training: {e}")
-        return False
-
-def save_yolo_labels(detection_data, label_path):
-    """Simpan bounding box ke file label format YOLO"""
-    with open(label_path, "w") as f:
-        for item in detection_data:
-            class_id = item["class_id"]
-            x_center = item["x_center"]
-            y_center = item["y_center"]
-            width = item["width"]
-            height = item["height"]
-            f.write(f"{class_id} {x_center} {y_center} {width} {height}\n")
\ No newline at end of file
+        st.error(f"Terjadi error saat memulai training: {e}")
+        return None